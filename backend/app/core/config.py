@@ -44,12 +44,24 @@ class Settings(BaseSettings):
     # Agent earnings split
     AGENT_COMMISSION_PERCENTAGE: float = 75.0  # Agent gets 75% of delivery fee
     
+    # Request metrics (admin-only /metrics, not registered when disabled)
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_MS: float = 500.0  # requests at least this slow are logged with their SQL statements
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
     # ML Service
     ML_SERVICE_URL: str = "http://ml_service:8001"
-    
+    ML_CALL_TIMEOUT_SECONDS: float = 2.0  # per request, capped by the batch deadline
+    ML_BATCH_DEADLINE_SECONDS: float = 20.0  # total ML budget for one matching batch
+    ML_HEDGE_ENABLED: bool = False  # send a second request once the first exceeds observed p95
+    ML_HEDGE_MIN_DELAY_SECONDS: float = 0.05
+    ML_BREAKER_WINDOW: int = 50  # recent calls considered by the circuit breaker
+    ML_BREAKER_ERROR_RATE: float = 0.5  # open when this fraction of recent calls failed
+    ML_BREAKER_LATENCY_BUDGET_SECONDS: float = 1.0  # open when recent p95 exceeds this
+    ML_BREAKER_COOLDOWN_SECONDS: float = 30.0  # time open before a half-open probe
+
     # WORK4FOOD Configuration
     BATCH_WINDOW_MINUTES: int = 3
     AGENT_SPEED_KMPH: float = 25.0
@@ -57,6 +69,13 @@ class Settings(BaseSettings):
     MIN_WAGE: float = 80.0
     INITIAL_GUARANTEE_RATIO: float = 0.25
     USE_DYNAMIC_GUARANTEE: bool = True
+    OMEGA_EMA_ALPHA: float = 0.2  # per-agent omega smoothing after each batch
+    MATCHING_SOLVER: str = "hungarian"  # hungarian, rectangular, sparse_knn, components or greedy
+    MATCHING_KNN: int = 10  # candidate orders per agent for the sparse_knn/components solvers
+    G_VALUE_SOURCE: str = "local"  # "local" EMA state, or "service" to read g-value-service snapshots
+    G_SNAPSHOT_KEY: str = "gvalue:snapshot"
+    G_VALUE_SERVICE_URL: str = "http://g_value_service:8002"  # receives agent state after each batch in service mode
+    G_VALUE_REFRESH_TIMEOUT_SECONDS: float = 2.0
     PREP_TIME_MINUTES: float = 8.0
     CITY_CENTER_LAT: float = 19.0760  # Mumbai
     CITY_CENTER_LON: float = 72.8777
@@ -0,0 +1,246 @@
+"""
+Request Metrics
+File: backend/app/core/metrics.py
+Per-route latency histograms and SQL statement counting
+
+RequestMetricsMiddleware (plain ASGI, no response buffering) times every
+HTTP request from its first byte in to its last byte out. SQLAlchemy
+before/after_cursor_execute hooks count the statements each request issues
+and their total time. The request being served is tracked in a ContextVar,
+which sync routes see too because the threadpool copies the context.
+Statements outside a request (the batch scheduler, background tasks after
+the response) are not counted.
+
+Requests slower than settings.SLOW_REQUEST_MS are logged with their statements and
+kept in a small ring buffer. snapshot() is what the /metrics endpoint
+returns.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+MAX_STATEMENTS = 50  # statements kept per request for the slow-request log
+SLOW_REQUESTS_KEPT = 50
+
+
+class RequestStats:
+    """What one request did: SQL statement count, DB time and the first MAX_STATEMENTS statements."""
+
+    __slots__ = ("queries", "db_seconds", "statements", "done")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: List[str] = []
+        self.done = False  # set once the response is sent
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= bounds[i], the last slot everything above."""
+
+    __slots__ = ("bounds", "counts", "total", "sum", "max")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return float(min(bound, self.max))
+        return self.max
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0.0,
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": {**{f"le_{b}": c for b, c in zip(self.bounds, self.counts)}, "inf": self.counts[-1]},
+        }
+
+
+class RouteMetrics:
+    __slots__ = ("latency_ms", "queries", "db_ms", "errors")
+
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """Per-route metrics and recent slow requests."""
+
+    def __init__(self, slow_request_ms: float = 500.0):
+        self.slow_request_ms = slow_request_ms
+        self.routes: Dict[str, RouteMetrics] = {}
+        self.slow_requests = deque(maxlen=SLOW_REQUESTS_KEPT)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, route: str, status: int, elapsed_ms: float, stats: RequestStats):
+        db_ms = stats.db_seconds * 1000.0
+        with self._lock:
+            metrics = self.routes.get(route)
+            if metrics is None:
+                metrics = self.routes[route] = RouteMetrics()
+            metrics.latency_ms.observe(elapsed_ms)
+            metrics.queries.observe(stats.queries)
+            metrics.db_ms.observe(db_ms)
+            if status >= 500:
+                metrics.errors += 1
+        if elapsed_ms >= self.slow_request_ms:
+            entry = {
+                "route": route, "status": status, "at": time.time(), "latency_ms": round(elapsed_ms, 2),
+                "queries": stats.queries, "db_ms": round(db_ms, 2), "statements": stats.statements,
+            }
+            self.slow_requests.append(entry)
+            logger.warning(
+                "Slow request %s: %.1f ms, %d queries, %.1f ms in DB\n  %s",
+                route, elapsed_ms, stats.queries, db_ms, "\n  ".join(stats.statements),
+            )
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            routes = {
+                route: {
+                    "errors": m.errors,
+                    "latency_ms": m.latency_ms.as_dict(),
+                    "queries": m.queries.as_dict(),
+                    "db_ms": m.db_ms.as_dict(),
+                }
+                for route, m in sorted(self.routes.items())
+            }
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "slow_request_ms": self.slow_request_ms,
+            "routes": routes,
+            "slow_requests": list(self.slow_requests),
+        }
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.slow_requests.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None and not stats.done:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if stats.done:
+        return
+    stats.db_seconds += elapsed
+    stats.queries += 1
+    if len(stats.statements) < MAX_STATEMENTS:
+        stats.statements.append(statement)
+
+
+def instrument_engine(engine):
+    """Count statements and DB time per request on `engine` (sync, or async via its sync_engine)."""
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording latency, status, statement count and DB time
+    per route template ("GET /api/restaurants/{restaurant_id}").
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+        self._paths = {}  # endpoint -> route path template
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return f"{scope['method']} <unmatched>"
+        path = self._paths.get(endpoint)
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", ()):
+                if getattr(route, "endpoint", None) is not None:
+                    self._paths[route.endpoint] = route.path
+            path = self._paths.get(endpoint, scope["path"])
+        return f"{scope['method']} {path}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        def finish():
+            stats.done = True
+            self.registry.record(self._route(scope), status, (time.perf_counter() - start) * 1000.0, stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            # The response is complete; background tasks that follow are not counted
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not stats.done:
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not stats.done:
+                finish()
+            _current.reset(token)
+
+
+registry = MetricsRegistry(slow_request_ms=settings.SLOW_REQUEST_MS)
@@ -3,13 +3,15 @@ FastAPI Application Main Entry Point
 File: backend/app/main.py
 Complete setup with database initialization and routes
 """
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 from app.core.config import settings
 from app.models.database import Base, engine, create_tables
 from app.core.batch_scheduler import start_scheduler
+from app.core import metrics
+from app.core.security import require_admin
 from app.models import models  # Import all models to register them
 from app.routers import auth
 from app.routers import restaurants, customer_orders, earnings, agents, admin
@@ -68,6 +70,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, SQL statement counts and DB time (served on /metrics)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.RequestMetricsMiddleware, registry=metrics.registry)
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -87,6 +94,13 @@ async def health_check():
         "version": settings.APP_VERSION
     }
 
+if settings.METRICS_ENABLED:
+    # Admin only: slow-request entries carry raw SQL text
+    @app.get("/metrics", dependencies=[Depends(require_admin)])
+    async def get_metrics():
+        """Per-route latency histograms, SQL statements and DB time per request, recent slow requests"""
+        return metrics.registry.snapshot()
+
 # Include routers
 app.include_router(auth.router, prefix="/api")
 
@@ -2,13 +2,17 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import httpx
 import numpy as np
 from scipy.optimize import linear_sum_assignment
 
 from app.models import models
 from app.schemas import OrderCreate, OrderOut
 from app.models.database import get_db
-from app.services.g_value_client import predict_wv
+from app.services.g_value_client import BatchCallStats, BatchDeadline, predict_wv_with_policy
+from app.services.matching.assignment_engine import agent_omega_state
+from app.core.config import settings
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -73,21 +77,34 @@ async def batch_and_match(db = Depends(get_db)):
     N = max(n_agents, n_batches)
     cost = np.zeros((N, N), dtype=float) + 1e6
 
+    # predict every agent's Wv using ML (GPR) to compute ωv = Wv / Av.
+    # All calls share one deadline; anything the policy sheds falls back to the
+    # agent's learned omega from the shared per-agent EMA state, i.e. Wv = ω_v * Av.
+    deadline = BatchDeadline(settings.ML_BATCH_DEADLINE_SECONDS)
+    ml_stats = BatchCallStats()
+    agent_list = [agent_row[0] if isinstance(agent_row, tuple) else agent_row for agent_row in agents]
+    local_omegas = agent_omega_state.omegas_for([agent.id for agent in agent_list])
+    async with httpx.AsyncClient() as client:
+        predicted = await asyncio.gather(*[
+            predict_wv_with_policy(
+                {
+                    "lat": agent.last_location.get("lat") if agent.last_location else 0.0,
+                    "lng": agent.last_location.get("lng") if agent.last_location else 0.0,
+                    "num_agents": n_agents,
+                    "orders_per_window": n_batches,
+                    "active_seconds": agent.active_seconds or 3600
+                },
+                fallback_w=float(local_omega) * (agent.active_seconds or 1.0),
+                deadline=deadline,
+                stats=ml_stats,
+                client=client,
+            )
+            for agent, local_omega in zip(agent_list, local_omegas)
+        ])
+
     # populate cost for real agent-batch entries
-    for i, agent_row in enumerate(agents):
-        agent = agent_row[0] if isinstance(agent_row, tuple) else agent_row
-        # predict agent Wv using ML (GPR) to compute ωv = Wv / Av
-        agent_features = {
-            "lat": agent.last_location.get("lat") if agent.last_location else 0.0,
-            "lng": agent.last_location.get("lng") if agent.last_location else 0.0,
-            "num_agents": n_agents,
-            "orders_per_window": n_batches,
-            "active_seconds": agent.active_seconds or 3600
-        }
-        try:
-            predicted_w = await predict_wv(agent_features)
-        except Exception:
-            predicted_w = agent.current_work_seconds or 0.0
+    for i, agent in enumerate(agent_list):
+        predicted_w = predicted[i]
 
         # computed gv = ωv = predicted_w / Av (Av can't be zero)
         if (agent.active_seconds or 1.0) > 0:
@@ -129,4 +146,4 @@ async def batch_and_match(db = Depends(get_db)):
             db.add(order)
             assignments.append({"order_id": order.id, "agent_id": agent.id, "cost": float(cost[r,c])})
     await db.commit()
-    return {"assignments": assignments}
+    return {"assignments": assignments, "ml_calls": ml_stats.as_dict()}
@@ -1,8 +1,13 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Sequence
+
 import httpx
 from app.core.config import settings
 
 # client that asks ML service (GPR) to predict expected work Wv given features
-async def predict_wv(agent_features: dict) -> float:
+async def predict_wv(agent_features: dict, client: Optional[httpx.AsyncClient] = None, timeout: float = 10.0) -> float:
     """
     agent_features: {
       "login_time": "...",
@@ -13,10 +18,267 @@ async def predict_wv(agent_features: dict) -> float:
       "active_seconds": 3600
     }
     returns predicted Wv (seconds of expected work) as float
+    Pass a shared `client` to reuse connections across a batch.
     """
     url = f"{settings.ML_SERVICE_URL}/predict_w"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(url, json=agent_features)
-        resp.raise_for_status()
-        data = resp.json()
+    if client is None:
+        async with httpx.AsyncClient(timeout=timeout) as own_client:
+            resp = await own_client.post(url, json=agent_features, timeout=timeout)
+    else:
+        resp = await client.post(url, json=agent_features, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
     return float(data["predicted_w"])
+
+
+# pushes one batch window of agent state to g-value-service, which refreshes its table and publishes a snapshot
+async def refresh_g_values(
+    agent_ids: Sequence[int],
+    work_hours: Sequence[float],
+    active_hours: Sequence[float],
+    client: Optional[httpx.AsyncClient] = None,
+    timeout: float = 2.0,
+) -> dict:
+    """
+    Returns the service's {"version", "agents", "refresh_ms", "published"}.
+    The next batch reads the published snapshot from Redis (G_SNAPSHOT_KEY).
+    """
+    url = f"{settings.G_VALUE_SERVICE_URL}/refresh"
+    payload = {
+        "agent_ids": [int(a) for a in agent_ids],
+        "work_hours": [float(w) for w in work_hours],
+        "active_hours": [float(h) for h in active_hours],
+    }
+    if client is None:
+        async with httpx.AsyncClient(timeout=timeout) as own_client:
+            resp = await own_client.post(url, json=payload, timeout=timeout)
+    else:
+        resp = await client.post(url, json=payload, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+# ============================================
+# Tail-latency policy: deadlines, hedging, circuit breaker
+# ============================================
+
+class MLUnavailable(Exception):
+    """Raised by the policy when a call is skipped or failed; `reason` names the fallback cause."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class BatchDeadline:
+    """Absolute deadline shared by every ML call made while matching one batch."""
+
+    def __init__(self, budget_seconds: float):
+        self.expires_at = time.monotonic() + max(0.0, budget_seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class BatchCallStats:
+    """Per-batch counters: how many agents got an ML prediction vs. the local fallback."""
+
+    def __init__(self):
+        self.calls = 0
+        self.ml_ok = 0
+        self.hedged = 0
+        self.fallbacks: Dict[str, int] = {}
+
+    def record_fallback(self, reason: str) -> None:
+        self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+
+    def as_dict(self) -> dict:
+        total_fallbacks = sum(self.fallbacks.values())
+        return {
+            "calls": self.calls,
+            "ml_ok": self.ml_ok,
+            "hedged": self.hedged,
+            "fallbacks": total_fallbacks,
+            "fallback_rate": (total_fallbacks / self.calls) if self.calls else 0.0,
+            "fallback_reasons": dict(self.fallbacks),
+        }
+
+
+class CircuitBreaker:
+    """
+    Rolling-window breaker over the last `window` calls.
+    Opens when the error rate or the p95 latency exceeds its budget; after
+    `cooldown_seconds` a single half-open probe decides whether to close again.
+    """
+
+    def __init__(self, window: int, error_rate: float, latency_budget_seconds: float, cooldown_seconds: float):
+        self.error_rate = error_rate
+        self.latency_budget_seconds = latency_budget_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.min_calls = max(5, window // 5)
+        self._outcomes = deque(maxlen=window)  # (ok, latency_seconds)
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Give up the half-open probe without an outcome (e.g. it was cancelled); the next call probes again."""
+        self._probe_in_flight = False
+
+    def record(self, ok: bool, latency_seconds: float) -> None:
+        if self._opened_at is not None:
+            if not self._probe_in_flight:
+                return  # straggler that started before the breaker opened
+            # Outcome of the half-open probe
+            self._probe_in_flight = False
+            if ok and latency_seconds <= self.latency_budget_seconds:
+                self._opened_at = None
+                self._outcomes.clear()
+            else:
+                self._opened_at = time.monotonic()
+            return
+        self._outcomes.append((ok, latency_seconds))
+        if len(self._outcomes) < self.min_calls:
+            return
+        errors = sum(1 for success, _ in self._outcomes if not success)
+        if errors / len(self._outcomes) > self.error_rate or self.p95() > self.latency_budget_seconds:
+            self._opened_at = time.monotonic()
+
+    def p95(self) -> float:
+        latencies = sorted(lat for ok, lat in self._outcomes if ok)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+
+class MLCallPolicy:
+    """Wraps single ML calls with deadline propagation, optional hedging and the circuit breaker."""
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        call_timeout_seconds: float,
+        hedge_enabled: bool = False,
+        hedge_min_delay_seconds: float = 0.05,
+    ):
+        self.breaker = breaker
+        self.call_timeout_seconds = call_timeout_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+
+    async def call(self, make_call: Callable[[float], Awaitable[float]], deadline: BatchDeadline, stats: BatchCallStats) -> float:
+        """
+        `make_call(timeout)` performs one request. Raises MLUnavailable instead of
+        waiting past the batch deadline or calling a service the breaker has shed.
+        """
+        if deadline.expired:
+            raise MLUnavailable("deadline")
+        is_probe = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            raise MLUnavailable("breaker_open")
+        remaining = deadline.remaining()
+        # When the batch deadline, not the per-call timeout, bounds the call, running
+        # out of time says nothing about the service: no outcome for the breaker
+        deadline_bound = remaining < self.call_timeout_seconds
+        timeout = min(self.call_timeout_seconds, remaining)
+        start = time.monotonic()
+        try:
+            value = await asyncio.wait_for(self._maybe_hedged(make_call, timeout, stats), timeout=timeout)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            if deadline_bound:
+                if is_probe:
+                    self.breaker.release_probe()
+                raise MLUnavailable("deadline")
+            self.breaker.record(False, time.monotonic() - start)
+            raise MLUnavailable("timeout")
+        except Exception:
+            self.breaker.record(False, time.monotonic() - start)
+            raise MLUnavailable("error")
+        except BaseException:
+            # Cancelled (CancelledError is not an Exception): no outcome, but never keep the probe slot
+            if is_probe:
+                self.breaker.release_probe()
+            raise
+        self.breaker.record(True, time.monotonic() - start)
+        return value
+
+    async def _maybe_hedged(self, make_call, timeout: float, stats: BatchCallStats) -> float:
+        p95 = self.breaker.p95()
+        if not self.hedge_enabled or p95 <= 0.0:
+            return await make_call(timeout)
+        hedge_delay = max(self.hedge_min_delay_seconds, p95)
+        primary = asyncio.ensure_future(make_call(timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                stats.hedged += 1
+                tasks.add(asyncio.ensure_future(make_call(max(0.0, timeout - hedge_delay))))
+            pending = set(tasks)
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # Also runs when wait_for cancels us at the deadline
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+# Breaker state must outlive a single batch, so the default policy is process-wide
+ml_policy = MLCallPolicy(
+    breaker=CircuitBreaker(
+        window=settings.ML_BREAKER_WINDOW,
+        error_rate=settings.ML_BREAKER_ERROR_RATE,
+        latency_budget_seconds=settings.ML_BREAKER_LATENCY_BUDGET_SECONDS,
+        cooldown_seconds=settings.ML_BREAKER_COOLDOWN_SECONDS,
+    ),
+    call_timeout_seconds=settings.ML_CALL_TIMEOUT_SECONDS,
+    hedge_enabled=settings.ML_HEDGE_ENABLED,
+    hedge_min_delay_seconds=settings.ML_HEDGE_MIN_DELAY_SECONDS,
+)
+
+
+async def predict_wv_with_policy(
+    agent_features: dict,
+    fallback_w: float,
+    deadline: BatchDeadline,
+    stats: BatchCallStats,
+    client: Optional[httpx.AsyncClient] = None,
+    policy: Optional[MLCallPolicy] = None,
+) -> float:
+    """predict_wv under the tail-latency policy; never raises, returns `fallback_w` when ML is skipped or fails."""
+    policy = policy or ml_policy
+    stats.calls += 1
+    try:
+        value = await policy.call(lambda timeout: predict_wv(agent_features, client=client, timeout=timeout), deadline, stats)
+    except MLUnavailable as e:
+        stats.record_fallback(e.reason)
+        return fallback_w
+    stats.ml_ok += 1
+    return value
@@ -2,7 +2,7 @@ from .geo_utils import haversine_km, travel_time_minutes, random_point, random_p
 from .simulator import BatchProcessor, OrderExecutor, PaymentProcessor
 from .assignment_engine import AssignmentEngine
 from .cost_calculator import CostCalculator
-from .guarantee_predictor import GuaranteePredictor
+from .guarantee_predictor import GuaranteePredictor, AgentOmegaState
 
 __all__ = [
     "haversine_km",
@@ -15,5 +15,6 @@ __all__ = [
     "AssignmentEngine",
     "CostCalculator",
     "GuaranteePredictor",
+    "AgentOmegaState",
 ]
 
@@ -1,57 +1,78 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import numpy as np
-from scipy.optimize import linear_sum_assignment
 from sqlalchemy.orm import Session
 from app.services.matching.cost_calculator import CostCalculator
-from app.services.matching.guarantee_predictor import GuaranteePredictor
+from app.services.matching.guarantee_predictor import AgentOmegaState, GuaranteePredictor
+from app.services.matching.solvers import KNN_SOLVERS, SOLVERS, solve
 from app.core.config import settings
 from app.models.models import Agent, Order
 
+# Per-agent EMA state has to survive across batches, while engines are created per batch
+agent_omega_state = AgentOmegaState(
+    initial_omega=getattr(settings, "INITIAL_GUARANTEE_RATIO", 0.25),
+    alpha=getattr(settings, "OMEGA_EMA_ALPHA", 0.2),
+)
+
 
 class AssignmentEngine:
     """
     Runs the WORK4FOOD assignment using the Hungarian algorithm.
+    config["solver"] (default settings.MATCHING_SOLVER) picks another solver
+    from app.services.matching.solvers; config["knn"] sets its candidate count.
     """
 
     def __init__(self, config: dict | None = None):
         self.config = config or {}
+        self.solver = self.config.get("solver", getattr(settings, "MATCHING_SOLVER", "hungarian"))
+        if self.solver not in SOLVERS:
+            raise ValueError(f"Unknown matching solver {self.solver!r}; expected one of {sorted(SOLVERS)}")
+        self.knn = int(self.config.get("knn", getattr(settings, "MATCHING_KNN", 10)))
+        use_dynamic = self.config.get("economics", {}).get("use_dynamic_guarantee", settings.USE_DYNAMIC_GUARANTEE)
         self.guarantee_predictor = GuaranteePredictor(
-            initial_omega=getattr(settings, "INITIAL_GUARANTEE_RATIO", 0.25)
+            initial_omega=getattr(settings, "INITIAL_GUARANTEE_RATIO", 0.25),
+            agent_state=agent_omega_state if use_dynamic else None,
         )
 
-    def assign_batch(self, available_agents: List[Agent], pending_orders: List[Order], db: Session | None = None) -> List[Tuple[Agent, Order]]:
+    def assign_batch(
+        self,
+        available_agents: List[Agent],
+        pending_orders: List[Order],
+        db: Session | None = None,
+        omegas: Optional[np.ndarray] = None,
+    ) -> List[Tuple[Agent, Order]]:
+        """
+        omegas: optional per-agent guarantee ratios aligned with available_agents
+        (e.g. from the g-value service); defaults to the predictor's per-agent state.
+        """
         if not available_agents or not pending_orders:
             return []
 
+        if omegas is None:
+            omegas = self.guarantee_predictor.predict_agents([a.id for a in available_agents])
+
         # Cost calculator uses DB to resolve any metadata if needed
-        # Pass current omega and configuration knobs
+        # Pass per-agent omega and configuration knobs
         calculator = CostCalculator(
             db=db,
-            guarantee_ratio=self.guarantee_predictor.predict(),
+            guarantee_ratio=omegas,
             prep_time_minutes=getattr(settings, "PREP_TIME_MINUTES", 8.0),
             speed_kmph=getattr(settings, "AGENT_SPEED_KMPH", 25.0),
         )
-        base_costs = calculator.compute_cost_matrix(available_agents, pending_orders)
-
-        # Pad to square matrix with large costs if needed
-        n_agents, n_orders = base_costs.shape
-        n = max(n_agents, n_orders)
-        padded = np.full((n, n), fill_value=1e6, dtype=float)
-        padded[:n_agents, :n_orders] = base_costs
+        w_b = None
+        if self.solver in KNN_SOLVERS:
+            # Candidate orders are the nearest by work hours, not by guarantee-adjusted cost
+            w_b = calculator.work_hours_matrix(available_agents, pending_orders)
+        base_costs = calculator.compute_cost_matrix(available_agents, pending_orders, w_b=w_b)
 
-        # Hungarian
-        rows, cols = linear_sum_assignment(padded)
-
-        assignments: List[Tuple[Agent, Order]] = []
-        for r, c in zip(rows, cols):
-            if r < n_agents and c < n_orders and padded[r, c] < 1e6:
-                assignments.append((available_agents[r], pending_orders[c]))
-        return assignments
+        rows, cols = solve(base_costs, self.solver, k=self.knn, proximity=w_b)
+        return [(available_agents[r], pending_orders[c]) for r, c in zip(rows, cols)]
 
     def update_predictor(self, agents: List[Agent]) -> None:
-        total_work = sum(float(a.work_hours or 0.0) for a in agents)
-        total_active = sum(float(a.active_hours or 0.0) for a in agents)
-        self.guarantee_predictor.update(total_work, total_active)
-
-
+        work = np.array([float(a.work_hours or 0.0) for a in agents])
+        active = np.array([float(a.active_hours or 0.0) for a in agents])
+        self.guarantee_predictor.update(float(work.sum()), float(active.sum()))
+        # In service mode the g-value-service snapshot is authoritative; a local EMA step
+        # on top of it would drift from the service until the next version arrives
+        if getattr(settings, "G_VALUE_SOURCE", "local") != "service":
+            self.guarantee_predictor.update_agents([a.id for a in agents], work, active)
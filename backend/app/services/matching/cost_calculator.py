@@ -1,9 +1,9 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Optional, Union
 import numpy as np
-from app.services.matching.geo_utils import travel_time_minutes
+from app.services.matching.geo_utils import haversine_km_array
 from app.core.config import settings
-from app.models.models import Agent, Order, Restaurant
+from app.models.models import Agent, Order
 from sqlalchemy.orm import Session
 
 
@@ -16,43 +16,41 @@ class CostCalculator:
     where:
       w_b(i,j) is estimated work hours for agent i to complete order j
       W_t^i is agent i's work_hours
-      G_t^i is omega * agent i's active_hours
+      G_t^i is omega_i * agent i's active_hours
+    guarantee_ratio is either one global omega or a per-agent vector aligned
+    with the agents list; the whole matrix is computed with array broadcasting.
     """
 
-    def __init__(self, db: Session, guarantee_ratio: float, prep_time_minutes: float, speed_kmph: float):
+    def __init__(self, db: Session, guarantee_ratio: Union[float, np.ndarray], prep_time_minutes: float, speed_kmph: float):
         self.db = db
         self.guarantee_ratio = guarantee_ratio
         self.prep_time_minutes = prep_time_minutes
         self.speed_kmph = speed_kmph
 
-    def _estimate_work_hours(self, agent: Agent, order: Order) -> float:
-        # Resolve restaurant and customer coords
-        restaurant: Restaurant = self.db.query(Restaurant).filter(Restaurant.id == order.user_id).first()  # fallback
-        # Order model here uses generic pickup/drop; use those directly for estimation
-        agent_loc = (agent.last_location_lat or 0.0, agent.last_location_lon or 0.0)
-        pickup_loc = (order.pickup_lat, order.pickup_lng)
-        drop_loc = (order.drop_lat, order.drop_lng)
 
-        to_pickup = travel_time_minutes(agent_loc, pickup_loc, self.speed_kmph)
-        to_drop = travel_time_minutes(pickup_loc, drop_loc, self.speed_kmph)
-        total_minutes = to_pickup + self.prep_time_minutes + to_drop
+    def work_hours_matrix(self, agents: List[Agent], orders: List[Order]) -> np.ndarray:
+        """w_b(i,j) for every agent/order pair, in hours."""
+        agent_lat = np.array([float(a.last_location_lat or 0.0) for a in agents])
+        agent_lon = np.array([float(a.last_location_lon or 0.0) for a in agents])
+        pickup_lat = np.array([float(o.pickup_lat) for o in orders])
+        pickup_lng = np.array([float(o.pickup_lng) for o in orders])
+        drop_lat = np.array([float(o.drop_lat) for o in orders])
+        drop_lng = np.array([float(o.drop_lng) for o in orders])
+
+        minutes_per_km = 60.0 / max(self.speed_kmph, 0.001)
+        to_pickup = haversine_km_array(agent_lat[:, None], agent_lon[:, None], pickup_lat[None, :], pickup_lng[None, :])
+        to_drop = haversine_km_array(pickup_lat, pickup_lng, drop_lat, drop_lng)
+        total_minutes = (to_pickup + to_drop[None, :]) * minutes_per_km + self.prep_time_minutes
         return total_minutes / 60.0
 
-    def compute_cost_matrix(self, agents: List[Agent], orders: List[Order]) -> np.ndarray:
+    def compute_cost_matrix(self, agents: List[Agent], orders: List[Order], w_b: Optional[np.ndarray] = None) -> np.ndarray:
+        """Equation 3 costs; pass w_b when the caller already has work_hours_matrix(agents, orders)."""
         if not agents or not orders:
             return np.zeros((len(agents), len(orders)))
-        costs = np.zeros((len(agents), len(orders)), dtype=float)
-        for i, agent in enumerate(agents):
-            W = float(agent.work_hours or 0.0)
-            A = float(agent.active_hours or 0.0)
-            G = float(self.guarantee_ratio) * A
-            for j, order in enumerate(orders):
-                w_b = self._estimate_work_hours(agent, order)
-                if G <= W:
-                    cost = w_b
-                else:
-                    cost = max(W + w_b - G, 0.0)
-                costs[i, j] = cost
-        return costs
-
-
+        if w_b is None:
+            w_b = self.work_hours_matrix(agents, orders)
+        W = np.array([float(a.work_hours or 0.0) for a in agents])[:, None]
+        A = np.array([float(a.active_hours or 0.0) for a in agents])
+        omega = np.broadcast_to(np.asarray(self.guarantee_ratio, dtype=float), A.shape)
+        G = (omega * A)[:, None]
+        return np.where(G <= W, w_b, np.maximum(W + w_b - G, 0.0))
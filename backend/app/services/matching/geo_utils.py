@@ -27,6 +27,18 @@ def haversine_km(coord1: Tuple[float, float], coord2: Tuple[float, float]) -> fl
     return float(R * c)
 
 
+def haversine_km_array(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Vectorized Haversine distance in kilometers.
+    Inputs are array-likes in decimal degrees and broadcast against each other,
+    e.g. lat1[:, None] vs lat2[None, :] yields a full distance matrix.
+    """
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
 def travel_time_minutes(coord1: Tuple[float, float], coord2: Tuple[float, float], speed_kmph: float = 25.0) -> float:
     """
     Calculate travel time between two points given a speed.
@@ -52,6 +64,21 @@ def random_point(center: Tuple[float, float], radius_km: float) -> Tuple[float,
     return (center_lat + lat_offset, center_lon + lon_offset)
 
 
+def random_points(center: Tuple[float, float], radius_km: float, n: int,
+                  rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized random_point: n points uniform in a circular radius of a center point.
+    Returns (lat, lon) arrays.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    bearing = rng.random(n) * 2 * math.pi
+    r = radius_km * np.sqrt(rng.random(n))
+    center_lat, center_lon = center
+    lat = center_lat + r * np.sin(bearing) / 111.0
+    lon = center_lon + r * np.cos(bearing) / (111.0 * math.cos(math.radians(center_lat)))
+    return lat, lon
+
+
 def random_point_clustered(center: Tuple[float, float], radius_km: float, cluster_factor: float = 0.3) -> Tuple[float, float]:
     """
     Generate a random point with clustering tendency (for restaurant hotspots).
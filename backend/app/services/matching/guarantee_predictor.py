@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
 
 
 class GuaranteePredictor:
@@ -10,11 +11,18 @@ class GuaranteePredictor:
     with smoothing toward the configured initial value.
     """
 
-    def __init__(self, initial_omega: float = 0.25, max_history: int = 50, smoothing: float = 0.2):
+    def __init__(
+        self,
+        initial_omega: float = 0.25,
+        max_history: int = 50,
+        smoothing: float = 0.2,
+        agent_state: Optional["AgentOmegaState"] = None,
+    ):
         self.omega: float = initial_omega
         self.history: List[Tuple[float, float]] = []
         self.max_history = max_history
         self.smoothing = smoothing
+        self.agent_state = agent_state
 
     def update(self, total_work: float, total_active: float) -> None:
         self.history.append((total_work, total_active))
@@ -29,6 +37,16 @@ class GuaranteePredictor:
     def predict(self) -> float:
         return self.omega
 
+    def predict_agents(self, agent_ids: Sequence[int]) -> np.ndarray:
+        """Per-agent omega vector; the global omega for everyone when no per-agent state is attached."""
+        if self.agent_state is None:
+            return np.full(len(agent_ids), self.omega)
+        return self.agent_state.omegas_for(agent_ids)
+
+    def update_agents(self, agent_ids: Sequence[int], work_hours: np.ndarray, active_hours: np.ndarray) -> None:
+        if self.agent_state is not None:
+            self.agent_state.update(agent_ids, work_hours, active_hours)
+
     def _average_ratio(self) -> float:
         if not self.history:
             return self.omega
@@ -42,3 +60,49 @@ class GuaranteePredictor:
         return sum(ratios) / len(ratios)
 
 
+class AgentOmegaState:
+    """
+    Compact per-agent EMA state for personalized omega.
+    Agent ids map to rows of a float32 array; reads and updates are bulk
+    array operations over all agents in a batch, never per-agent DB writes.
+    """
+
+    def __init__(self, initial_omega: float = 0.25, alpha: float = 0.2, omega_min: float = 0.05, omega_max: float = 0.9):
+        self.initial_omega = initial_omega
+        self.alpha = alpha
+        self.omega_min = omega_min
+        self.omega_max = omega_max
+        self._row: Dict[int, int] = {}
+        self.omega = np.empty(0, dtype=np.float32)
+        self.snapshot_version: Optional[int] = None
+
+    def _rows_for(self, agent_ids: Sequence[int]) -> np.ndarray:
+        new_ids = [a for a in dict.fromkeys(agent_ids) if a not in self._row]
+        if new_ids:
+            start = len(self.omega)
+            for offset, agent_id in enumerate(new_ids):
+                self._row[agent_id] = start + offset
+            self.omega = np.concatenate([self.omega, np.full(len(new_ids), self.initial_omega, dtype=np.float32)])
+        return np.fromiter((self._row[a] for a in agent_ids), dtype=np.int64, count=len(agent_ids))
+
+    def omegas_for(self, agent_ids: Sequence[int]) -> np.ndarray:
+        """Current omega per agent (initial omega for unseen agents), aligned with agent_ids."""
+        rows = self._rows_for(agent_ids)
+        return self.omega[rows].astype(float)
+
+    def update(self, agent_ids: Sequence[int], work_hours: np.ndarray, active_hours: np.ndarray) -> None:
+        """Bulk EMA step toward each agent's observed W/A ratio; agents with A == 0 keep their omega."""
+        rows = self._rows_for(agent_ids)
+        prev = self.omega[rows].astype(float)
+        observed = np.divide(work_hours, active_hours, out=prev.copy(), where=active_hours > 0)
+        target = np.clip(observed, self.omega_min, self.omega_max)
+        self.omega[rows] = (1.0 - self.alpha) * prev + self.alpha * target
+
+    def apply_snapshot(self, snapshot: dict) -> None:
+        """Overwrite omegas from a g-value-service snapshot ({"version", "agent_ids", "omega", ...})."""
+        if not snapshot or snapshot.get("version") == self.snapshot_version:
+            return
+        rows = self._rows_for([int(a) for a in snapshot["agent_ids"]])
+        self.omega[rows] = np.asarray(snapshot["omega"], dtype=np.float32)
+        self.snapshot_version = snapshot.get("version")
+
@@ -4,7 +4,7 @@ Handles order batching, assignment, and execution
 """
 from __future__ import annotations
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
@@ -33,11 +33,13 @@ class BatchProcessor:
             }
         )
 
-    async def process_batch(self) -> Dict:
+    async def process_batch(self, now: Optional[datetime] = None) -> Dict:
         """
         Main batch processing function - runs every BATCH_WINDOW_MINUTES
+        now: end of the batch window (UTC); defaults to the current time.
+        Replays pass a virtual clock here instead of waiting on real timers.
         """
-        batch_start = datetime.utcnow()
+        batch_start = now or datetime.utcnow()
         window_start = batch_start - timedelta(minutes=settings.BATCH_WINDOW_MINUTES)
         logger.info(f"Starting batch processing at {batch_start}")
 
@@ -63,6 +65,10 @@ class BatchProcessor:
             }
         logger.info(f"Found {len(available_agents)} available agents")
 
+        # One snapshot read per batch (never per agent) when omegas come from g-value-service
+        if settings.G_VALUE_SOURCE == "service":
+            await self._load_g_snapshot()
+
         # Run assignment algorithm
         assignments = self.assignment_engine.assign_batch(
             available_agents=available_agents, pending_orders=pending_orders, db=self.db
@@ -78,6 +84,8 @@ class BatchProcessor:
 
         # Update guarantee predictor
         self.assignment_engine.update_predictor(available_agents)
+        if settings.G_VALUE_SOURCE == "service":
+            await self._push_g_state(available_agents)
 
         # Save batch record
         await self._save_batch_record(
@@ -87,6 +95,7 @@ class BatchProcessor:
             total_orders=len(pending_orders),
             assigned_orders=assigned_count,
             guarantee_ratio=self.assignment_engine.guarantee_predictor.predict(),
+            created_at=batch_start,
         )
 
         logger.info(f"Batch processing complete: {assigned_count}/{len(pending_orders)} orders assigned")
@@ -99,6 +108,34 @@ class BatchProcessor:
             "guarantee_ratio": self.assignment_engine.guarantee_predictor.predict(),
         }
 
+    async def _load_g_snapshot(self) -> None:
+        """Apply the latest g-value-service snapshot to the per-agent omega state; keep local state on failure."""
+        try:
+            from app.services.redis_client import cache_get
+            snapshot = await cache_get(settings.G_SNAPSHOT_KEY)
+        except Exception as e:
+            logger.warning(f"G-value snapshot unavailable, using local omega state: {e}")
+            return
+        agent_state = self.assignment_engine.guarantee_predictor.agent_state
+        if snapshot and agent_state is not None:
+            agent_state.apply_snapshot(snapshot)
+
+    async def _push_g_state(self, agents: List[Agent]) -> None:
+        """Send this window's agent state to g-value-service; the next batch reads the snapshot it publishes."""
+        try:
+            from app.services.g_value_client import refresh_g_values
+            result = await refresh_g_values(
+                [a.id for a in agents],
+                [float(a.work_hours or 0.0) for a in agents],
+                [float(a.active_hours or 0.0) for a in agents],
+                timeout=settings.G_VALUE_REFRESH_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"G-value refresh failed, next batch keeps the current omegas: {e}")
+            return
+        if not result.get("published", True):
+            logger.warning(f"G-value snapshot version {result.get('version')} was not published")
+
     async def _get_pending_orders(self, window_start: datetime, window_end: datetime) -> List[Order]:
         """Get orders that are pending assignment in the time window"""
         # Using generic 'pending' state as placeholder for PENDING_BATCH
@@ -171,6 +208,7 @@ class BatchProcessor:
         total_orders: int,
         assigned_orders: int,
         guarantee_ratio: float,
+        created_at: datetime,
     ):
         """Save batch processing record for analytics"""
         batch_record = BatchAssignment(
@@ -181,7 +219,7 @@ class BatchProcessor:
             total_orders=total_orders,
             assigned_orders=assigned_orders,
             guarantee_ratio=guarantee_ratio,
-            created_at=datetime.utcnow(),
+            created_at=created_at,
         )
         self.db.add(batch_record)
         self.db.commit()
@@ -199,25 +237,27 @@ class OrderExecutor:
             return False
         return True
 
-    async def pickup_order(self, order_id: int, agent_id: int) -> bool:
+    async def pickup_order(self, order_id: int, agent_id: int, now: Optional[datetime] = None) -> bool:
         order = self.db.query(Order).filter(Order.id == order_id).first()
         agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
         if not order or order.assigned_agent_id != agent_id:
             return False
         order.status = "picked_up"
-        order.picked_up_at = datetime.utcnow()
+        order.picked_up_at = now or datetime.utcnow()
         # Optionally update agent location to pickup (not available in this generic schema)
         agent.status = "delivering"
         self.db.commit()
         return True
 
-    async def deliver_order(self, order_id: int, agent_id: int, actual_work_hours: float) -> bool:
+    async def deliver_order(
+        self, order_id: int, agent_id: int, actual_work_hours: float, now: Optional[datetime] = None
+    ) -> bool:
         order = self.db.query(Order).filter(Order.id == order_id).first()
         agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
         if not order or order.assigned_agent_id != agent_id:
             return False
         order.status = "delivered"
-        order.delivered_at = datetime.utcnow()
+        order.delivered_at = now or datetime.utcnow()
         order.actual_work_hours = actual_work_hours
         agent.work_hours = float(agent.work_hours or 0.0) + float(actual_work_hours or 0.0)
         # Update earnings_total
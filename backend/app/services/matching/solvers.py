@@ -0,0 +1,164 @@
+"""
+Assignment solvers for a batch's agent x order cost matrix.
+
+Every solver takes the (n_agents, n_orders) Equation 3 cost matrix and
+returns (rows, cols): matched agent and order positions. All of them
+assign min(n_agents, n_orders) pairs; only the total cost differs.
+
+- hungarian: square-padded linear_sum_assignment (the original path)
+- rectangular: linear_sum_assignment on the unpadded matrix; same optimum
+- sparse_knn: exact min-cost matching over the k-NN candidate graph
+- components: the k-NN graph split into connected components, each solved exactly
+- greedy: cheapest remaining pair first; fast, not optimal
+
+The k-NN graph keeps each agent's k nearest orders and each order's k
+nearest agents by `proximity` (the w_b work-hours matrix; costs if not
+given). Equation 3 costs are a poor neighbour key: every agent below its
+guarantee has cost 0 for all orders. Agents and orders the sparse graph
+leaves unmatched are then matched densely among themselves.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, min_weight_full_bipartite_matching
+
+UNASSIGNED_COST = 1e6
+DEFAULT_KNN = 10
+
+Matching = Tuple[np.ndarray, np.ndarray]
+
+
+def _empty() -> Matching:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+
+def solve_hungarian(costs: np.ndarray, **_) -> Matching:
+    n_agents, n_orders = costs.shape
+    n = max(n_agents, n_orders)
+    padded = np.full((n, n), fill_value=UNASSIGNED_COST, dtype=float)
+    padded[:n_agents, :n_orders] = costs
+    rows, cols = linear_sum_assignment(padded)
+    keep = (rows < n_agents) & (cols < n_orders)
+    rows, cols = rows[keep], cols[keep]
+    keep = padded[rows, cols] < UNASSIGNED_COST
+    return rows[keep], cols[keep]
+
+
+def solve_rectangular(costs: np.ndarray, **_) -> Matching:
+    rows, cols = linear_sum_assignment(costs)
+    return rows.astype(np.int64), cols.astype(np.int64)
+
+
+def knn_edges(proximity: np.ndarray, k: int = DEFAULT_KNN) -> Tuple[np.ndarray, np.ndarray]:
+    """(agent, order) pairs kept by the k-NN graph: each agent's and each order's k nearest partners."""
+    n_agents, n_orders = proximity.shape
+    ka, ko = min(k, n_orders), min(k, n_agents)
+    agent_best = np.argpartition(proximity, ka - 1, axis=1)[:, :ka]
+    order_best = np.argpartition(proximity, ko - 1, axis=0)[:ko, :]
+    rows = np.concatenate([np.repeat(np.arange(n_agents), ka), order_best.ravel()])
+    cols = np.concatenate([agent_best.ravel(), np.tile(np.arange(n_orders), ko)])
+    pairs = np.unique(rows * n_orders + cols)
+    return pairs // n_orders, pairs % n_orders
+
+
+def _sparse_matching(costs: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> Matching:
+    """
+    Min-cost maximum matching restricted to the given edges. The smaller side
+    gets one private dummy partner at UNASSIGNED_COST so a full matching always
+    exists; weights are shifted by +1 because the sparse solver drops zeros.
+    """
+    n_agents, n_orders = costs.shape
+    weights = costs[rows, cols] + 1.0
+    transpose = n_agents > n_orders
+    if transpose:
+        rows, cols, n_rows, n_cols = cols, rows, n_orders, n_agents
+    else:
+        n_rows, n_cols = n_agents, n_orders
+    dummy = np.arange(n_rows)
+    graph = csr_matrix(
+        (np.concatenate([weights, np.full(n_rows, UNASSIGNED_COST)]),
+         (np.concatenate([rows, dummy]), np.concatenate([cols, n_cols + dummy]))),
+        shape=(n_rows, n_cols + n_rows),
+    )
+    match_rows, match_cols = min_weight_full_bipartite_matching(graph)
+    keep = match_cols < n_cols
+    match_rows, match_cols = match_rows[keep].astype(np.int64), match_cols[keep].astype(np.int64)
+    return (match_cols, match_rows) if transpose else (match_rows, match_cols)
+
+
+def _with_leftovers(costs: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> Matching:
+    """Add a dense solve over the agents and orders that (rows, cols) left unmatched."""
+    free_agents = np.setdiff1d(np.arange(costs.shape[0]), rows)
+    free_orders = np.setdiff1d(np.arange(costs.shape[1]), cols)
+    if len(free_agents) == 0 or len(free_orders) == 0:
+        return rows, cols
+    r, c = linear_sum_assignment(costs[np.ix_(free_agents, free_orders)])
+    return np.concatenate([rows, free_agents[r]]), np.concatenate([cols, free_orders[c]])
+
+
+def solve_sparse_knn(costs: np.ndarray, k: int = DEFAULT_KNN, proximity: Optional[np.ndarray] = None, **_) -> Matching:
+    rows, cols = knn_edges(costs if proximity is None else proximity, k)
+    return _with_leftovers(costs, *_sparse_matching(costs, rows, cols))
+
+
+def solve_components(costs: np.ndarray, k: int = DEFAULT_KNN, proximity: Optional[np.ndarray] = None, **_) -> Matching:
+    """Exact rectangular solve per connected component of the k-NN graph (dense costs inside a component)."""
+    n_agents, n_orders = costs.shape
+    rows, cols = knn_edges(costs if proximity is None else proximity, k)
+    graph = csr_matrix((np.ones(len(rows)), (rows, n_agents + cols)), shape=(n_agents + n_orders,) * 2)
+    n_components, labels = connected_components(graph, directed=False)
+    agent_label, order_label = labels[:n_agents], labels[n_agents:]
+    out_rows, out_cols = [], []
+    for component in range(n_components):
+        agents = np.flatnonzero(agent_label == component)
+        orders = np.flatnonzero(order_label == component)
+        if len(agents) == 0 or len(orders) == 0:
+            continue
+        r, c = linear_sum_assignment(costs[np.ix_(agents, orders)])
+        out_rows.append(agents[r])
+        out_cols.append(orders[c])
+    if not out_rows:
+        return _with_leftovers(costs, *_empty())
+    return _with_leftovers(costs, np.concatenate(out_rows), np.concatenate(out_cols))
+
+
+def solve_greedy(costs: np.ndarray, **_) -> Matching:
+    n_agents, n_orders = costs.shape
+    target = min(n_agents, n_orders)
+    order = np.argsort(costs, axis=None, kind="stable")
+    agent_used = bytearray(n_agents)
+    order_used = bytearray(n_orders)
+    out_rows, out_cols = [], []
+    for r, c in zip((order // n_orders).tolist(), (order % n_orders).tolist()):
+        if agent_used[r] or order_used[c]:
+            continue
+        agent_used[r] = order_used[c] = 1
+        out_rows.append(r)
+        out_cols.append(c)
+        if len(out_rows) == target:
+            break
+    return np.array(out_rows, dtype=np.int64), np.array(out_cols, dtype=np.int64)
+
+
+KNN_SOLVERS = ("sparse_knn", "components")  # solvers that use k and proximity
+
+SOLVERS: Dict[str, Callable[..., Matching]] = {
+    "hungarian": solve_hungarian,
+    "rectangular": solve_rectangular,
+    "sparse_knn": solve_sparse_knn,
+    "components": solve_components,
+    "greedy": solve_greedy,
+}
+
+
+def solve(costs: np.ndarray, solver: str = "hungarian", k: int = DEFAULT_KNN,
+          proximity: Optional[np.ndarray] = None) -> Matching:
+    """Match agents (rows) to orders (columns) of `costs` with the named solver."""
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown matching solver {solver!r}; expected one of {sorted(SOLVERS)}")
+    if costs.size == 0:
+        return _empty()
+    return SOLVERS[solver](costs, k=k, proximity=proximity)
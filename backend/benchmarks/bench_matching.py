@@ -0,0 +1,212 @@
+"""
+Benchmarks for the matching subsystem.
+
+Times geo_utils distance matrices, CostCalculator, the Hungarian solve,
+the per-agent omega state and end-to-end AssignmentEngine.assign_batch on
+synthetic batches (benchmarks/synthetic.py), and records each one's peak
+traced memory (tracemalloc sees Python and NumPy allocations, not the
+solver's native workspace). A batch of size N has N pending orders and
+N * AGENT_RATIO available agents.
+
+Results can be saved as a JSON baseline and later runs compared against
+it; the run fails (exit code 1) when a benchmark's median time grows by
+more than the threshold. Baselines are machine-specific: save and compare
+on the same host.
+
+Usage (from backend/):
+    python benchmarks/bench_matching.py --save benchmarks/baseline.json
+    python benchmarks/bench_matching.py --compare benchmarks/baseline.json --threshold 0.25
+    python benchmarks/bench_matching.py --sizes 100,1000 --only cost_matrix
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import scipy
+from scipy.optimize import linear_sum_assignment
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.matching.assignment_engine import AssignmentEngine
+from app.services.matching.cost_calculator import CostCalculator
+from app.services.matching.geo_utils import haversine_km_array
+from app.services.matching.guarantee_predictor import AgentOmegaState
+from benchmarks.synthetic import make_batch
+
+DEFAULT_SIZES = (100, 1000, 5000, 10000)
+AGENT_RATIO = 0.5
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_SEC = 0.001  # differences below this are timer noise, never regressions
+TIME_BUDGET_SEC = 2.0  # per benchmark and size, after the first run
+MAX_REPEATS = 7
+
+
+def _calculator(agents):
+    return CostCalculator(
+        db=None,
+        guarantee_ratio=np.full(len(agents), settings.INITIAL_GUARANTEE_RATIO),
+        prep_time_minutes=settings.PREP_TIME_MINUTES,
+        speed_kmph=settings.AGENT_SPEED_KMPH,
+    )
+
+
+def bench_haversine_matrix(agents, orders):
+    agent_lat = np.array([a.last_location_lat for a in agents])
+    agent_lon = np.array([a.last_location_lon for a in agents])
+    pickup_lat = np.array([o.pickup_lat for o in orders])
+    pickup_lng = np.array([o.pickup_lng for o in orders])
+    return lambda: haversine_km_array(agent_lat[:, None], agent_lon[:, None], pickup_lat[None, :], pickup_lng[None, :])
+
+
+def bench_cost_matrix(agents, orders):
+    calculator = _calculator(agents)
+    return lambda: calculator.compute_cost_matrix(agents, orders)
+
+
+def bench_hungarian_solve(agents, orders):
+    # The same square padding as AssignmentEngine.assign_batch
+    costs = _calculator(agents).compute_cost_matrix(agents, orders)
+    n = max(costs.shape)
+    padded = np.full((n, n), fill_value=1e6, dtype=float)
+    padded[:costs.shape[0], :costs.shape[1]] = costs
+    return lambda: linear_sum_assignment(padded)
+
+
+def bench_omega_state(agents, orders):
+    agent_ids = [a.id for a in agents]
+    work = np.array([a.work_hours for a in agents])
+    active = np.array([a.active_hours for a in agents])
+
+    def run():
+        state = AgentOmegaState(initial_omega=settings.INITIAL_GUARANTEE_RATIO, alpha=settings.OMEGA_EMA_ALPHA)
+        state.omegas_for(agent_ids)
+        state.update(agent_ids, work, active)
+    return run
+
+
+def bench_assign_batch(agents, orders):
+    engine = AssignmentEngine({"economics": {"use_dynamic_guarantee": False}})
+    return lambda: engine.assign_batch(available_agents=agents, pending_orders=orders)
+
+
+BENCHMARKS = {
+    "haversine_matrix": bench_haversine_matrix,
+    "cost_matrix": bench_cost_matrix,
+    "hungarian_solve": bench_hungarian_solve,
+    "omega_state": bench_omega_state,
+    "assign_batch": bench_assign_batch,
+}
+
+
+def measure(fn):
+    """Median/min wall time over up to MAX_REPEATS runs within TIME_BUDGET_SEC, plus traced peak memory of one run."""
+    start = time.perf_counter()
+    fn()
+    times = [time.perf_counter() - start]
+    repeats = int(min(MAX_REPEATS - 1, TIME_BUDGET_SEC // max(times[0], 1e-9)))
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "repeats": len(times),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, only=None, seed=0):
+    """{"<benchmark>[<size>]": measurement} for every selected benchmark and size."""
+    pattern = re.compile(only) if only else None
+    results = {}
+    for size in sizes:
+        agents, orders = make_batch(size, max(1, int(size * AGENT_RATIO)), seed=seed)
+        for name, setup in BENCHMARKS.items():
+            if pattern and not pattern.search(name):
+                continue
+            key = f"{name}[{size}]"
+            results[key] = measure(setup(agents, orders))
+            r = results[key]
+            print(f"  {key:<28} {r['median_s'] * 1000:>11.2f} ms  (min {r['min_s'] * 1000:.2f}, "
+                  f"n={r['repeats']})  peak {r['peak_mb']:>8.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Benchmarks whose median time grew by more than threshold (and MIN_DELTA_SEC) over the baseline."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        delta = current["median_s"] - base["median_s"]
+        ratio = current["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+        status = "ok"
+        if ratio > 1 + threshold and delta > MIN_DELTA_SEC:
+            status = "REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<28} {base['median_s'] * 1000:>11.2f} -> {current['median_s'] * 1000:>11.2f} ms  "
+              f"({ratio - 1:+.1%})  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the matching subsystem")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated batch sizes (orders per batch)")
+    parser.add_argument("--only", default=None, help=f"regex over benchmark names: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", default=None, help="write results as a JSON baseline")
+    parser.add_argument("--compare", default=None, help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown before a benchmark fails")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    print(f"[BENCH] sizes {sizes}, {AGENT_RATIO:g} agents per order")
+    results = run_benchmarks(sizes, only=args.only, seed=args.seed)
+
+    if args.save:
+        payload = {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "machine": {"python": platform.python_version(), "numpy": np.__version__, "scipy": scipy.__version__,
+                        "platform": platform.platform(), "processor": platform.processor()},
+            "seed": args.seed,
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(payload, f, indent=2)
+        print(f"[BENCH] baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"[BENCH] comparing with {args.compare} (threshold {args.threshold:.0%})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"[BENCH] {len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("[BENCH] no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
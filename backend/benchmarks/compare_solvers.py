@@ -0,0 +1,166 @@
+"""
+Solver comparison for the matching step.
+
+Runs the same batches through every solver in app.services.matching.solvers
+and reports, per solver: solve wall time, peak traced memory, total
+Equation 3 cost, assigned orders and the optimality gap against the
+padded Hungarian solve. Cost matrices are built once per batch with
+CostCalculator, exactly as AssignmentEngine.assign_batch does.
+
+Batches come from replay snapshots (scripts/replay_work4food.py --snapshots)
+and/or synthetic batches (benchmarks/synthetic.py) over a grid of sizes
+(orders per batch) and densities (available agents per order).
+
+Usage (from backend/):
+    python scripts/replay_work4food.py --orders orders.csv --workers workers.csv --agents 400 --snapshots snapshots/
+    python benchmarks/compare_solvers.py --snapshots snapshots/ --sizes 100,1000 --densities 0.25,0.5,1.0 --out solvers.csv
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.matching.cost_calculator import CostCalculator
+from app.services.matching.solvers import DEFAULT_KNN, SOLVERS, solve
+from benchmarks.snapshots import load_snapshot, snapshot_paths
+from benchmarks.synthetic import make_batch
+
+REFERENCE_SOLVER = "hungarian"
+RESULT_FIELDS = [
+    "source", "size", "density", "batch", "solver", "agents", "orders",
+    "solve_ms", "peak_mb", "total_cost", "assigned", "gap",
+]
+
+
+def batch_matrices(agents, orders, omegas):
+    """(Equation 3 costs, w_b) for one batch."""
+    calculator = CostCalculator(
+        db=None, guarantee_ratio=omegas,
+        prep_time_minutes=settings.PREP_TIME_MINUTES, speed_kmph=settings.AGENT_SPEED_KMPH,
+    )
+    w_b = calculator.work_hours_matrix(agents, orders)
+    return calculator.compute_cost_matrix(agents, orders, w_b=w_b), w_b
+
+
+def run_solvers(costs, w_b, solvers, k=DEFAULT_KNN):
+    """{solver: measurement} for one cost matrix; the reference solver runs first."""
+    results = {}
+    for name in [REFERENCE_SOLVER] + [s for s in solvers if s != REFERENCE_SOLVER]:
+        start = time.perf_counter()
+        rows, cols = solve(costs, name, k=k, proximity=w_b)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            solve(costs, name, k=k, proximity=w_b)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results[name] = {
+            "solve_ms": elapsed * 1000.0,
+            "peak_mb": peak / 2**20,
+            "total_cost": float(costs[rows, cols].sum()),
+            "assigned": len(rows),
+        }
+    ref = results[REFERENCE_SOLVER]["total_cost"]
+    for r in results.values():
+        r["gap"] = r["total_cost"] / ref - 1.0 if ref > 0 else (0.0 if r["total_cost"] == 0 else float("inf"))
+    if REFERENCE_SOLVER not in solvers:
+        del results[REFERENCE_SOLVER]
+    return results
+
+
+def iter_batches(snapshot_dir=None, sizes=(), densities=(), seed=0):
+    """(source, size, density, batch index, agents, orders, omegas) for every batch to compare."""
+    if snapshot_dir:
+        for i, path in enumerate(snapshot_paths(snapshot_dir)):
+            agents, orders, omegas = load_snapshot(path)
+            yield "replay", "all", "all", i, agents, orders, omegas
+    for size in sizes:
+        for density in densities:
+            agents, orders = make_batch(size, max(1, int(round(size * density))), seed=seed)
+            yield "synthetic", size, density, 0, agents, orders, np.full(len(agents), settings.INITIAL_GUARANTEE_RATIO)
+
+
+def summarize(rows):
+    """One line per (source, size, density, solver): summed time/cost/assignments, max memory, gap of the sums."""
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row["source"], row["size"], row["density"], row["solver"])].append(row)
+    reference = {
+        key[:3]: sum(r["total_cost"] for r in group)
+        for key, group in groups.items() if key[3] == REFERENCE_SOLVER
+    }
+    table = []
+    for (source, size, density, solver), group in groups.items():
+        cost = sum(r["total_cost"] for r in group)
+        ref = reference.get((source, size, density))
+        table.append({
+            "source": source, "size": size, "density": density, "solver": solver, "batches": len(group),
+            "solve_ms": sum(r["solve_ms"] for r in group),
+            "peak_mb": max(r["peak_mb"] for r in group),
+            "total_cost": cost,
+            "assigned": sum(r["assigned"] for r in group),
+            "gap": cost / ref - 1.0 if ref else float("nan"),
+        })
+    return table
+
+
+def print_table(table):
+    header = f"{'source':<10} {'size':>6} {'density':>7} {'solver':<12} {'batches':>7} {'solve ms':>11} " \
+             f"{'peak MB':>8} {'Eq.3 cost':>11} {'assigned':>8} {'gap':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in table:
+        print(f"{r['source']:<10} {str(r['size']):>6} {str(r['density']):>7} {r['solver']:<12} {r['batches']:>7} "
+              f"{r['solve_ms']:>11.1f} {r['peak_mb']:>8.1f} {r['total_cost']:>11.2f} {r['assigned']:>8} {r['gap']:>+8.2%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare matching solvers on recorded and synthetic batches")
+    parser.add_argument("--snapshots", default=None, help="directory of replay batch snapshots")
+    parser.add_argument("--sizes", default="100,1000", help="synthetic batch sizes (orders); empty for none")
+    parser.add_argument("--densities", default="0.25,0.5,1.0", help="synthetic available agents per order")
+    parser.add_argument("--solvers", default=",".join(SOLVERS), help=f"subset of {', '.join(SOLVERS)}")
+    parser.add_argument("--knn", type=int, default=DEFAULT_KNN, help="candidates per agent/order for k-NN solvers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write one CSV row per batch and solver")
+    args = parser.parse_args(argv)
+
+    solvers = [s for s in args.solvers.split(",") if s]
+    unknown = sorted(set(solvers) - set(SOLVERS))
+    if unknown:
+        parser.error(f"unknown solvers: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    densities = [float(d) for d in args.densities.split(",") if d]
+
+    rows = []
+    for source, size, density, batch, agents, orders, omegas in iter_batches(args.snapshots, sizes, densities, args.seed):
+        costs, w_b = batch_matrices(agents, orders, omegas)
+        for solver, result in run_solvers(costs, w_b, solvers, k=args.knn).items():
+            rows.append({
+                "source": source, "size": size, "density": density, "batch": batch, "solver": solver,
+                "agents": len(agents), "orders": len(orders), **result,
+            })
+    if not rows:
+        parser.error("nothing to compare: pass --snapshots and/or --sizes")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    print_table(summarize(rows))
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+HTTP load test for the FastAPI app.
+
+Virtual users run mixed scenarios in closed loops (each user waits for its
+previous request, plus optional think time) and every request's latency is
+recorded under its route template. The report gives requests, errors,
+throughput and latency percentiles per endpoint.
+
+Scenarios:
+- browse: list restaurants near the user, then open one
+- order:  place a customer order, then poll the active order
+- agent:  list the agent's assigned orders, then accept, pick up and deliver one
+
+By default the app runs in process (httpx.ASGITransport) on a fresh SQLite
+file, so no server or lifespan runs and the batch scheduler stays off.
+With --url the requests go to a running server instead. The data is still
+seeded directly into the app's database (DATABASE_URL, or --db), so point
+the server at the same database. Seeding writes in bulk with one shared
+password hash, and tokens are minted with the app's SECRET_KEY. No login
+or bcrypt happens during the run.
+
+The agent routes act as the first agent in the database (see
+routers/agents.get_current_agent). The run feeds that agent small batches
+of assigned WORK4FOOD orders as the agent scenario uses them up.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --users 20 --duration 30 --mix browse=5,order=3,agent=2
+    python benchmarks/load_test.py --url http://localhost:8000 --db delivery.db --users 50 --out load.csv
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ("browse", "order", "agent")
+DEFAULT_MIX = "browse=5,order=3,agent=2"
+AGENT_FEED_BATCH = 50
+RESULT_FIELDS = ["endpoint", "requests", "errors", "rps", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+
+
+def parse_mix(text):
+    """{"browse": 5, ...} from "browse=5,order=3"; unknown scenarios raise ValueError."""
+    mix = {}
+    for part in text.split(","):
+        if not part:
+            continue
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The scenario mix needs at least one positive weight")
+    return mix
+
+
+class Recorder:
+    """Latency samples, error counts and status codes per endpoint name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, method, endpoint, url, **kwargs):
+        """Send one request and record it under `endpoint`; None on transport errors."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.errors[endpoint] += 1
+            self.statuses[endpoint][type(e).__name__] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed):
+        """One row per endpoint, sorted by name; latencies in milliseconds."""
+        rows = []
+        for endpoint in sorted(self.latencies):
+            ms = np.array(self.latencies[endpoint]) * 1000.0
+            rows.append({
+                "endpoint": endpoint,
+                "requests": len(ms),
+                "errors": self.errors[endpoint],
+                "rps": len(ms) / elapsed if elapsed > 0 else 0.0,
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p90_ms": float(np.percentile(ms, 90)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+            })
+        return rows
+
+
+def seed_load_data(Session, n_customers, n_restaurants, seed=0):
+    """
+    Customers, restaurants and one online agent, added in bulk with a single
+    password hash. Returns (customer ids, restaurant ids, acting agent id).
+    """
+    from app.core.config import settings
+    from app.models import models
+    from app.services.auth_service import hash_password
+    from app.services.matching.geo_utils import random_points
+
+    rng = np.random.default_rng(seed)
+    center = (settings.CITY_CENTER_LAT, settings.CITY_CENTER_LON)
+    run = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    password = hash_password("loadtest")
+    db = Session()
+    try:
+        lat, lng = random_points(center, settings.CITY_RADIUS_KM, n_customers, rng)
+        customers = [
+            models.User(username=f"load_{run}_customer_{i}", hashed_password=password, role="customer",
+                        lat=float(lat[i]), lng=float(lng[i]))
+            for i in range(n_customers)
+        ]
+        agent_user = models.User(username=f"load_{run}_agent", hashed_password=password, role="agent", is_agent=True)
+        db.add_all(customers + [agent_user])
+
+        lat, lng = random_points(center, settings.CITY_RADIUS_KM, n_restaurants, rng)
+        cuisines = ["Indian", "Chinese", "Italian", "Mexican", "Thai", "Cafe"]
+        restaurants = [
+            models.Restaurant(name=f"Load Test Kitchen {i}", cuisine_type=cuisines[i % len(cuisines)],
+                              address=f"{i} Load Test Road", lat=float(lat[i]), lng=float(lng[i]), is_active=True)
+            for i in range(n_restaurants)
+        ]
+        db.add_all(restaurants)
+        db.flush()
+        db.add(models.Agent(
+            user_id=agent_user.id, active=True, online=True,
+            last_location={"lat": center[0], "lng": center[1]},
+            last_location_lat=center[0], last_location_lon=center[1],
+            status=models.AgentStatus.available,
+        ))
+        db.commit()
+        agent_id = db.query(models.Agent).first().id  # the agent the agent routes act as
+        return [u.id for u in customers], [r.id for r in restaurants], agent_id
+    finally:
+        db.close()
+
+
+class AgentOrderFeed:
+    """Assigned WORK4FOOD orders for the agent scenario, inserted AGENT_FEED_BATCH at a time as they run out."""
+
+    def __init__(self, Session, agent_id, seed=0):
+        self.Session = Session
+        self.agent_id = agent_id
+        self.rng = np.random.default_rng(seed)
+        self.queue = deque()
+        self.lock = asyncio.Lock()
+
+    def _insert(self):
+        from app.core.config import settings
+        from app.models import models
+        from app.services.matching.geo_utils import random_points
+
+        center = (settings.CITY_CENTER_LAT, settings.CITY_CENTER_LON)
+        pickup_lat, pickup_lng = random_points(center, settings.CITY_RADIUS_KM, AGENT_FEED_BATCH, self.rng)
+        drop_lat, drop_lng = random_points(center, settings.CITY_RADIUS_KM, AGENT_FEED_BATCH, self.rng)
+        now = datetime.utcnow()
+        db = self.Session()
+        try:
+            orders = [
+                models.Order(user_id=0, pickup_lat=float(pickup_lat[i]), pickup_lng=float(pickup_lng[i]),
+                             drop_lat=float(drop_lat[i]), drop_lng=float(drop_lng[i]), status="assigned",
+                             assigned_agent_id=self.agent_id, assigned_at=now, batch_window_start=now,
+                             estimated_work_hours=0.5)
+                for i in range(AGENT_FEED_BATCH)
+            ]
+            db.add_all(orders)
+            db.commit()
+            return [o.id for o in orders]
+        finally:
+            db.close()
+
+    async def next(self):
+        async with self.lock:
+            if not self.queue:
+                self.queue.extend(await asyncio.to_thread(self._insert))
+            return self.queue.popleft()
+
+
+class VirtualUser:
+    """One customer's session running scenarios from the mix until the deadline."""
+
+    def __init__(self, client, recorder, customer_id, restaurant_ids, feed, rng, think_time=0.0):
+        from app.core.config import settings
+        from app.services.auth_service import create_access_token
+
+        self.client = client
+        self.recorder = recorder
+        self.restaurant_ids = restaurant_ids
+        self.feed = feed
+        self.rng = rng
+        self.think_time = think_time
+        self.headers = {"Authorization": f"Bearer {create_access_token(subject=customer_id)}"}
+        self.center = (settings.CITY_CENTER_LAT, settings.CITY_CENTER_LON)
+        self.polls = 3
+
+    def _near(self, spread_deg=0.05):
+        return (self.center[0] + self.rng.uniform(-spread_deg, spread_deg),
+                self.center[1] + self.rng.uniform(-spread_deg, spread_deg))
+
+    async def _get(self, endpoint, url, **kwargs):
+        return await self.recorder.request(self.client, "GET", endpoint, url, headers=self.headers, **kwargs)
+
+    async def _post(self, endpoint, url, **kwargs):
+        return await self.recorder.request(self.client, "POST", endpoint, url, headers=self.headers, **kwargs)
+
+    async def browse(self):
+        lat, lng = self._near()
+        await self._get("GET /api/restaurants", "/api/restaurants", params={"lat": lat, "lng": lng})
+        restaurant_id = self.rng.choice(self.restaurant_ids)
+        await self._get("GET /api/restaurants/{id}", f"/api/restaurants/{restaurant_id}")
+
+    async def order(self):
+        lat, lng = self._near()
+        response = await self._post("POST /api/customer/orders", "/api/customer/orders", json={
+            "restaurant_id": self.rng.choice(self.restaurant_ids),
+            "amount": round(self.rng.uniform(5.0, 60.0), 2),
+            "delivery_address": "Load test address",
+            "delivery_lat": lat,
+            "delivery_lng": lng,
+        })
+        if response is None or response.status_code >= 400:
+            return
+        for _ in range(self.polls):
+            await self._get("GET /api/customer/orders/active", "/api/customer/orders/active")
+
+    async def agent(self):
+        order_id = await self.feed.next()
+        await self._get("GET /api/agents/me/assigned-orders", "/api/agents/me/assigned-orders")
+        for step in ("accept", "pickup"):
+            response = await self._post(f"POST /api/agents/orders/{{id}}/{step}", f"/api/agents/orders/{order_id}/{step}")
+            if response is None or response.status_code >= 400:
+                return
+        await self._post("POST /api/agents/orders/{id}/deliver", f"/api/agents/orders/{order_id}/deliver",
+                         json={"actual_work_hours": round(self.rng.uniform(0.2, 1.0), 3)})
+
+    async def run(self, mix, deadline):
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+            if self.think_time:
+                await asyncio.sleep(self.rng.expovariate(1.0 / self.think_time))
+
+
+def print_report(rows, elapsed, statuses):
+    total = sum(r["requests"] for r in rows)
+    errors = sum(r["errors"] for r in rows)
+    print(f"[LOAD] {total} requests in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} req/s), {errors} errors")
+    header = f"{'endpoint':<42} {'requests':>8} {'errors':>6} {'req/s':>8} {'mean ms':>9} " \
+             f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['endpoint']:<42} {r['requests']:>8} {r['errors']:>6} {r['rps']:>8.1f} {r['mean_ms']:>9.1f} "
+              f"{r['p50_ms']:>9.1f} {r['p90_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f}")
+        bad = {code: n for code, n in statuses[r["endpoint"]].items() if not (isinstance(code, int) and code < 400)}
+        if bad:
+            print(f"    errors by status: {', '.join(f'{code}: {n}' for code, n in sorted(bad.items(), key=str))}")
+
+
+async def run_load(url=None, users=10, duration=30.0, mix=None, restaurants=200, think_time=0.0, seed=0):
+    """Seed, run `users` virtual users for `duration` seconds and return (report rows, elapsed, recorder)."""
+    from app.models.database import Base, SessionLocal, engine
+
+    mix = mix or parse_mix(DEFAULT_MIX)
+    Base.metadata.create_all(bind=engine)
+    customer_ids, restaurant_ids, agent_id = seed_load_data(SessionLocal, users, restaurants, seed=seed)
+    print(f"[LOAD] seeded {len(customer_ids)} customers, {len(restaurant_ids)} restaurants; agent {agent_id}")
+
+    if url:
+        transport, base_url = None, url.rstrip("/")
+    else:
+        from app.main import app
+        transport, base_url = httpx.ASGITransport(app=app, raise_app_exceptions=False), "http://loadtest"
+
+    recorder = Recorder()
+    feed = AgentOrderFeed(SessionLocal, agent_id, seed=seed)
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60.0) as client:
+        rng = random.Random(seed)
+        vus = [
+            VirtualUser(client, recorder, customer_id, restaurant_ids, feed, random.Random(rng.random()), think_time)
+            for customer_id in customer_ids
+        ]
+        print(f"[LOAD] {users} users for {duration:g}s against {base_url}, mix {mix}")
+        start = time.perf_counter()
+        await asyncio.gather(*(vu.run(mix, start + duration) for vu in vus))
+        elapsed = time.perf_counter() - start
+    return recorder.report(elapsed), elapsed, recorder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the delivery API with mixed scenarios")
+    parser.add_argument("--url", default=None, help="base URL of a running server; in-process app if omitted")
+    parser.add_argument("--db", default=None,
+                        help="SQLite file to seed (and serve, in process); a temporary file if omitted")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users (one customer each)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario weights over {', '.join(SCENARIOS)}")
+    parser.add_argument("--restaurants", type=int, default=200)
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between scenarios, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="write the per-endpoint report as CSV")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.users < 1 or args.duration <= 0:
+        parser.error("--users and --duration must be positive")
+
+    # app.models.database binds its engine to DATABASE_URL at import, so choose the database first
+    temp_dir = None
+    if args.db:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    elif not args.url:
+        temp_dir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temp_dir.name, 'loadtest.db')}"
+    try:
+        rows, elapsed, recorder = asyncio.run(run_load(
+            url=args.url, users=args.users, duration=args.duration, mix=mix,
+            restaurants=args.restaurants, think_time=args.think, seed=args.seed,
+        ))
+    finally:
+        if temp_dir:
+            from app.models.database import engine
+            engine.dispose()
+            temp_dir.cleanup()
+
+    print_report(rows, elapsed, recorder.statuses)
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
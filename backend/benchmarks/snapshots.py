@@ -0,0 +1,55 @@
+"""
+Recorded matching batches.
+
+A snapshot is one .npz holding exactly what AssignmentEngine.assign_batch
+saw for one batch: agent locations, work/active hours and omegas, and the
+orders' pickup/drop coordinates. scripts/replay_work4food.py --snapshots
+writes them; benchmarks load them back as transient model instances.
+"""
+import glob
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from app.models.models import Agent, Order
+
+
+def save_snapshot(path: str, agents: List[Agent], orders: List[Order], omegas) -> None:
+    np.savez(
+        path,
+        agent_lat=np.array([float(a.last_location_lat or 0.0) for a in agents]),
+        agent_lon=np.array([float(a.last_location_lon or 0.0) for a in agents]),
+        work_hours=np.array([float(a.work_hours or 0.0) for a in agents]),
+        active_hours=np.array([float(a.active_hours or 0.0) for a in agents]),
+        omega=np.asarray(omegas, dtype=float),
+        pickup_lat=np.array([float(o.pickup_lat) for o in orders]),
+        pickup_lng=np.array([float(o.pickup_lng) for o in orders]),
+        drop_lat=np.array([float(o.drop_lat) for o in orders]),
+        drop_lng=np.array([float(o.drop_lng) for o in orders]),
+    )
+
+
+def load_snapshot(path: str) -> Tuple[List[Agent], List[Order], np.ndarray]:
+    """(agents, orders, omegas) for one recorded batch."""
+    with np.load(path) as data:
+        agents = [
+            Agent(id=i + 1, user_id=i + 1, last_location_lat=lat, last_location_lon=lon,
+                  work_hours=w, active_hours=a, status="available")
+            for i, (lat, lon, w, a) in enumerate(zip(
+                data["agent_lat"].tolist(), data["agent_lon"].tolist(),
+                data["work_hours"].tolist(), data["active_hours"].tolist(),
+            ))
+        ]
+        orders = [
+            Order(id=j + 1, user_id=1, status="pending", pickup_lat=plat, pickup_lng=plng, drop_lat=dlat, drop_lng=dlng)
+            for j, (plat, plng, dlat, dlng) in enumerate(zip(
+                data["pickup_lat"].tolist(), data["pickup_lng"].tolist(),
+                data["drop_lat"].tolist(), data["drop_lng"].tolist(),
+            ))
+        ]
+        return agents, orders, data["omega"].copy()
+
+
+def snapshot_paths(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "batch-*.npz")))
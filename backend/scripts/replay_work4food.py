@@ -0,0 +1,380 @@
+"""
+Deterministic WORK4FOOD replay through the real backend matching path.
+
+Orders from a WORK4FOOD orders.csv are inserted into a throwaway SQLite
+database window by window, and the production BatchProcessor.process_batch
+runs on a virtual clock (its `now` argument) at the end of every window,
+so a full day replays in minutes instead of waiting on 3-minute timers.
+Assigned agents are released when their estimated work hours have passed,
+through OrderExecutor.pickup_order/deliver_order, and report the drop-off
+as their new location, as the agent app would.
+
+Each batch records its latency, the number of SQL statements it issued
+(counted with a before_cursor_execute hook), and assignment quality
+(fill rate, mean estimated work hours). With --snapshots every batch's
+assign_batch input is also saved (benchmarks/snapshots.py) for offline
+solver comparisons. The replay depends only on the
+inputs: zone locations use a RandomState per zone, and the per-agent omega
+state is module-global, so run one replay per process.
+
+Usage (from backend/):
+    python scripts/replay_work4food.py --orders ../gpr_ema_simulation/orders.csv \\
+        --workers ../gpr_ema_simulation/workers.csv --agents 80 --hours 24 --out replay_batches.csv
+"""
+import argparse
+import asyncio
+import csv
+import heapq
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.models.database import Base
+from app.models import models
+from app.services.auth_service import hash_password
+from app.services.matching.simulator import BatchProcessor, OrderExecutor
+from benchmarks.snapshots import save_snapshot
+
+CITY_CENTER = (settings.CITY_CENTER_LAT, settings.CITY_CENTER_LON)
+ZONE_RADIUS_KM = 15.0
+BATCH_FIELDS = [
+    "batch", "window_end", "orders", "available_agents", "assigned", "fill_rate",
+    "mean_work_hours", "latency_ms", "queries", "released",
+]
+
+
+def zone_location(zone_id: int, center=CITY_CENTER, radius_km: float = ZONE_RADIUS_KM):
+    """Stable (lat, lon) for a WORK4FOOD zone id; same placement as the gpr_ema_simulation loader."""
+    bearing = np.random.RandomState(int(zone_id)).random_sample() * 2 * math.pi
+    r = (int(zone_id) % 100) / 100.0 * radius_km
+    lat = center[0] + r * math.sin(bearing) / 111.0
+    lon = center[1] + r * math.cos(bearing) / (111.0 * math.cos(math.radians(center[0])))
+    return lat, lon
+
+
+def _is_sorted_by_timestamp(orders_csv, chunksize=1_000_000):
+    """True if the timestamps in orders.csv never go backwards; reads only that column, in chunks."""
+    previous = None
+    for chunk in pd.read_csv(orders_csv, usecols=["timestamp"], parse_dates=["timestamp"], chunksize=chunksize):
+        t = chunk["timestamp"]
+        if not t.is_monotonic_increasing or (previous is not None and t.iloc[0] < previous):
+            return False
+        previous = t.iloc[-1]
+    return True
+
+
+def _stream_window(orders_csv, start, hours, limit):
+    """(timestamp, restaurant_zone, customer_zone) rows of a sorted orders.csv, one row in memory at a time."""
+    end = start + timedelta(hours=hours) if start else None
+    count = 0
+    with open(orders_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            t = datetime.fromisoformat(row["timestamp"])
+            if end is None:
+                start, end = t, t + timedelta(hours=hours)
+            if t < start:
+                continue
+            if t >= end or (limit and count >= limit):
+                break
+            count += 1
+            yield t, int(row["restaurant_zone"]), int(row["customer_zone"])
+
+
+def _sorted_window(orders_csv, start, hours, limit):
+    """The same rows for an unsorted orders.csv: read the three columns typed, filter to the range, then sort."""
+    frame = pd.read_csv(
+        orders_csv,
+        usecols=["timestamp", "restaurant_zone", "customer_zone"],
+        dtype={"restaurant_zone": np.int32, "customer_zone": np.int32},
+        parse_dates=["timestamp"],
+    )
+    if start is None:
+        start = frame["timestamp"].min()
+    end = start + timedelta(hours=hours)
+    frame = frame[(frame["timestamp"] >= start) & (frame["timestamp"] < end)].sort_values("timestamp", kind="stable")
+    if limit:
+        frame = frame.head(limit)
+    for t, restaurant_zone, customer_zone in zip(
+        frame["timestamp"].tolist(), frame["restaurant_zone"].tolist(), frame["customer_zone"].tolist()
+    ):
+        yield t.to_pydatetime(), restaurant_zone, customer_zone
+
+
+def load_orders(orders_csv, start=None, hours=24.0, limit=None):
+    """
+    Yield replay orders (created_at, pickup, drop) inside [start, start + hours)
+    in time order. A sorted orders.csv (as generate_work4food_data.py writes
+    it) is streamed and reading stops at the end of the range; an unsorted
+    one, like the real WORK4FOOD export, is filtered to the range and sorted
+    in memory first.
+    """
+    zones = {}
+
+    def locate(zone):
+        if zone not in zones:
+            zones[zone] = zone_location(zone)
+        return zones[zone]
+
+    rows = _stream_window if _is_sorted_by_timestamp(orders_csv) else _sorted_window
+    for t, restaurant_zone, customer_zone in rows(orders_csv, start, hours, limit):
+        yield {"created_at": t, "pickup": locate(restaurant_zone), "drop": locate(customer_zone)}
+
+
+def load_agent_locations(workers_csv, count):
+    """Start location per agent: the worker's home zone, in workers.csv order."""
+    locations = []
+    with open(workers_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            if len(locations) >= count:
+                break
+            locations.append(zone_location(int(row.get("home_zone") or 0)))
+    return locations
+
+
+class QueryCounter:
+    """Counts SQL statements issued on an engine since the last reset."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def create_replay_database(db_path=None):
+    """
+    Engine and session factory for a fresh schema; in-memory unless db_path
+    is given. db_path must not exist yet: the replay only ever creates a new
+    file, so it can never clobber a real database.
+    """
+    if db_path:
+        # O_EXCL claims the path atomically and fails if anything is already there
+        os.close(os.open(db_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+def seed_replay_accounts(db, agent_locations):
+    """One customer who places every order, plus one available agent per location."""
+    password = hash_password("replay")  # one bcrypt hash for every synthetic account
+    customer = models.User(username="replay_customer", hashed_password=password, role="customer")
+    db.add(customer)
+    users = [
+        models.User(username=f"replay_agent_{i}", hashed_password=password, role="agent", is_agent=True)
+        for i in range(len(agent_locations))
+    ]
+    db.add_all(users)
+    db.flush()
+    db.add_all([
+        models.Agent(
+            user_id=user.id, active=True, online=True, last_location_lat=lat, last_location_lon=lon,
+            speed_kmph=settings.AGENT_SPEED_KMPH, work_hours=0.0, active_hours=0.0,
+            status=models.AgentStatus.available,
+        )
+        for user, (lat, lon) in zip(users, agent_locations)
+    ])
+    db.commit()
+    return customer.id
+
+
+def record_snapshots(processor, path):
+    """Save what the processor's assign_batch receives to `path` before it runs."""
+    engine = processor.assignment_engine
+    assign_batch = engine.assign_batch
+
+    def recording_assign_batch(available_agents, pending_orders, db=None, omegas=None):
+        if omegas is None:
+            omegas = engine.guarantee_predictor.predict_agents([a.id for a in available_agents])
+        save_snapshot(path, available_agents, pending_orders, omegas)
+        return assign_batch(available_agents=available_agents, pending_orders=pending_orders, db=db, omegas=omegas)
+
+    engine.assign_batch = recording_assign_batch
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def replay(orders, agent_locations, db_path=None, out_csv=None, snapshot_dir=None):
+    """
+    Replay `orders` (an iterable in created_at order, e.g. load_orders) window
+    by window through BatchProcessor; returns (summary, per-batch rows).
+    """
+    engine, Session = create_replay_database(db_path)
+    counter = QueryCounter(engine)
+    db = Session()
+    customer_id = seed_replay_accounts(db, agent_locations)
+    executor = OrderExecutor(db)
+
+    window = timedelta(minutes=settings.BATCH_WINDOW_MINUTES)
+    orders = iter(orders)
+    next_order = next(orders, None)
+    clock = next_order["created_at"] if next_order else datetime.utcnow()
+    end = clock  # one window past the latest order read so far
+    completions = []  # heap of (done_at, order_id, agent_id, drop, work_hours)
+    rows = []
+    writer = None
+    out = open(out_csv, "w", newline="") if out_csv else None
+    if out:
+        writer = csv.DictWriter(out, fieldnames=BATCH_FIELDS)
+        writer.writeheader()
+    if snapshot_dir:
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        while next_order is not None or clock < end:
+            window_end = clock + window
+
+            # Agents whose deliveries finished by now become available again
+            released = 0
+            while completions and completions[0][0] <= clock:
+                done_at, order_id, agent_id, drop, work_hours = heapq.heappop(completions)
+                await executor.pickup_order(order_id, agent_id, now=done_at)
+                agent = db.get(models.Agent, agent_id)
+                agent.last_location_lat, agent.last_location_lon = drop
+                await executor.deliver_order(order_id, agent_id, actual_work_hours=work_hours, now=done_at)
+                released += 1
+
+            batch_orders = []
+            while next_order is not None and next_order["created_at"] < window_end:
+                batch_orders.append(next_order)
+                end = next_order["created_at"] + window
+                next_order = next(orders, None)
+            if batch_orders:
+                db.bulk_insert_mappings(models.Order, [
+                    {
+                        "user_id": customer_id, "status": "pending", "created_at": o["created_at"],
+                        "pickup_lat": o["pickup"][0], "pickup_lng": o["pickup"][1],
+                        "drop_lat": o["drop"][0], "drop_lng": o["drop"][1],
+                    }
+                    for o in batch_orders
+                ])
+                db.commit()
+
+            # One session per batch, as the scheduler does
+            batch_db = Session()
+            try:
+                counter.reset()
+                batch_start = time.perf_counter()
+                processor = BatchProcessor(batch_db)
+                if snapshot_dir:
+                    record_snapshots(processor, os.path.join(snapshot_dir, f"batch-{len(rows):05d}.npz"))
+                result = await processor.process_batch(now=window_end)
+                latency_ms = (time.perf_counter() - batch_start) * 1000.0
+                queries = counter.count
+            finally:
+                batch_db.close()
+
+            assigned = db.query(models.Order).filter(models.Order.batch_id == result["batch_id"]).all() if result["assigned_orders"] else []
+            for order in assigned:
+                work_hours = float(order.estimated_work_hours or 0.0)
+                heapq.heappush(completions, (
+                    window_end + timedelta(hours=work_hours), order.id, order.assigned_agent_id,
+                    (order.drop_lat, order.drop_lng), work_hours,
+                ))
+
+            row = {
+                "batch": len(rows),
+                "window_end": window_end.isoformat(),
+                "orders": result["total_orders"],
+                "available_agents": result["available_agents"],
+                "assigned": result["assigned_orders"],
+                "fill_rate": result["assigned_orders"] / result["total_orders"] if result["total_orders"] else 0.0,
+                "mean_work_hours": float(np.mean([o.estimated_work_hours for o in assigned])) if assigned else 0.0,
+                "latency_ms": latency_ms,
+                "queries": queries,
+                "released": released,
+            }
+            rows.append(row)
+            if writer:
+                writer.writerow(row)
+            clock = window_end
+    finally:
+        if out:
+            out.close()
+        db.close()
+        engine.dispose()
+
+    latencies = [r["latency_ms"] for r in rows if r["orders"]]
+    queries = [r["queries"] for r in rows if r["orders"]]
+    total_orders = sum(r["orders"] for r in rows)
+    total_assigned = sum(r["assigned"] for r in rows)
+    summary = {
+        "batches": len(rows),
+        "batches_with_orders": len(latencies),
+        "orders": total_orders,
+        "assigned": total_assigned,
+        "fill_rate": total_assigned / total_orders if total_orders else 0.0,
+        "mean_work_hours": (
+            sum(r["mean_work_hours"] * r["assigned"] for r in rows) / total_assigned if total_assigned else 0.0
+        ),
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "latency_ms_p99": _percentile(latencies, 99),
+        "latency_ms_max": max(latencies, default=0.0),
+        "queries_per_batch_mean": float(np.mean(queries)) if queries else 0.0,
+        "queries_per_batch_max": max(queries, default=0),
+        "wall_sec": time.perf_counter() - start,
+    }
+    return summary, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a WORK4FOOD order stream through BatchProcessor on a virtual clock")
+    parser.add_argument("--orders", default="orders.csv")
+    parser.add_argument("--workers", default="workers.csv")
+    parser.add_argument("--agents", type=int, default=80)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None, help="first window start (default: first order)")
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--limit", type=int, default=None, help="replay at most this many orders")
+    parser.add_argument("--db", default=None, help="new SQLite file to replay into; must not exist (default: in-memory)")
+    parser.add_argument("--temp-db", action="store_true", help="replay into a temporary SQLite file")
+    parser.add_argument("--out", default=None, help="write one CSV row per batch")
+    parser.add_argument("--snapshots", default=None, help="save every batch's assign_batch input to this directory")
+    parser.add_argument("--verbose", action="store_true", help="keep BatchProcessor's per-batch logging")
+    args = parser.parse_args(argv)
+
+    if args.db and os.path.exists(args.db):
+        parser.error(f"--db {args.db} already exists; the replay only creates new databases")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    orders = load_orders(args.orders, start=args.start, hours=args.hours, limit=args.limit)
+    agent_locations = load_agent_locations(args.workers, args.agents)
+    print(f"[REPLAY] {args.orders}, {len(agent_locations)} agents, "
+          f"{settings.BATCH_WINDOW_MINUTES}-minute windows")
+
+    if args.temp_db:
+        with tempfile.TemporaryDirectory() as tmp:
+            summary, _ = asyncio.run(replay(orders, agent_locations, os.path.join(tmp, "replay.db"), args.out, args.snapshots))
+    else:
+        summary, _ = asyncio.run(replay(orders, agent_locations, args.db, args.out, args.snapshots))
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tests for per-agent omegas in service mode: the g-value-service snapshot
+is authoritative across consecutive batches, and each batch pushes its
+agent state back to the service.
+"""
+import asyncio
+import os
+import sys
+import types
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.services import g_value_client
+from app.services.matching import assignment_engine
+from app.services.matching.guarantee_predictor import AgentOmegaState
+from app.services.matching.simulator import BatchProcessor
+
+AGENT_IDS = [1, 2]
+
+
+@pytest.fixture
+def service_mode(monkeypatch):
+    """BatchProcessor with DB access stubbed out, reading snapshots from `published` and recording refreshes."""
+    state = AgentOmegaState(initial_omega=0.25, alpha=0.2)
+    published = {"snapshot": None}
+    pushed = []
+
+    async def cache_get(key):
+        return published["snapshot"]
+
+    async def refresh_g_values(agent_ids, work_hours, active_hours, client=None, timeout=2.0):
+        pushed.append((list(agent_ids), list(work_hours), list(active_hours)))
+        return {"version": len(pushed), "agents": len(agent_ids), "refresh_ms": 0.1, "published": True}
+
+    async def pending_orders(self, window_start, window_end):
+        return [SimpleNamespace(id=100)]
+
+    async def available_agents(self):
+        # Every agent worked 90% of its active time, far from the snapshot omegas
+        return [SimpleNamespace(id=a, work_hours=0.9, active_hours=1.0) for a in AGENT_IDS]
+
+    async def nothing(self, *args, **kwargs):
+        return 0
+
+    monkeypatch.setitem(sys.modules, "app.services.redis_client", types.SimpleNamespace(cache_get=cache_get))
+    monkeypatch.setattr(g_value_client, "refresh_g_values", refresh_g_values)
+    monkeypatch.setattr(assignment_engine, "agent_omega_state", state)
+    monkeypatch.setattr(assignment_engine.AssignmentEngine, "assign_batch", lambda self, *args, **kwargs: [])
+    monkeypatch.setattr(BatchProcessor, "_get_pending_orders", pending_orders)
+    monkeypatch.setattr(BatchProcessor, "_get_available_agents", available_agents)
+    monkeypatch.setattr(BatchProcessor, "_execute_assignments", nothing)
+    monkeypatch.setattr(BatchProcessor, "_update_agent_active_hours", nothing)
+    monkeypatch.setattr(BatchProcessor, "_save_batch_record", nothing)
+    monkeypatch.setattr(settings, "G_VALUE_SOURCE", "service")
+    monkeypatch.setattr(settings, "USE_DYNAMIC_GUARANTEE", True)
+    return state, published, pushed
+
+
+def _run_batch():
+    asyncio.run(BatchProcessor(db=None).process_batch(now=datetime(2024, 1, 1, 12, 0)))
+
+
+def test_snapshot_stays_authoritative_across_batches(service_mode):
+    state, published, pushed = service_mode
+    published["snapshot"] = {"version": 1, "agent_ids": AGENT_IDS, "omega": [0.4, 0.6]}
+
+    _run_batch()
+    np.testing.assert_allclose(state.omegas_for(AGENT_IDS), [0.4, 0.6], rtol=1e-6)
+
+    # Same version again: skipped, and no local EMA step has moved the omegas
+    _run_batch()
+    np.testing.assert_allclose(state.omegas_for(AGENT_IDS), [0.4, 0.6], rtol=1e-6)
+
+    published["snapshot"] = {"version": 2, "agent_ids": AGENT_IDS, "omega": [0.5, 0.7]}
+    _run_batch()
+    np.testing.assert_allclose(state.omegas_for(AGENT_IDS), [0.5, 0.7], rtol=1e-6)
+
+    assert pushed == [(AGENT_IDS, [0.9, 0.9], [1.0, 1.0])] * 3
+
+
+def test_local_mode_still_runs_the_ema(service_mode, monkeypatch):
+    state, published, pushed = service_mode
+    monkeypatch.setattr(settings, "G_VALUE_SOURCE", "local")
+
+    _run_batch()
+    _run_batch()
+    # Two EMA steps from 0.25 toward 0.9 with alpha 0.2
+    expected = 0.9 - (0.9 - 0.25) * 0.8 ** 2
+    np.testing.assert_allclose(state.omegas_for(AGENT_IDS), [expected, expected], rtol=1e-6)
+    assert pushed == []
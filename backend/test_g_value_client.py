@@ -0,0 +1,145 @@
+"""
+Tests for the ML call policy: the circuit breaker opening, half-open
+probing, a cancelled probe releasing its slot, and request hedging.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.g_value_client import BatchCallStats, BatchDeadline, CircuitBreaker, MLCallPolicy, MLUnavailable
+
+
+def _breaker(cooldown_seconds=0.05):
+    return CircuitBreaker(window=10, error_rate=0.5, latency_budget_seconds=1.0, cooldown_seconds=cooldown_seconds)
+
+
+def _open(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(False, 0.01)
+    assert breaker.state == "open"
+
+
+async def _ok(timeout):
+    return 1.0
+
+
+async def _fail(timeout):
+    raise RuntimeError("boom")
+
+
+def test_breaker_opens_on_errors_and_sheds_calls():
+    breaker = _breaker(cooldown_seconds=60.0)
+    policy = MLCallPolicy(breaker, call_timeout_seconds=1.0)
+    stats = BatchCallStats()
+    for _ in range(breaker.min_calls):
+        with pytest.raises(MLUnavailable) as e:
+            asyncio.run(policy.call(_fail, BatchDeadline(5.0), stats))
+        assert e.value.reason == "error"
+    assert breaker.state == "open"
+    with pytest.raises(MLUnavailable) as e:
+        asyncio.run(policy.call(_ok, BatchDeadline(5.0), stats))
+    assert e.value.reason == "breaker_open"
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = _breaker()
+    _open(breaker)
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record(False, 0.01)
+    assert breaker.state == "open"
+
+    asyncio.run(asyncio.sleep(0.06))
+    policy = MLCallPolicy(breaker, call_timeout_seconds=1.0)
+    assert asyncio.run(policy.call(_ok, BatchDeadline(5.0), BatchCallStats())) == 1.0
+    assert breaker.state == "closed"
+
+
+def test_cancelled_probe_releases_the_breaker():
+    breaker = _breaker()
+    _open(breaker)
+    asyncio.run(asyncio.sleep(0.06))
+    policy = MLCallPolicy(breaker, call_timeout_seconds=5.0)
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(policy.call(hang, BatchDeadline(5.0), BatchCallStats()))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert breaker.state == "half_open"
+    # The next call gets to probe and closes the breaker
+    assert asyncio.run(policy.call(_ok, BatchDeadline(5.0), BatchCallStats())) == 1.0
+    assert breaker.state == "closed"
+
+
+def test_hedge_answers_from_the_second_request():
+    breaker = _breaker()
+    for _ in range(breaker.min_calls):
+        breaker.record(True, 0.01)
+    policy = MLCallPolicy(breaker, call_timeout_seconds=2.0, hedge_enabled=True, hedge_min_delay_seconds=0.02)
+    calls = []
+
+    async def slow_then_fast(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+            return 1.0
+        return 2.0
+
+    stats = BatchCallStats()
+    assert asyncio.run(policy.call(slow_then_fast, BatchDeadline(5.0), stats)) == 2.0
+    assert stats.hedged == 1
+    assert len(calls) == 2
+    assert breaker.state == "closed"
+
+
+def test_deadline_cut_timeouts_do_not_open_the_breaker():
+    breaker = _breaker(cooldown_seconds=60.0)
+    policy = MLCallPolicy(breaker, call_timeout_seconds=1.0)
+
+    async def healthy(timeout):
+        await asyncio.sleep(0.05)  # well inside the per-call timeout
+        return 1.0
+
+    stats = BatchCallStats()
+    for _ in range(2 * breaker.min_calls):
+        # The batch has only 10 ms left, so the deadline cuts every call short
+        with pytest.raises(MLUnavailable) as e:
+            asyncio.run(policy.call(healthy, BatchDeadline(0.01), stats))
+        assert e.value.reason == "deadline"
+    assert breaker.state == "closed"
+    assert asyncio.run(policy.call(healthy, BatchDeadline(5.0), stats)) == 1.0
+
+
+def test_call_timeouts_still_open_the_breaker():
+    breaker = _breaker(cooldown_seconds=60.0)
+    policy = MLCallPolicy(breaker, call_timeout_seconds=0.01)
+
+    async def slow(timeout):
+        await asyncio.sleep(1.0)
+
+    for _ in range(breaker.min_calls):
+        with pytest.raises(MLUnavailable) as e:
+            asyncio.run(policy.call(slow, BatchDeadline(5.0), BatchCallStats()))
+        assert e.value.reason == "timeout"
+    assert breaker.state == "open"
+
+
+def test_deadline_expired_skips_call():
+    policy = MLCallPolicy(_breaker(), call_timeout_seconds=1.0)
+    with pytest.raises(MLUnavailable) as e:
+        asyncio.run(policy.call(_ok, BatchDeadline(0.0), BatchCallStats()))
+    assert e.value.reason == "deadline"
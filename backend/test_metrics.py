@@ -0,0 +1,136 @@
+"""
+Tests for request metrics: histogram buckets and quantiles, per-request SQL
+statement counting through the middleware, and the admin-only /metrics
+endpoint that is only registered when METRICS_ENABLED is set.
+"""
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import require_admin
+
+
+def test_histogram_bucket_edges():
+    h = metrics.Histogram((1, 5, 10))
+    for value in (0, 1, 1.5, 5, 10, 10.5, 99):
+        h.observe(value)
+    # counts[i] holds values <= bounds[i]; a value on a bound lands in that bucket
+    assert h.counts == [2, 2, 1, 2]
+    assert h.total == 7
+    assert h.max == 99
+    assert h.as_dict()["buckets"] == {"le_1": 2, "le_5": 2, "le_10": 1, "inf": 2}
+
+
+def test_histogram_quantile():
+    assert metrics.Histogram((1, 5, 10)).quantile(0.5) == 0.0
+    h = metrics.Histogram((1, 5, 10))
+    for value in [0.5] * 50 + [3] * 40 + [7] * 9 + [40]:
+        h.observe(value)
+    assert h.quantile(0.50) == 1.0
+    assert h.quantile(0.90) == 5.0
+    assert h.quantile(0.99) == 10.0
+    assert h.quantile(1.0) == 40.0  # overflow bucket reports the max
+    # The bucket bound is capped at the largest value seen
+    small = metrics.Histogram((1, 5, 10))
+    small.observe(2)
+    assert small.quantile(0.5) == 2.0
+
+
+@pytest.fixture
+def instrumented():
+    """A small app on an instrumented in-memory SQLite engine, with its own registry."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    metrics.instrument_engine(engine)
+    registry = metrics.MetricsRegistry(slow_request_ms=1e9)
+    app = FastAPI()
+
+    @app.get("/sync/{n}")
+    def run_sync(n: int):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        return {"n": n}
+
+    @app.get("/async/{n}")
+    async def run_async(n: int):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        return {"n": n}
+
+    app.add_middleware(metrics.RequestMetricsMiddleware, registry=registry)
+    yield TestClient(app), registry, engine
+    engine.dispose()
+
+
+def test_statements_counted_per_request(instrumented):
+    client, registry, engine = instrumented
+    for n in (0, 3, 3, 7):
+        assert client.get(f"/sync/{n}").status_code == 200
+    assert client.get("/async/2").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    snapshot = registry.snapshot()["routes"]
+    sync = registry.routes["GET /sync/{n}"].queries
+    assert (sync.total, sync.sum, sync.max) == (4, 13, 7)
+    assert snapshot["GET /sync/{n}"]["queries"]["buckets"]["le_3"] == 2
+    assert registry.routes["GET /async/{n}"].queries.sum == 2
+    assert registry.routes["GET <unmatched>"].queries.total == 1
+
+    # Statements outside a request are not counted
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert registry.routes["GET /sync/{n}"].queries.sum == 13
+
+
+def test_slow_requests_keep_their_statements(instrumented):
+    client, registry, _ = instrumented
+    registry.slow_request_ms = 0.0
+    client.get("/sync/2")
+    slow = registry.snapshot()["slow_requests"]
+    assert len(slow) == 1
+    assert slow[0]["route"] == "GET /sync/{n}"
+    assert slow[0]["statements"] == ["SELECT 1", "SELECT 1"]
+
+
+def _reload_main(monkeypatch, enabled):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", enabled)
+    import app.main
+    return importlib.reload(app.main).app
+
+
+@pytest.fixture
+def main_app(monkeypatch):
+    yield lambda enabled: _reload_main(monkeypatch, enabled)
+    monkeypatch.undo()
+    import app.main
+    importlib.reload(app.main)
+
+
+def test_metrics_endpoint_requires_admin(main_app):
+    app = main_app(True)
+    client = TestClient(app)  # no lifespan: the scheduler stays off
+    assert client.get("/metrics").status_code == 401
+
+    app.dependency_overrides[require_admin] = lambda: SimpleNamespace(id=1, role="admin")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert {"routes", "slow_requests", "uptime_seconds"} <= response.json().keys()
+
+
+def test_metrics_endpoint_absent_when_disabled(main_app):
+    app = main_app(False)
+    app.dependency_overrides[require_admin] = lambda: SimpleNamespace(id=1, role="admin")
+    assert TestClient(app).get("/metrics").status_code == 404
@@ -0,0 +1,52 @@
+"""
+Tests for the replay's order loader: a time-sorted orders.csv is streamed,
+and an unsorted one (like the real WORK4FOOD export) is sorted first, so
+both replay the same orders in the same order.
+"""
+import os
+import sys
+from datetime import datetime
+
+# Add the backend and scripts directories to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+
+from replay_work4food import load_orders
+
+ROWS = [
+    # timestamp, restaurant_zone, customer_zone
+    ("2024-01-01T00:00:10", 1, 2),
+    ("2024-01-01T00:05:00", 3, 4),
+    ("2024-01-01T01:30:00", 5, 6),
+    ("2024-01-01T02:00:00", 7, 8),
+    ("2024-01-01T03:15:00", 9, 10),
+]
+
+
+def _write(path, rows):
+    with open(path, "w") as f:
+        f.write("order_id,timestamp,restaurant_zone,customer_zone,distance_km\n")
+        for i, (t, rz, cz) in enumerate(rows):
+            f.write(f"{i},{t},{rz},{cz},1.5\n")
+    return str(path)
+
+
+def _replayed(orders):
+    return [(o["created_at"], o["pickup"], o["drop"]) for o in orders]
+
+
+def test_unsorted_orders_replay_like_sorted(tmp_path):
+    sorted_csv = _write(tmp_path / "sorted.csv", ROWS)
+    unsorted_csv = _write(tmp_path / "unsorted.csv", [ROWS[3], ROWS[0], ROWS[4], ROWS[2], ROWS[1]])
+    for kwargs in ({}, {"hours": 2.0}, {"start": datetime(2024, 1, 1, 0, 1), "hours": 3.0, "limit": 2}):
+        expected = _replayed(load_orders(sorted_csv, **kwargs))
+        assert expected
+        assert _replayed(load_orders(unsorted_csv, **kwargs)) == expected
+
+
+def test_window_bounds_and_limit(tmp_path):
+    unsorted_csv = _write(tmp_path / "unsorted.csv", list(reversed(ROWS)))
+    first_window = _replayed(load_orders(unsorted_csv, hours=1.5))
+    assert [t for t, _, _ in first_window] == [datetime.fromisoformat(t) for t, _, _ in ROWS[:3]]
+    limited = _replayed(load_orders(unsorted_csv, start=datetime(2024, 1, 1, 0, 1), hours=3.0, limit=2))
+    assert [t for t, _, _ in limited] == [datetime(2024, 1, 1, 0, 5), datetime(2024, 1, 1, 1, 30)]
@@ -0,0 +1 @@
+# G-value service package
@@ -1,3 +1,86 @@
 # G-value service main application
+"""
+Serves per-agent guarantee values (ω_v, G_t) from an in-memory table.
+The backend pushes agent state once per batch window to /refresh; lookups
+are answered from memory and every refresh is published as one snapshot.
+"""
+import logging
+import os
+from typing import List, Optional
 
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
 
+from app.services.gp_model import GValueTable, OmegaModel
+from app.services.redis_client import publish_snapshot
+
+logger = logging.getLogger(__name__)
+
+table = GValueTable(
+    model=OmegaModel(os.getenv("GP_MODEL_PATH")),
+    alpha=float(os.getenv("OMEGA_EMA_ALPHA", "0.2")),
+    initial_omega=float(os.getenv("INITIAL_GUARANTEE_RATIO", "0.25")),
+)
+
+app = FastAPI(title="G-Value Service")
+
+
+class RefreshRequest(BaseModel):
+    """Columnar agent state for one batch window (all lists aligned by position)."""
+    agent_ids: List[int]
+    work_hours: List[float]
+    active_hours: List[float]
+    features: Optional[List[List[float]]] = None
+
+
+class BulkLookup(BaseModel):
+    agent_ids: List[int] = Field(default_factory=list)
+
+
+@app.post("/refresh")
+async def refresh(req: RefreshRequest):
+    n = len(req.agent_ids)
+    if len(req.work_hours) != n or len(req.active_hours) != n or (req.features is not None and len(req.features) != n):
+        raise HTTPException(status_code=422, detail="agent_ids, work_hours, active_hours and features must be aligned")
+    version = table.refresh(req.agent_ids, req.work_hours, req.active_hours, req.features)
+    # The new version is live for lookups either way; report whether the backend can see it
+    try:
+        await publish_snapshot(table.snapshot())
+        published = True
+    except Exception as e:
+        logger.warning(f"Snapshot version {version} not published: {e}")
+        published = False
+    return {
+        "version": version,
+        "agents": table.size,
+        "refresh_ms": round(table.last_refresh_ms, 3),
+        "published": published,
+    }
+
+
+@app.get("/g/{agent_id}")
+async def get_g(agent_id: int):
+    row = table.lookup(agent_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown agent")
+    return row
+
+
+@app.post("/g/bulk")
+async def get_g_bulk(req: BulkLookup):
+    return table.bulk_lookup(req.agent_ids)
+
+
+@app.get("/snapshot")
+async def snapshot():
+    return table.snapshot()
+
+
+@app.get("/")
+async def root():
+    return {"service": "g-value-service", "status": "running", "version": table.version, "agents": table.size}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8002")))
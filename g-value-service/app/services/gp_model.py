@@ -1,3 +1,148 @@
 # GP model service
+"""
+In-memory, array-backed table of per-agent guarantee values.
 
+Each row holds one agent's smoothed guarantee ratio ω_v and the derived
+guarantee G_t = ω_v * A_t (hours). The whole table is refreshed once per
+batch window in a single vectorized pass, so lookups never touch the model.
+"""
+import os
+import pickle
+import threading
+import time
+from typing import Dict, Iterable, Optional, Sequence
 
+import numpy as np
+
+
+class OmegaModel:
+    """
+    Predicts a target ω_v for a batch of agents.
+    Uses a pickled regressor (e.g. sklearn GaussianProcessRegressor) when
+    GP_MODEL_PATH points to one; otherwise the observed work/active ratio.
+    """
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.regressor = None
+        if model_path and os.path.isfile(model_path):
+            with open(model_path, "rb") as f:
+                self.regressor = pickle.load(f)
+
+    def predict(self, features: Optional[np.ndarray], work_hours: np.ndarray, active_hours: np.ndarray, prior: np.ndarray) -> np.ndarray:
+        if self.regressor is not None and features is not None and features.size:
+            return np.asarray(self.regressor.predict(features), dtype=np.float64)
+        observed = np.divide(work_hours, active_hours, out=prior.copy(), where=active_hours > 0)
+        return observed
+
+
+class GValueTable:
+    def __init__(
+        self,
+        model: Optional[OmegaModel] = None,
+        alpha: float = 0.2,
+        initial_omega: float = 0.25,
+        omega_min: float = 0.05,
+        omega_max: float = 0.9,
+        capacity: int = 1024,
+    ):
+        self.model = model or OmegaModel()
+        self.alpha = alpha
+        self.initial_omega = initial_omega
+        self.omega_min = omega_min
+        self.omega_max = omega_max
+
+        self._row: Dict[int, int] = {}
+        self.size = 0
+        self.agent_ids = np.zeros(capacity, dtype=np.int64)
+        self.omega = np.full(capacity, initial_omega, dtype=np.float64)
+        self.guarantee = np.zeros(capacity, dtype=np.float64)
+        self.work_hours = np.zeros(capacity, dtype=np.float64)
+        self.active_hours = np.zeros(capacity, dtype=np.float64)
+
+        self.version = 0
+        self.refreshed_at: Optional[float] = None
+        self.last_refresh_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self.agent_ids)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        extra = new_capacity - capacity
+        self.agent_ids = np.concatenate([self.agent_ids, np.zeros(extra, dtype=np.int64)])
+        self.omega = np.concatenate([self.omega, np.full(extra, self.initial_omega)])
+        self.guarantee = np.concatenate([self.guarantee, np.zeros(extra)])
+        self.work_hours = np.concatenate([self.work_hours, np.zeros(extra)])
+        self.active_hours = np.concatenate([self.active_hours, np.zeros(extra)])
+
+    def _rows_for(self, agent_ids: Iterable[int]) -> np.ndarray:
+        """Row index per agent id, appending rows for agents not seen before."""
+        ids = [int(a) for a in agent_ids]
+        new_ids = [a for a in dict.fromkeys(ids) if a not in self._row]
+        if new_ids:
+            self._grow(self.size + len(new_ids))
+            for a in new_ids:
+                self._row[a] = self.size
+                self.agent_ids[self.size] = a
+                self.size += 1
+        return np.fromiter((self._row[a] for a in ids), dtype=np.int64, count=len(ids))
+
+    def refresh(
+        self,
+        agent_ids: Sequence[int],
+        work_hours: Sequence[float],
+        active_hours: Sequence[float],
+        features: Optional[Sequence[Sequence[float]]] = None,
+    ) -> int:
+        """One vectorized EMA step for every given agent; returns the new table version."""
+        start = time.perf_counter()
+        W = np.asarray(work_hours, dtype=np.float64)
+        A = np.asarray(active_hours, dtype=np.float64)
+        X = np.asarray(features, dtype=np.float64) if features is not None else None
+        with self._lock:
+            rows = self._rows_for(agent_ids)
+            prev = self.omega[rows]
+            target = np.clip(self.model.predict(X, W, A, prev), self.omega_min, self.omega_max)
+            omega = (1.0 - self.alpha) * prev + self.alpha * target
+            self.omega[rows] = omega
+            self.work_hours[rows] = W
+            self.active_hours[rows] = A
+            self.guarantee[rows] = omega * A
+            self.version += 1
+            self.refreshed_at = time.time()
+        self.last_refresh_ms = (time.perf_counter() - start) * 1000.0
+        return self.version
+
+    def lookup(self, agent_id: int) -> Optional[dict]:
+        row = self._row.get(int(agent_id))
+        if row is None:
+            return None
+        return {"agent_id": int(agent_id), "omega": float(self.omega[row]), "G": float(self.guarantee[row])}
+
+    def bulk_lookup(self, agent_ids: Sequence[int]) -> dict:
+        """Unknown agents get the initial omega and G = 0, flagged in `missing`."""
+        ids = [int(a) for a in agent_ids]
+        rows = np.fromiter((self._row.get(a, -1) for a in ids), dtype=np.int64, count=len(ids))
+        known = rows >= 0
+        omega = np.full(len(ids), self.initial_omega)
+        guarantee = np.zeros(len(ids))
+        omega[known] = self.omega[rows[known]]
+        guarantee[known] = self.guarantee[rows[known]]
+        return {
+            "agent_ids": ids,
+            "omega": omega.tolist(),
+            "G": guarantee.tolist(),
+            "missing": [a for a, k in zip(ids, known) if not k],
+            "version": self.version,
+        }
+
+    def snapshot(self) -> dict:
+        n = self.size
+        return {
+            "version": self.version,
+            "refreshed_at": self.refreshed_at,
+            "agent_ids": self.agent_ids[:n].tolist(),
+            "omega": self.omega[:n].tolist(),
+            "G": self.guarantee[:n].tolist(),
+        }
@@ -1,3 +1,41 @@
 # Redis client service
+"""
+Publishes G-value table snapshots for the backend to read in one GET.
+The backend runs in another process, so snapshots need Redis: without
+REDIS_URL (or with Redis down) publishing raises and /refresh reports
+the table version as unpublished.
+"""
+import json
+import os
+from typing import Optional
 
+REDIS_URL = os.getenv("REDIS_URL", "")
+SNAPSHOT_KEY = os.getenv("G_SNAPSHOT_KEY", "gvalue:snapshot")
+SNAPSHOT_TTL_SECONDS = int(os.getenv("G_SNAPSHOT_TTL_SECONDS", "900"))
 
+_store = None
+
+
+async def get_store():
+    global _store
+    if _store is None:
+        if not REDIS_URL:
+            raise RuntimeError("REDIS_URL is not set; g-value snapshots need Redis")
+        import redis.asyncio as aioredis
+        client = aioredis.from_url(REDIS_URL, encoding="utf-8", decode_responses=True)
+        await client.ping()
+        _store = client
+    return _store
+
+
+async def publish_snapshot(snapshot: dict) -> None:
+    store = await get_store()
+    await store.set(SNAPSHOT_KEY, json.dumps(snapshot), ex=SNAPSHOT_TTL_SECONDS)
+
+
+async def read_snapshot() -> Optional[dict]:
+    store = await get_store()
+    v = await store.get(SNAPSHOT_KEY)
+    if v is None:
+        return None
+    return json.loads(v)
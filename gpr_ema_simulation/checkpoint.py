@@ -0,0 +1,184 @@
+"""
+Checkpoint and resume for SimulationEngine runs.
+
+A checkpoint is one compressed .npz holding everything a window step reads
+or writes: the agent arrays (location, omega and its current target, W, A,
+earnings, active, busy),
+the orders' picked/assigned columns, the cursor and window counters, the
+completion-event heap, history_window and the global NumPy/Python RNG
+states. Restoring it into an engine rebuilt from the same inputs continues
+the run exactly where it stopped, so the result is bit-identical to an
+uninterrupted run.
+
+The GPR model is not stored. The checkpoint keeps a digest of the fitted
+model and the agents' feature matrix (or of the fixed omega targets when
+the engine has no model) plus a caller-supplied reference (e.g. the
+loader's cache entry and the training parameters), and restore refuses an
+engine whose model or features differ.
+
+Usage:
+    checkpointer = Checkpointer('./runs/checkpoints', every=100)
+    checkpointer.restore_latest(engine)   # no-op on a fresh directory
+    engine.run(checkpointer=checkpointer)
+
+The run can be killed at any point; restarting it the same way continues
+from the newest checkpoint.
+"""
+import glob
+import hashlib
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2
+CHECKPOINT_PATTERN = 'checkpoint-{:08d}.npz'
+AGENT_ARRAYS = ('lat', 'lon', 'omega', 'omega_target', 'W', 'A', 'earnings', 'active', 'busy')
+ENGINE_PARAMS = ('window_sec', 'speed_kmph', 'ema_alpha', 'k_per_agent', 'cap_factor', 'hard_cap', 'event_driven')
+ENGINE_COUNTERS = ('cursor_ns', 'window_id', 'completed_deliveries', 'skipped_windows', 'orders_without_agent')
+
+
+def _update_digest(h, array):
+    h.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+
+
+def omega_digest(engine):
+    """Digest of what the omega targets come from: the GPR and feature matrix, else the fixed targets."""
+    h = hashlib.sha256()
+    gpr = engine.gpr
+    if gpr is None:
+        _update_digest(h, engine.agents.omega_target)
+    else:
+        _update_digest(h, engine.agents.features)
+        for array in (gpr.X_train_, gpr.alpha_, gpr._y_train_mean, gpr._y_train_std):
+            _update_digest(h, array)
+        h.update(repr(gpr.kernel_.get_params()).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _engine_meta(engine, reference):
+    return {
+        'version': CHECKPOINT_VERSION,
+        'agents': len(engine.agents),
+        'orders': len(engine.orders),
+        'params': {name: getattr(engine, name) for name in ENGINE_PARAMS},
+        'counters': {name: int(getattr(engine, name)) for name in ENGINE_COUNTERS},
+        'runtime_sec': engine.runtime_sec,
+        'omega_digest': omega_digest(engine),
+        'reference': reference or {},
+    }
+
+
+def save_checkpoint(engine, path, reference=None):
+    """Write the engine's state to `path` (.npz) atomically."""
+    np_state = np.random.get_state()
+    py_state = random.getstate()
+    arrays = {f'agent_{name}': getattr(engine.agents, name) for name in AGENT_ARRAYS}
+    arrays.update(
+        order_picked=engine.orders.picked,
+        order_assigned=engine.orders.assigned,
+        history_window=np.asarray(engine.history_window, dtype=np.float64),
+        completions=np.array(engine.completions, dtype=np.int64).reshape(-1, 2),
+        np_rng_keys=np_state[1],
+        np_rng_extra=np.array([np_state[2], np_state[3], np_state[4]], dtype=np.float64),
+        py_rng_state=np.array(py_state[1], dtype=np.uint64),
+        py_rng_gauss=np.array([np.nan if py_state[2] is None else py_state[2]], dtype=np.float64),
+        meta=np.frombuffer(json.dumps(_engine_meta(engine, reference), default=str).encode('utf-8'), dtype=np.uint8),
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_checkpoint_meta(path):
+    with np.load(path) as data:
+        return json.loads(data['meta'].tobytes().decode('utf-8'))
+
+
+def restore_checkpoint(engine, path):
+    """
+    Load the state saved at `path` into `engine`, which must have been built
+    from the same agents, orders, parameters and omega model. Returns the meta.
+    """
+    with np.load(path) as data:
+        meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+        if meta.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{path}: checkpoint format {meta.get('version')}, expected {CHECKPOINT_VERSION}")
+        current = _engine_meta(engine, None)
+        for key in ('agents', 'orders', 'params', 'omega_digest'):
+            if meta[key] != current[key]:
+                raise ValueError(f"{path}: checkpoint {key} {meta[key]!r} does not match the engine's {current[key]!r}")
+
+        agents, orders = engine.agents, engine.orders
+        for name in AGENT_ARRAYS:
+            current_array = getattr(agents, name)
+            setattr(agents, name, data[f'agent_{name}'].astype(current_array.dtype, copy=True))
+        orders.picked = data['order_picked'].copy()
+        orders.assigned = data['order_assigned'].copy()
+        engine.history_window = data['history_window'].tolist()
+        engine.completions = [tuple(event) for event in data['completions'].tolist()]  # saved in heap order
+        for name, value in meta['counters'].items():
+            setattr(engine, name, value)
+        engine.runtime_sec = meta['runtime_sec']
+        engine.last_window = None
+
+        has_gauss, cached_gaussian = data['np_rng_extra'][1:]
+        np.random.set_state(('MT19937', data['np_rng_keys'], int(data['np_rng_extra'][0]), int(has_gauss), float(cached_gaussian)))
+        gauss_next = float(data['py_rng_gauss'][0])
+        random.setstate((3, tuple(int(v) for v in data['py_rng_state']), None if np.isnan(gauss_next) else gauss_next))
+    return meta
+
+
+def latest_checkpoint(directory):
+    """Path of the newest checkpoint in `directory`, or None."""
+    paths = sorted(glob.glob(os.path.join(directory, 'checkpoint-[0-9]*.npz')))
+    return paths[-1] if paths else None
+
+
+class Checkpointer:
+    """
+    Saves a checkpoint to `directory` every `every` windows and once the run
+    is done, keeping the newest `keep` files. `reference` is stored as-is to
+    identify the inputs and GPR model the run was built from.
+    """
+
+    def __init__(self, directory, every=100, keep=2, reference=None):
+        if every < 1 or keep < 1:
+            raise ValueError("every and keep must be at least 1")
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.reference = reference
+        self.saved = 0
+        self._saved_window = 0
+
+    def due(self, engine):
+        # Compare against the last save rather than window_id % every: event-driven runs skip windows
+        return engine.done or engine.window_id - self._saved_window >= self.every
+
+    def save(self, engine):
+        path = os.path.join(self.directory, CHECKPOINT_PATTERN.format(engine.window_id))
+        save_checkpoint(engine, path, self.reference)
+        self.saved += 1
+        self._saved_window = engine.window_id
+        for old in sorted(glob.glob(os.path.join(self.directory, 'checkpoint-[0-9]*.npz')))[:-self.keep]:
+            os.remove(old)
+        return path
+
+    def restore_latest(self, engine):
+        """Restore the newest checkpoint into `engine`; returns its path, or None if there is none."""
+        path = latest_checkpoint(self.directory)
+        if path is not None:
+            restore_checkpoint(engine, path)
+            self._saved_window = engine.window_id
+        return path
@@ -0,0 +1,252 @@
+"""
+Columnar cache for processed WORK4FOOD data.
+
+An entry is a directory holding one .npy file per column and a meta.json
+that says how to rebuild each frame. Numeric, boolean and datetime columns
+are opened with np.load(mmap_mode='r'), so reading an entry maps files
+instead of parsing them. Entries are keyed by the source files' path, size
+and mtime plus the processing parameters, so editing an input or changing
+a parameter selects a new entry instead of reusing a stale one.
+
+Frames too large to hold in memory are written with AppendWriter instead:
+chunks are appended to raw per-column files and read back with np.memmap.
+
+Every new key adds an entry, so prune_entries keeps only the most recently
+used MAX_ENTRIES entries of a cache directory.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+MAX_ENTRIES = 4
+
+
+def source_fingerprint(paths):
+    """[path, size, mtime_ns] for each source file; raises FileNotFoundError if one is missing."""
+    fingerprint = []
+    for path in paths:
+        st = os.stat(path)
+        fingerprint.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+
+def cache_key(paths, params):
+    payload = json.dumps(
+        {'version': FORMAT_VERSION, 'sources': source_fingerprint(paths), 'params': params},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+
+
+def _column_kind(values):
+    """How a column is stored: native array, pair of floats, strings, all-None or pickled objects."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return 'category'
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+        return 'array'
+    present = [v for v in values.to_numpy(dtype=object) if v is not None and v is not pd.NA]
+    if not present:
+        return 'none'
+    if all(isinstance(v, tuple) and len(v) == 2 for v in present) and len(present) == len(values):
+        return 'pair'
+    if all(isinstance(v, str) for v in present) and len(present) == len(values):
+        return 'str'
+    return 'object'
+
+
+def write_frame(directory, name, df):
+    """Write `df` as <directory>/<name>.<column>.npy files; returns its meta entry."""
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        kind = _column_kind(values)
+        stem = os.path.join(directory, f'{name}.{i}')
+        if kind == 'array':
+            np.save(stem + '.npy', values.to_numpy())
+        elif kind == 'category':
+            np.save(stem + '.npy', values.cat.codes.to_numpy())
+            np.save(stem + '.categories.npy', values.cat.categories.to_numpy(), allow_pickle=True)
+        elif kind == 'pair':
+            pairs = np.array(values.tolist(), dtype=np.float64).reshape(-1, 2)
+            np.save(stem + '.npy', np.ascontiguousarray(pairs))
+        elif kind == 'str':
+            np.save(stem + '.npy', values.to_numpy().astype(str))
+        elif kind == 'object':
+            np.save(stem + '.npy', values.to_numpy(), allow_pickle=True)
+        columns.append({'name': col, 'kind': kind})
+    index = None
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        index = f'{name}.index.npy'
+        np.save(os.path.join(directory, index), df.index.to_numpy())
+    return {'rows': len(df), 'columns': columns, 'index': index}
+
+
+class AppendWriter:
+    """
+    Writes a frame chunk by chunk to raw <name>.<column>.bin files. Column
+    dtypes are fixed by the first chunk; categorical columns are recoded
+    against the categories seen so far, so chunks may use different ones.
+    """
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        self.rows = 0
+        self.columns = None
+        self._files = []
+        self._categories = {}
+
+    def append(self, df):
+        if self.columns is None:
+            self._open(df)
+        for i, column in enumerate(self.columns):
+            values = df[column['name']]
+            if column['kind'] == 'category':
+                table = self._categories[i]
+                remap = np.array([table.setdefault(c, len(table)) for c in values.cat.categories] + [-1], dtype=np.int32)
+                data = remap[values.cat.codes.to_numpy()]  # code -1 (missing) picks the trailing -1
+            else:
+                data = values.to_numpy(dtype=column['dtype'])
+            np.ascontiguousarray(data).tofile(self._files[i])
+        self.rows += len(df)
+
+    def _open(self, df):
+        self.columns = []
+        for i, col in enumerate(df.columns):
+            values = df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                column = {'name': col, 'kind': 'category', 'dtype': 'int32'}
+                self._categories[i] = {}
+            elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+                column = {'name': col, 'kind': 'raw', 'dtype': values.dtype.str}
+            else:
+                raise TypeError(f"column {col!r} has dtype {values.dtype}; AppendWriter only takes numeric, datetime and categorical columns")
+            self.columns.append(column)
+            self._files.append(open(os.path.join(self.directory, f'{self.name}.{i}.bin'), 'wb'))
+
+    def close(self):
+        """Flush the column files and return the frame's meta entry."""
+        for f in self._files:
+            f.close()
+        for i, table in self._categories.items():
+            np.save(os.path.join(self.directory, f'{self.name}.{i}.categories.npy'),
+                    np.array(list(table), dtype=object), allow_pickle=True)
+        return {'rows': self.rows, 'columns': self.columns or [], 'index': None}
+
+
+def _open_raw(path, dtype, n):
+    if n == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=np.dtype(dtype), mode='r', shape=(n,))
+
+
+def read_frame(directory, name, frame_meta):
+    n = frame_meta['rows']
+    data = {}
+    for i, column in enumerate(frame_meta['columns']):
+        kind = column['kind']
+        stem = os.path.join(directory, f'{name}.{i}')
+        if kind == 'array':
+            data[column['name']] = np.load(stem + '.npy', mmap_mode='r')
+        elif kind == 'raw':
+            data[column['name']] = _open_raw(stem + '.bin', column['dtype'], n)
+        elif kind == 'category':
+            categories = np.load(stem + '.categories.npy', allow_pickle=True)
+            if 'dtype' in column:
+                codes = np.asarray(_open_raw(stem + '.bin', column['dtype'], n))
+            else:
+                codes = np.load(stem + '.npy')
+            data[column['name']] = pd.Categorical.from_codes(codes, categories)
+        elif kind == 'pair':
+            pairs = np.load(stem + '.npy')
+            data[column['name']] = list(zip(pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+        elif kind == 'str':
+            data[column['name']] = np.load(stem + '.npy').astype(object)
+        elif kind == 'object':
+            data[column['name']] = np.load(stem + '.npy', allow_pickle=True)
+        else:
+            data[column['name']] = np.full(n, None, dtype=object)
+    index = None
+    if frame_meta['index']:
+        index = np.load(os.path.join(directory, frame_meta['index']))
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def write_entry(entry_dir, frames, extra=None, chunked=None):
+    """
+    Write named frames as one cache entry. The entry is built in a temporary
+    sibling directory and renamed into place, so readers never see a partial entry.
+    chunked maps further frame names to iterables of DataFrame chunks, which
+    are streamed through AppendWriter.
+    """
+    parent = os.path.dirname(os.path.abspath(entry_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        meta = {'version': FORMAT_VERSION, 'frames': {}, 'extra': extra or {}}
+        for name, df in frames.items():
+            meta['frames'][name] = write_frame(tmp_dir, name, df)
+        for name, chunks in (chunked or {}).items():
+            writer = AppendWriter(tmp_dir, name)
+            try:
+                for chunk in chunks:
+                    writer.append(chunk)
+            finally:
+                meta['frames'][name] = writer.close()
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, default=str)
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.replace(tmp_dir, entry_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def touch_entry(entry_dir):
+    """Mark an entry as just used; prune_entries drops the least recently used ones first."""
+    meta_path = os.path.join(entry_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.utime(meta_path)
+
+
+def prune_entries(cache_dir, keep, max_entries=MAX_ENTRIES):
+    """
+    Delete all but the `max_entries` most recently used entries under
+    cache_dir. `keep` (an entry directory) always survives. In-progress
+    .tmp- builds and unrelated files are left alone. Returns the removed keys.
+    """
+    keep = os.path.abspath(keep)
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry_dir = os.path.abspath(os.path.join(cache_dir, name))
+        meta_path = os.path.join(entry_dir, META_FILE)
+        if entry_dir == keep or name.startswith('.') or not os.path.exists(meta_path):
+            continue
+        entries.append((os.stat(meta_path).st_mtime_ns, name, entry_dir))
+    entries.sort(reverse=True)
+    removed = []
+    for _, name, entry_dir in entries[max(0, max_entries - 1):]:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def read_entry(entry_dir):
+    """(frames, extra) for a complete entry, or None if it does not exist or is from another format."""
+    meta_path = os.path.join(entry_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        return None
+    frames = {name: read_frame(entry_dir, name, frame_meta) for name, frame_meta in meta['frames'].items()}
+    return frames, meta['extra']
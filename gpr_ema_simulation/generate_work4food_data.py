@@ -0,0 +1,242 @@
+"""
+Synthetic WORK4FOOD dataset generator.
+
+Writes workers.csv, sessions.csv and orders.csv with the columns
+work4food_csv_loader.Work4FoodDataLoader expects, for running and load
+testing the simulation without the real dataset. Everything is drawn
+from one np.random.Generator seeded by --seed, in array batches, and
+orders are written in time order one chunk at a time, so memory stays
+bounded by the chunk size even for 10M orders.
+
+Order timestamps follow an hour-of-day demand curve (lunch and dinner
+peaks). Restaurant zones are weighted by hotspots placed the way
+geo_utils.random_point_clustered places points: a hotspot centre within
+cluster_factor * radius of the city centre, then a spread of the
+remaining radius around it. Zone coordinates come from the loader's
+zone_location_table, so the geography matches what the simulation sees.
+
+Usage:
+    python generate_work4food_data.py --out ./synthetic --orders 1000000 --days 7
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from geo_utils import haversine_km, random_points_clustered
+from work4food_csv_loader import zone_location_table
+
+SEED = 42
+NUM_WORKERS = 2000
+NUM_ORDERS = 1_000_000
+NUM_DAYS = 7
+START_DATE = '2024-01-01'
+CHUNK_SIZE = 500_000
+ZONE_IDS = np.arange(1, 263)
+CENTER_LOCATION = (19.07, 72.87)
+CITY_RADIUS_KM = 15.0
+NUM_HOTSPOTS = 12
+CLUSTER_FACTOR = 0.3
+SESSIONS_PER_WORKER_DAY = 0.45
+ORDER_COLUMNS = ['order_id', 'timestamp', 'restaurant_zone', 'customer_zone', 'distance_km',
+                 'trip_time_mins', 'base_fare', 'customer_prep_time', 'expected_delivery_mins']
+
+# Relative order volume per hour of day (midnight first): lunch and dinner peaks
+DEMAND_CURVE = np.array([
+    0.6, 0.35, 0.2, 0.1, 0.1, 0.15, 0.3, 0.6, 0.9, 1.0, 1.3, 2.2,
+    3.2, 3.0, 2.0, 1.3, 1.2, 1.5, 2.3, 3.4, 3.6, 2.8, 1.8, 1.0,
+])
+
+AGE_GROUPS = (['18-25', '26-35', '36-45', '46-55', '56+'], [0.148, 0.329, 0.296, 0.142, 0.085])
+GENDERS = (['male', 'female', 'other'], [0.688, 0.294, 0.018])
+EDUCATION = (['high_school', 'some_college', 'bachelors', 'graduate'], [0.253, 0.356, 0.29, 0.101])
+
+
+
+def zone_weights(rng, zone_lat, zone_lon, num_hotspots=NUM_HOTSPOTS, center=CENTER_LOCATION,
+                 radius_km=CITY_RADIUS_KM, cluster_factor=CLUSTER_FACTOR):
+    """Restaurant-zone probabilities: a small base rate plus a Gaussian bump per hotspot."""
+    hot_lat, hot_lon = random_points_clustered(center, radius_km, num_hotspots, cluster_factor, rng)
+    strength = rng.gamma(2.0, 1.0, num_hotspots)
+    spread_km = radius_km * (1 - cluster_factor) / 4
+    d = haversine_km(zone_lat[:, None], zone_lon[:, None], hot_lat[None, :], hot_lon[None, :])
+    weights = 0.05 + (strength[None, :] * np.exp(-0.5 * (d / spread_km) ** 2)).sum(axis=1)
+    return weights / weights.sum()
+
+
+def customer_zone_cdf(zone_lat, zone_lon, scale_km=3.0):
+    """Row i: CDF over customer zones for restaurant zone i, decaying with distance."""
+    d = haversine_km(zone_lat[:, None], zone_lon[:, None], zone_lat[None, :], zone_lon[None, :])
+    cdf = np.cumsum(np.exp(-d / scale_km), axis=1)
+    return cdf / cdf[:, -1:]
+
+
+
+def _csv_rows(df, float_format='{:.4f}'):
+    """
+    CSV text for df without header. Formats column by column and joins rows
+    once, about 2.5x faster than DataFrame.to_csv; values must not need quoting.
+    """
+    cols = []
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype.kind == 'f':
+            cols.append(map(float_format.format, values.tolist()))
+        else:
+            cols.append(map(str, values.tolist()))
+    return '\n'.join(map(','.join, zip(*cols))) + '\n'
+
+
+def _format_times(times_ns):
+    return np.datetime_as_string(times_ns.astype('datetime64[s]'), unit='s').astype(object)
+
+
+def generate_workers(rng, num_workers=NUM_WORKERS, zone_ids=ZONE_IDS):
+    hourly_rate = np.clip(rng.normal(20.8, 6.0, num_workers), 10.5, 35.0)
+    expense = np.clip(rng.normal(5.0, 1.3, num_workers), 3.0, 8.0)
+    return pd.DataFrame({
+        'worker_id': [f'W{i:04d}' for i in range(num_workers)],
+        'age_group': rng.choice(AGE_GROUPS[0], num_workers, p=AGE_GROUPS[1]),
+        'gender': rng.choice(GENDERS[0], num_workers, p=GENDERS[1]),
+        'education': rng.choice(EDUCATION[0], num_workers, p=EDUCATION[1]),
+        'hourly_rate': hourly_rate,
+        'expense_per_hour': expense,
+        'net_hourly': hourly_rate - expense,
+        'multi_apping': rng.random(num_workers) < 0.357,
+        'avg_trips_per_hour': np.clip(rng.normal(2.3, 0.5, num_workers), 0.5, 4.0),
+        'experience_weeks': rng.integers(1, 156, num_workers),
+        'rating': rng.uniform(4.5, 5.0, num_workers),
+        'home_zone': rng.choice(zone_ids, num_workers),
+    })
+
+
+def generate_sessions(rng, workers, num_days=NUM_DAYS, start_date=START_DATE,
+                      sessions_per_worker_day=SESSIONS_PER_WORKER_DAY):
+    n = int(round(len(workers) * num_days * sessions_per_worker_day))
+    idx = rng.integers(0, len(workers), n)
+    # Logins lead demand by an hour or so; the curve is shifted one hour earlier
+    login_curve = np.roll(DEMAND_CURVE, -1)
+    hour = rng.choice(24, n, p=login_curve / login_curve.sum())
+    day = rng.integers(0, num_days, n)
+    login = (np.datetime64(start_date, 's') + (day * 86400 + hour * 3600 + rng.integers(0, 3600, n)).astype('timedelta64[s]'))
+    planned_hours = np.clip(rng.gamma(4.0, 1.2, n), 1.0, 12.0)
+    logout = login + (planned_hours * 3600 * rng.uniform(0.85, 1.1, n)).astype('timedelta64[s]')
+    order = np.argsort(login, kind='stable')
+    return pd.DataFrame({
+        'worker_id': workers['worker_id'].to_numpy()[idx][order],
+        'login_time': _format_times(login[order]),
+        'logout_time': _format_times(logout[order]),
+        'planned_hours': planned_hours[order],
+        'hourly_rate': (workers['hourly_rate'].to_numpy()[idx] * rng.uniform(0.75, 1.05, n))[order],
+        'expense_rate': (workers['expense_per_hour'].to_numpy()[idx] * rng.uniform(0.9, 1.1, n))[order],
+    })
+
+
+def generate_order_chunks(rng, num_orders=NUM_ORDERS, num_days=NUM_DAYS, start_date=START_DATE,
+                          chunk_size=CHUNK_SIZE, zone_ids=ZONE_IDS):
+    """
+    Yields order DataFrames of at most chunk_size rows, in timestamp order.
+    Order counts per (day, hour) bin are fixed up front with one multinomial
+    draw; each chunk then fills whole consecutive bins.
+    """
+    zone_lat, zone_lon = zone_location_table(zone_ids)
+    rest_p = zone_weights(rng, zone_lat, zone_lon)
+    cust_cdf = customer_zone_cdf(zone_lat, zone_lon)
+
+    bin_p = np.tile(DEMAND_CURVE, num_days)
+    bin_counts = rng.multinomial(num_orders, bin_p / bin_p.sum())
+    bin_start = np.datetime64(start_date, 's') + (np.arange(len(bin_counts)) * 3600).astype('timedelta64[s]')
+    next_id = 0
+    first_bin = 0
+    while first_bin < len(bin_counts):
+        # Whole hour bins until the chunk is full (a single bin may exceed chunk_size)
+        cum = np.cumsum(bin_counts[first_bin:])
+        last_bin = first_bin + max(1, int(np.searchsorted(cum, chunk_size, side='right')))
+        counts = bin_counts[first_bin:last_bin]
+        n = int(counts.sum())
+        if n:
+            starts = np.repeat(bin_start[first_bin:last_bin], counts)
+            times = np.sort(starts + rng.integers(0, 3600, n).astype('timedelta64[s]'))
+            yield _orders_frame(rng, next_id, times, zone_ids, zone_lat, zone_lon, rest_p, cust_cdf)
+            next_id += n
+        first_bin = last_bin
+
+
+def _orders_frame(rng, first_id, times, zone_ids, zone_lat, zone_lon, rest_p, cust_cdf):
+    n = len(times)
+    rest = rng.choice(len(zone_ids), n, p=rest_p)
+    u = rng.random(n)
+    cust = np.empty(n, dtype=np.int64)
+    for z in np.unique(rest):
+        rows = np.flatnonzero(rest == z)
+        cust[rows] = np.minimum(np.searchsorted(cust_cdf[z], u[rows], side='right'), len(zone_ids) - 1)
+
+    straight_km = haversine_km(zone_lat[rest], zone_lon[rest], zone_lat[cust], zone_lon[cust])
+    distance_km = np.maximum(0.3, straight_km * 1.3 + rng.gamma(2.0, 0.6, n))
+    trip_time_mins = distance_km / rng.uniform(14.0, 26.0, n) * 60.0 + rng.uniform(1.0, 4.0, n)
+    prep = np.clip(rng.gamma(4.0, 3.0, n), 3.0, 45.0)
+    frame = pd.DataFrame({
+        'order_id': np.arange(first_id, first_id + n),
+        'timestamp': _format_times(times),
+        'restaurant_zone': zone_ids[rest],
+        'customer_zone': zone_ids[cust],
+        'distance_km': distance_km,
+        'trip_time_mins': trip_time_mins,
+        'base_fare': 2.5 + 0.9 * distance_km + rng.gamma(2.0, 0.5, n),
+        'customer_prep_time': prep,
+        'expected_delivery_mins': prep + trip_time_mins + rng.uniform(5.0, 15.0, n),
+    })
+    return frame[ORDER_COLUMNS]
+
+
+def generate(out_dir, num_workers=NUM_WORKERS, num_orders=NUM_ORDERS, num_days=NUM_DAYS,
+             start_date=START_DATE, seed=SEED, chunk_size=CHUNK_SIZE, workers_path=None):
+    """
+    Write workers.csv (unless workers_path points at an existing file to reuse),
+    sessions.csv and orders.csv into out_dir. Returns row counts.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    if workers_path:
+        workers = pd.read_csv(workers_path)
+    else:
+        workers = generate_workers(rng, num_workers)
+        workers.to_csv(os.path.join(out_dir, 'workers.csv'), index=False)
+    sessions = generate_sessions(rng, workers, num_days, start_date)
+    sessions.to_csv(os.path.join(out_dir, 'sessions.csv'), index=False)
+
+    written = 0
+    with open(os.path.join(out_dir, 'orders.csv'), 'w', newline='') as f:
+        # The header goes out even when there are no orders, so the file still loads
+        f.write(','.join(ORDER_COLUMNS) + '\n')
+        for chunk in generate_order_chunks(rng, num_orders, num_days, start_date, chunk_size):
+            f.write(_csv_rows(chunk))
+            written += len(chunk)
+            print(f"   Wrote {written:,} / {num_orders:,} orders")
+    return {'workers': len(workers), 'sessions': len(sessions), 'orders': written}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic WORK4FOOD dataset")
+    parser.add_argument('--out', default='./synthetic')
+    parser.add_argument('--workers', type=int, default=NUM_WORKERS)
+    parser.add_argument('--workers-csv', default=None, help="reuse an existing workers.csv instead of generating one")
+    parser.add_argument('--orders', type=int, default=NUM_ORDERS)
+    parser.add_argument('--days', type=int, default=NUM_DAYS)
+    parser.add_argument('--start-date', default=START_DATE)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = generate(args.out, args.workers, args.orders, args.days, args.start_date,
+                      args.seed, args.chunk_size, args.workers_csv)
+    print(f"✓ Generated {counts['workers']:,} workers, {counts['sessions']:,} sessions and "
+          f"{counts['orders']:,} orders in {args.out} ({time.perf_counter() - start:.1f}s)")
+    return counts
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Geospatial helpers for the WORK4FOOD simulation scripts.
+Array versions of backend/app/services/matching/geo_utils.py: inputs are
+NumPy arrays (or scalars) in decimal degrees and broadcast against each other.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def random_points(center, radius_km, n, rng=None):
+    """
+    n points uniform in a disc of radius_km around center (array version of
+    geo_utils.random_point). center may hold arrays of n centres. Returns (lat, lon).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    center_lat, center_lon = center
+    bearing = rng.random(n) * 2 * np.pi
+    r = radius_km * np.sqrt(rng.random(n))
+    lat = center_lat + r * np.sin(bearing) / 111.0
+    lon = center_lon + r * np.cos(bearing) / (111.0 * np.cos(np.radians(center_lat)))
+    return lat, lon
+
+
+def random_points_clustered(center, radius_km, n, cluster_factor=0.3, rng=None):
+    """Array version of geo_utils.random_point_clustered: a hotspot per point, then a spread around it."""
+    rng = rng if rng is not None else np.random.default_rng()
+    hotspots = random_points(center, radius_km * cluster_factor, n, rng)
+    return random_points(hotspots, radius_km * (1 - cluster_factor), n, rng)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance; e.g. lat1[:, None] vs lat2[None, :] yields a distance matrix."""
+    lat1, lon1, lat2, lon2 = np.radians(lat1), np.radians(lon1), np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
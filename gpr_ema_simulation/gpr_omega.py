@@ -0,0 +1,133 @@
+"""
+GPR-based dynamic guarantee predictor for the WORK4FOOD simulation
+Shared by foodly_integrated4.py and simulation_engine.py; importing it has no side effects.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import RBF, ConstantKernel as C
+
+PAY_PER_HOUR = 15.0
+# Location columns of build_agent_feature_matrix; the rest are static per agent
+FEATURE_LAT, FEATURE_LON = 1, 2
+
+HOUR_NS = 3600 * 10**9
+
+
+def hourly_demand_supply(orders_df, sessions_df):
+    """
+    Orders per hour of day and, per hour of day, how many session-hours
+    touch it, as two int64 arrays of length 24. A session contributes its
+    login hour and every following hour up to its logout, as in stepping
+    one hour at a time: full days add to every bin and the remainder goes
+    through a difference array over two days of bins.
+    """
+    demand = np.bincount(orders_df['time'].dt.hour.dropna().to_numpy(dtype=np.int64), minlength=24)[:24]
+    if 'login_time' not in sessions_df.columns or 'logout_time' not in sessions_df.columns:
+        return demand, np.full(24, max(1, len(sessions_df) // 8), dtype=np.int64)
+
+    login = pd.to_datetime(sessions_df['login_time']).to_numpy(dtype='datetime64[ns]')
+    logout = pd.to_datetime(sessions_df['logout_time']).to_numpy(dtype='datetime64[ns]')
+    valid = ~(np.isnat(login) | np.isnat(logout))
+    start = np.minimum(login[valid], logout[valid])
+    end = np.maximum(login[valid], logout[valid])
+
+    steps = (end - start).astype(np.int64) // HOUR_NS + 1
+    start_hour = pd.DatetimeIndex(start).hour.to_numpy().astype(np.int64)
+    full_days, remainder = np.divmod(steps, 24)
+    diff = np.zeros(49, dtype=np.int64)
+    np.add.at(diff, start_hour, 1)
+    np.add.at(diff, start_hour + remainder, -1)
+    spans = np.cumsum(diff[:48])
+    supply = spans[:24] + spans[24:] + full_days.sum()
+    return demand, supply
+
+
+
+def _agent_column(agents, key, default):
+    return np.array([float(a.get(key, default)) for a in agents], dtype=float)
+
+
+def _window_sums(per_hour, start_hour, n_hours):
+    """Sum of per_hour over the n_hours (<= 24) hours starting at start_hour, wrapping at midnight."""
+    cum = np.concatenate([[0], np.cumsum(np.tile(per_hour, 2))])
+    return cum[start_hour + n_hours] - cum[start_hour]
+
+
+def _typical_sessions(sessions_df, worker_ids):
+    """Mean login hour (rounded) and mean planned hours per worker, NaN where unknown."""
+    login_h = np.full(len(worker_ids), np.nan)
+    dur_h = np.full(len(worker_ids), np.nan)
+    if 'worker_id' not in sessions_df.columns or len(sessions_df) == 0:
+        return login_h, dur_h
+    stats = pd.DataFrame({
+        'worker_id': sessions_df['worker_id'].to_numpy(),
+        'login_hour': pd.to_datetime(sessions_df['login_time']).dt.hour.to_numpy(dtype=float),
+        'planned_hours': sessions_df['planned_hours'].to_numpy(dtype=float),
+    }).groupby('worker_id').mean()
+    pos = stats.index.get_indexer(pd.Index(worker_ids, dtype=object))
+    found = pos >= 0
+    login_h[found] = np.round(stats['login_hour'].to_numpy()[pos[found]])
+    dur_h[found] = stats['planned_hours'].to_numpy()[pos[found]]
+    return login_h, dur_h
+
+
+def train_gpr_for_omega(agents, orders_df, sessions_df, pay_per_hour=PAY_PER_HOUR):
+    demand_by_hour, supply_by_hour = hourly_demand_supply(orders_df, sessions_df)
+    max_demand = max(1, int(demand_by_hour.max()))
+
+    login_h, dur_h = _typical_sessions(sessions_df, [a.get('agent_id', None) for a in agents])
+    missing = np.isnan(login_h)
+    if missing.any():
+        login_h[missing] = np.random.randint(0, 24, size=int(missing.sum()))
+    login_h = login_h.astype(np.int64)
+    dur_h = np.where(np.isnan(dur_h) | (dur_h <= 0), 4.0, dur_h)
+    for a, h in zip(agents, login_h.tolist()):
+        a['typical_login_hour'] = h
+
+    locs = np.array([a.get('loc', (19.07, 72.87)) for a in agents], dtype=float).reshape(-1, 2)
+    rating = _agent_column(agents, 'rating', 4.0)
+    experience_days = _agent_column(agents, 'experience_days', 0.0)
+    avg_trips_per_shift = _agent_column(agents, 'avg_trips_per_shift', 6.0)
+    multi_app = np.array([1.0 if a.get('multi_app', False) else 0.0 for a in agents])
+    base_rate = _agent_column(agents, 'base_hourly_rate', pay_per_hour)
+
+    n_hours = np.clip(np.round(dur_h), 1, 24).astype(np.int64)
+    total_demand_window = _window_sums(demand_by_hour, login_h, n_hours)
+    total_supply_window = _window_sums(np.maximum(1, supply_by_hour), login_h, n_hours)
+    demand_per_agent = total_demand_window / np.maximum(1.0, total_supply_window)
+    demand_norm = np.minimum(1.0, demand_per_agent / (max_demand / max(1, len(agents))))
+    omega_proxy = 0.3 + 0.6 * demand_norm
+    efficiency = (0.7 + 0.08 * (rating - 3.5)) * (1.0 + 0.0005 * experience_days)
+    y = np.clip(omega_proxy * efficiency, 0.2, 0.9)
+    X = np.column_stack([login_h, locs[:, 0], locs[:, 1], rating, experience_days, avg_trips_per_shift, multi_app, base_rate])
+
+    kernel = C(1.0, (1e-2, 1e3)) * RBF(length_scale=1.0)
+    gpr = GaussianProcessRegressor(kernel=kernel, n_restarts_optimizer=3, normalize_y=True)
+    gpr.fit(X, y)
+    return gpr
+
+def build_agent_feature_matrix(agents, pay_per_hour=PAY_PER_HOUR):
+    """GPR features per agent, one row per agent in `agents` order, at each agent's current 'loc'."""
+    # One draw per agent whether or not it has a typical login hour, as the per-agent .get default did
+    fallback_login = np.random.randint(0, 24, size=len(agents))
+    login_h = np.array([a.get('typical_login_hour', fallback) for a, fallback in zip(agents, fallback_login.tolist())], dtype=float)
+    locs = np.array([a['loc'] if 'loc' in a else (19.07, 72.87) for a in agents], dtype=float).reshape(-1, 2)
+    return np.column_stack([
+        np.trunc(login_h), locs[:, 0], locs[:, 1],
+        _agent_column(agents, 'rating', 4.0),
+        _agent_column(agents, 'experience_days', 0.0),
+        _agent_column(agents, 'avg_trips_per_shift', 6.0),
+        np.array([1.0 if a.get('multi_app', False) else 0.0 for a in agents]),
+        _agent_column(agents, 'base_hourly_rate', pay_per_hour),
+    ]).reshape(len(agents), 8)
+
+def predict_dynamic_g(X, gpr):
+    """One batched GPR call for every agent row in X."""
+    return np.clip(gpr.predict(X), 0.2, 0.9)
+
+def update_agent_omegas(dynamic_g, omega_pred, alpha=0.2):
+    """EMA-based ω update for all agents at once (in place)."""
+    dynamic_g *= (1 - alpha)
+    dynamic_g += alpha * omega_pred
+    return dynamic_g
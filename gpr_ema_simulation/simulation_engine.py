@@ -0,0 +1,531 @@
+"""
+WORK4FOOD Simulation Engine
+Importable, struct-of-arrays version of foodly_integrated4.py.
+
+Agent state (W, A, earnings, location, omega) lives in NumPy arrays and
+orders in time-sorted columnar arrays, so a window step is a handful of
+array operations. Importing this module has no side effects.
+
+As in foodly_integrated4.py, every window with orders re-predicts each
+agent's omega target from its current location with one batched GPR call
+and moves omega toward it by EMA. The engine keeps the fitted GPR and the
+agents' static feature columns and only swaps in the current lat/lon.
+
+Usage:
+    python simulation_engine.py --agents 80 --sample 50000 --hours 24
+    python simulation_engine.py --metrics-dir ./runs/metrics   # per-window metrics as .npz chunks
+"""
+import argparse
+import heapq
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from sklearn.neighbors import BallTree
+
+from geo_utils import haversine_km
+from gpr_omega import (
+    FEATURE_LAT, FEATURE_LON, train_gpr_for_omega, build_agent_feature_matrix, predict_dynamic_g,
+)
+
+SEED = 42
+NUM_AGENTS = 80
+ORDER_SAMPLE_SIZE = 50000
+SIMULATION_HOURS = 24
+WINDOW_SEC = 180
+SPEED_KMPH = 25
+PAY_PER_HOUR = 15.0
+EMA_ALPHA = 0.2
+K_PER_AGENT = 6
+CAP_FACTOR = 4
+HARD_CAP = 600
+DEFAULT_PREP_MINS = 8.0
+UNASSIGNED_COST = 1e6
+CENTER_LOCATION = (19.07, 72.87)
+
+
+class AgentState:
+    """Per-agent simulation state, one array entry per agent."""
+
+    def __init__(self, agent_ids, lat, lon, rate, omega_target, active=None, features=None):
+        n = len(agent_ids)
+        self.agent_ids = np.asarray(agent_ids, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float64).copy()
+        self.lon = np.asarray(lon, dtype=np.float64).copy()
+        self.rate = np.asarray(rate, dtype=np.float64)
+        self.omega_target = np.asarray(omega_target, dtype=np.float64)
+        self.omega = self.omega_target.copy()
+        self.W = np.zeros(n)
+        self.A = np.zeros(n)
+        self.earnings = np.zeros(n)
+        self.active = np.ones(n, dtype=bool) if active is None else np.asarray(active, dtype=bool)
+        self.busy = np.zeros(n, dtype=bool)  # out on a delivery; event-driven mode only
+        # GPR feature rows (build_agent_feature_matrix); only the static columns are read
+        self.features = None if features is None else np.asarray(features, dtype=np.float64).reshape(n, -1)
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def feature_matrix(self):
+        """GPR features at the agents' current locations."""
+        X = self.features.copy()
+        X[:, FEATURE_LAT] = self.lat
+        X[:, FEATURE_LON] = self.lon
+        return X
+
+    @classmethod
+    def from_agents(cls, agents, omega_target, pay_per_hour=PAY_PER_HOUR, features=None):
+        """Build from the loader's list of agent dicts."""
+        return cls(
+            agent_ids=[a['agent_id'] for a in agents],
+            lat=[a['loc'][0] for a in agents],
+            lon=[a['loc'][1] for a in agents],
+            rate=[float(a.get('base_hourly_rate', pay_per_hour)) for a in agents],
+            omega_target=omega_target,
+            active=[bool(a.get('active', True)) for a in agents],
+            features=features,
+        )
+
+
+class OrderColumns:
+    """
+    Orders as columns sorted by time (int64 ns). `picked` and `assigned`
+    (agent row, -1 if none) are positional and written in bulk per window.
+    """
+
+    def __init__(self, order_ids, time_ns, rest_lat, rest_lon, cust_lat, cust_lon, trip_time_mins, prep_mins):
+        order = np.argsort(time_ns, kind='stable')
+        self.order_ids = np.asarray(order_ids)[order]
+        self.time_ns = np.asarray(time_ns, dtype=np.int64)[order]
+        self.rest_lat = np.asarray(rest_lat, dtype=np.float64)[order]
+        self.rest_lon = np.asarray(rest_lon, dtype=np.float64)[order]
+        self.cust_lat = np.asarray(cust_lat, dtype=np.float64)[order]
+        self.cust_lon = np.asarray(cust_lon, dtype=np.float64)[order]
+        self.trip_time_mins = np.asarray(trip_time_mins, dtype=np.float64)[order]
+        self.prep_mins = np.asarray(prep_mins, dtype=np.float64)[order]
+        self.picked = np.zeros(len(self.time_ns), dtype=bool)
+        self.assigned = np.full(len(self.time_ns), -1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.time_ns)
+
+    @classmethod
+    def from_frame(cls, orders_df):
+        """Build from the loader's processed orders DataFrame (lat/lon columns or rest_loc/cust_loc tuples)."""
+        if 'rest_lat' in orders_df:
+            rest = np.column_stack([orders_df['rest_lat'].to_numpy(np.float64), orders_df['rest_lon'].to_numpy(np.float64)])
+            cust = np.column_stack([orders_df['cust_lat'].to_numpy(np.float64), orders_df['cust_lon'].to_numpy(np.float64)])
+        else:
+            rest = np.array(orders_df['rest_loc'].tolist(), dtype=np.float64).reshape(-1, 2)
+            cust = np.array(orders_df['cust_loc'].tolist(), dtype=np.float64).reshape(-1, 2)
+        n = len(orders_df)
+        trip = orders_df['trip_time_mins'].to_numpy(dtype=np.float64) if 'trip_time_mins' in orders_df else np.full(n, np.nan)
+        prep = orders_df['customer_prep_time'].to_numpy(dtype=np.float64) if 'customer_prep_time' in orders_df else np.full(n, DEFAULT_PREP_MINS)
+        return cls(
+            order_ids=orders_df['order_id'].to_numpy(),
+            time_ns=pd.to_datetime(orders_df['time']).to_numpy(dtype='datetime64[ns]').view(np.int64),
+            rest_lat=rest[:, 0], rest_lon=rest[:, 1],
+            cust_lat=cust[:, 0], cust_lon=cust[:, 1],
+            trip_time_mins=trip, prep_mins=prep,
+        )
+
+    def window(self, start_ns, end_ns):
+        """Positions of unpicked orders with start_ns <= time < end_ns."""
+        lo, hi = np.searchsorted(self.time_ns, [start_ns, end_ns], side='left')
+        return lo + np.flatnonzero(~self.picked[lo:hi])
+
+
+def write_back_assignments(orders_df, positions, agent_ids):
+    """
+    Mark the rows at `positions` (row positions, not labels) as picked by
+    `agent_ids` with one positional update per column.
+    """
+    if len(positions) == 0:
+        return
+    positions = np.asarray(positions, dtype=np.int64)
+    orders_df.iloc[positions, orders_df.columns.get_loc('picked')] = True
+    orders_df.iloc[positions, orders_df.columns.get_loc('assigned_agent')] = np.asarray(agent_ids, dtype=object)
+
+
+def nearest_restaurants(agent_lat, agent_lon, rest_lat, rest_lon, k):
+    """
+    Positions of each agent's k nearest restaurants, shape (n_agents, k),
+    nearest first with equal distances broken by position. One batched
+    BallTree (haversine) query; agents whose k-th neighbour is tied with the
+    next one are re-ranked exactly so the set does not depend on tree order.
+    """
+    k = min(k, len(rest_lat))
+    k_query = min(k + 1, len(rest_lat))
+    tree = BallTree(np.radians(np.column_stack([rest_lat, rest_lon])), metric='haversine')
+    dist, ind = tree.query(np.radians(np.column_stack([agent_lat, agent_lon])), k=k_query)
+    order = np.lexsort((ind, dist), axis=1)
+    dist = np.take_along_axis(dist, order, axis=1)
+    ind = np.take_along_axis(ind, order, axis=1)
+    nearest = ind[:, :k]
+    if k_query > k:
+        for i in np.flatnonzero(dist[:, k] <= dist[:, k - 1]):
+            d = haversine_km(agent_lat[i], agent_lon[i], rest_lat, rest_lon)
+            nearest[i] = np.argsort(d, kind='stable')[:k]
+    return nearest
+
+
+def select_candidates(agent_lat, agent_lon, rest_lat, rest_lon, k_per_agent=K_PER_AGENT, cap_factor=CAP_FACTOR, hard_cap=HARD_CAP):
+    """
+    Union of each agent's k nearest restaurants, taken in agent order until
+    `cap` orders are collected. Returns sorted positions into the window arrays.
+    """
+    n_orders, n_agents = len(rest_lat), len(agent_lat)
+    if n_orders == 0 or n_agents == 0:
+        return np.arange(n_orders)
+    cap = min(hard_cap, cap_factor * max(1, n_agents))
+    if n_orders <= cap:
+        return np.arange(n_orders)
+    nearest = nearest_restaurants(agent_lat, agent_lon, rest_lat, rest_lon, k_per_agent)
+    flat = nearest.ravel()
+    uniq, first_pos = np.unique(flat, return_index=True)
+    # Union size after each agent; stop at the first agent that reaches the cap
+    first_agent = first_pos // nearest.shape[1]
+    union_size = np.cumsum(np.bincount(first_agent, minlength=n_agents))
+    stop = np.searchsorted(union_size, cap, side='left')
+    chosen = uniq[first_agent <= stop]
+    return chosen[:cap]
+
+
+def window_work_hours(agent_lat, agent_lon, orders, idx, speed_kmph=SPEED_KMPH):
+    """w_b for every (agent, order) pair: travel to restaurant + prep + last mile, in hours."""
+    minutes_per_km = 60.0 / speed_kmph
+    t0 = haversine_km(agent_lat[:, None], agent_lon[:, None], orders.rest_lat[idx][None, :], orders.rest_lon[idx][None, :]) * minutes_per_km
+    trip = orders.trip_time_mins[idx]
+    has_trip = ~np.isnan(trip)
+    prep = np.where(has_trip, orders.prep_mins[idx], DEFAULT_PREP_MINS)
+    prep = np.where(np.isnan(prep), DEFAULT_PREP_MINS, prep)
+    last_mile = np.where(
+        has_trip,
+        trip,
+        haversine_km(orders.rest_lat[idx], orders.rest_lon[idx], orders.cust_lat[idx], orders.cust_lon[idx]) * minutes_per_km,
+    )
+    return (t0 + (prep + last_mile)[None, :]) / 60.0
+
+
+class SimulationEngine:
+    """
+    Batches orders into fixed windows and assigns them with the Hungarian
+    algorithm. By default a matched agent moves to the customer at once and
+    is free again in the next window. With event_driven=True an agent stays
+    busy until its delivery completes (dispatch at window end + w_b), tracked
+    with a heap of completion events, and stretches of windows without
+    orders are skipped in one jump.
+    """
+
+    def __init__(self, agents, orders, window_sec=WINDOW_SEC, speed_kmph=SPEED_KMPH, ema_alpha=EMA_ALPHA,
+                 k_per_agent=K_PER_AGENT, cap_factor=CAP_FACTOR, hard_cap=HARD_CAP, event_driven=False, gpr=None):
+        if gpr is not None and agents.features is None:
+            raise ValueError("a GPR omega model needs the agents' feature matrix")
+        self.agents = agents
+        self.orders = orders
+        self.window_sec = window_sec
+        self.window_ns = int(window_sec * 1e9)
+        self.speed_kmph = speed_kmph
+        self.ema_alpha = ema_alpha
+        self.k_per_agent = k_per_agent
+        self.cap_factor = cap_factor
+        self.hard_cap = hard_cap
+        self.event_driven = event_driven
+        self.gpr = gpr  # None keeps agents.omega_target fixed
+
+        self.start_ns = int(orders.time_ns[0]) if len(orders) else 0
+        self.end_ns = int(orders.time_ns[-1]) if len(orders) else -1
+        self.cursor_ns = self.start_ns
+        self.window_id = 0
+        self.history_window = []
+        self.runtime_sec = 0.0
+        self.completions = []  # heap of (completion_ns, agent row)
+        self.completed_deliveries = 0
+        self.skipped_windows = 0
+        self.orders_without_agent = 0
+        self.last_window = None
+        self.source = None  # what build_engine loaded and trained from; stored in checkpoints
+
+    @property
+    def done(self):
+        return self.cursor_ns > self.end_ns
+
+    def _skip_idle(self):
+        """Jump over whole windows before the next order, accruing active hours in one step."""
+        pos = np.searchsorted(self.orders.time_ns, self.cursor_ns, side='left')
+        if pos >= len(self.orders):
+            return
+        skip = (int(self.orders.time_ns[pos]) - self.cursor_ns) // self.window_ns
+        if skip > 0:
+            self.agents.A[self.agents.active] += skip * self.window_sec / 3600.0
+            self.cursor_ns += skip * self.window_ns
+            self.window_id += skip
+            self.skipped_windows += skip
+
+    def _release_completed(self):
+        """Free every agent whose delivery completed by the start of the current window."""
+        while self.completions and self.completions[0][0] <= self.cursor_ns:
+            _, row = heapq.heappop(self.completions)
+            self.agents.busy[row] = False
+            self.completed_deliveries += 1
+
+    def step(self):
+        """Simulate one window; returns the number of assignments made."""
+        agents, orders = self.agents, self.orders
+        if self.event_driven:
+            self._skip_idle()
+            self._release_completed()
+        window_end = self.cursor_ns + self.window_ns
+        idx = orders.window(self.cursor_ns, window_end)
+        active = np.flatnonzero(agents.active)
+        free = active[~agents.busy[active]] if self.event_driven else active
+        record = {
+            'window_id': self.window_id, 'start_ns': self.cursor_ns, 'orders': len(idx), 'free_agents': len(free),
+            'candidates': 0, 'assignments': 0, 'matrix_rows': 0, 'matrix_cols': 0, 'solve_ms': 0.0,
+        }
+
+        if len(idx):
+            if self.gpr is not None:
+                agents.omega_target = predict_dynamic_g(agents.feature_matrix(), self.gpr)
+            agents.omega *= (1 - self.ema_alpha)
+            agents.omega += self.ema_alpha * agents.omega_target
+            g = float(agents.omega.mean())
+            if len(free):
+                self._match(idx, free, g, window_end, record)
+            else:
+                self.orders_without_agent += len(idx)
+
+        agents.A[active] += self.window_sec / 3600.0
+        work_active_ratio = np.nan
+        if len(idx):
+            total_active = agents.A[active].sum()
+            if total_active > 0:
+                work_active_ratio = agents.W[active].sum() / total_active
+                self.history_window.append(work_active_ratio)
+
+        record['mean_omega'] = float(agents.omega.mean()) if len(agents) else np.nan
+        record['cumulative_handouts'] = float(self.handouts().sum())
+        record['work_active_ratio'] = float(work_active_ratio)
+        self.last_window = record
+        self.cursor_ns = window_end
+        self.window_id += 1
+        return record['assignments']
+
+    def _match(self, idx, free, g, window_end, record):
+        """Assign window orders `idx` to agent rows `free`, filling the window's metrics record."""
+        agents, orders = self.agents, self.orders
+        cand = idx[select_candidates(agents.lat[free], agents.lon[free], orders.rest_lat[idx], orders.rest_lon[idx],
+                                     self.k_per_agent, self.cap_factor, self.hard_cap)]
+        wb = window_work_hours(agents.lat[free], agents.lon[free], orders, cand, self.speed_kmph)
+        Wt = agents.W[free][:, None]
+        Gt = g * agents.A[free][:, None]
+        cost = np.where(Gt > Wt, np.maximum(Wt + wb - Gt, 0.0), wb)
+
+        n = max(cost.shape)
+        padded = np.full((n, n), UNASSIGNED_COST)
+        padded[:cost.shape[0], :cost.shape[1]] = cost
+        solve_start = time.perf_counter()
+        rows, cols = linear_sum_assignment(padded)
+        record['solve_ms'] = (time.perf_counter() - solve_start) * 1000.0
+        keep = (rows < cost.shape[0]) & (cols < cost.shape[1])
+        rows, cols = rows[keep], cols[keep]
+        keep = padded[rows, cols] < 1e5
+        rows, cols = rows[keep], cols[keep]
+
+        agent_rows, order_pos = free[rows], cand[cols]
+        work = wb[rows, cols]
+        agents.W[agent_rows] += work
+        agents.earnings[agent_rows] += agents.rate[agent_rows] * work
+        agents.lat[agent_rows] = orders.cust_lat[order_pos]
+        agents.lon[agent_rows] = orders.cust_lon[order_pos]
+        orders.picked[order_pos] = True
+        orders.assigned[order_pos] = agent_rows
+        if self.event_driven:
+            # Dispatched when the window closes; busy until pickup, prep and drop-off are done
+            done_ns = window_end + np.round(work * 3600e9).astype(np.int64)
+            agents.busy[agent_rows] = True
+            for t, row in zip(done_ns.tolist(), agent_rows.tolist()):
+                heapq.heappush(self.completions, (t, row))
+        record.update(candidates=len(cand), assignments=len(order_pos),
+                      matrix_rows=cost.shape[0], matrix_cols=cost.shape[1])
+
+    def iter_windows(self, max_windows=None):
+        """
+        Step through the run, yielding each window's metrics record (see
+        window_metrics.WINDOW_FIELDS). Stopping early leaves the engine
+        where it was, so a later call continues from the next window.
+        """
+        steps = 0
+        while not self.done and (max_windows is None or steps < max_windows):
+            start = time.perf_counter()
+            self.step()
+            elapsed = time.perf_counter() - start
+            self.runtime_sec += elapsed
+            self.last_window['step_ms'] = elapsed * 1000.0
+            steps += 1
+            yield self.last_window
+
+    def run(self, max_windows=None, metrics=None, checkpointer=None):
+        """
+        Run to the end (or max_windows). metrics is an optional sink with
+        append(record) and flush(), e.g. WindowMetricsWriter; checkpointer is
+        an optional checkpoint.Checkpointer. Metrics are flushed before each
+        checkpoint, so a resumed run never leaves a gap in them.
+        """
+        for record in self.iter_windows(max_windows):
+            if metrics is not None:
+                metrics.append(record)
+            if checkpointer is not None and checkpointer.due(self):
+                if metrics is not None:
+                    metrics.flush()
+                checkpointer.save(self)
+        return self.summary()
+
+    def handouts(self):
+        """Per-agent guarantee top-up owed so far, at the median omega."""
+        agents = self.agents
+        omega = float(np.median(agents.omega)) if len(agents) else 0.0
+        return agents.rate * np.maximum(0.0, omega * agents.A - agents.W)
+
+    def summary(self):
+        agents, orders = self.agents, self.orders
+        omega = float(np.median(agents.omega))
+        handout = self.handouts()
+        total_pay = agents.earnings + handout
+        platform_cost = float(total_pay.sum())
+        total_handouts = float(handout.sum())
+        fulfilled = int(orders.picked.sum())
+        return {
+            'agents': len(agents),
+            'orders': len(orders),
+            'fulfilled': fulfilled,
+            'fulfillment_rate': fulfilled / len(orders) * 100 if len(orders) else 0.0,
+            'windows': self.window_id,
+            'total_work_hours': float(agents.W.sum()),
+            'total_active_hours': float(agents.A.sum()),
+            'total_earnings': float(agents.earnings.sum()),
+            'total_handouts': total_handouts,
+            'platform_cost': platform_cost,
+            'handout_ratio': total_handouts / platform_cost * 100 if platform_cost > 0 else 0.0,
+            'omega': omega,
+            'agents_with_handouts': int((handout > 0).sum()),
+            'runtime_sec': self.runtime_sec,
+            'event_driven': self.event_driven,
+            'completed_deliveries': self.completed_deliveries,
+            'skipped_windows': self.skipped_windows,
+            'orders_without_agent': self.orders_without_agent,
+        }
+
+    def assigned_agent_ids(self):
+        """Worker id per order (None if unassigned), in the engine's time-sorted order."""
+        out = np.full(len(self.orders), None, dtype=object)
+        mask = self.orders.assigned >= 0
+        out[mask] = self.agents.agent_ids[self.orders.assigned[mask]]
+        return out
+
+
+def build_engine(workers_csv='workers.csv', sessions_csv='sessions.csv', orders_csv='orders.csv',
+                 num_agents=NUM_AGENTS, sample_size=ORDER_SAMPLE_SIZE, hours=SIMULATION_HOURS,
+                 seed=SEED, pay_per_hour=PAY_PER_HOUR, cache_dir='./processed_data/cache', chunksize=None,
+                 **engine_kwargs):
+    """
+    Load the WORK4FOOD CSVs, train the omega GPR and return a ready engine.
+    Seeds and RNG consumption follow foodly_integrated4.py, so both see the same data.
+    cache_dir=None bypasses the processed-data cache; chunksize streams orders.csv.
+    """
+    from work4food_csv_loader import Work4FoodDataLoader
+
+    random.seed(seed)
+    np.random.seed(seed)
+    loader = Work4FoodDataLoader(workers_csv, sessions_csv, orders_csv)
+    agents, orders_df, sessions_df = loader.load_processed(
+        cache_dir=cache_dir, center_location=CENTER_LOCATION, radius_km=12, limit=num_agents,
+        sample_size=sample_size, start_date=None, duration_hours=hours, chunksize=chunksize,
+    )
+
+    gpr = train_gpr_for_omega(agents, orders_df, sessions_df, pay_per_hour=pay_per_hour)
+    features = build_agent_feature_matrix(agents, pay_per_hour=pay_per_hour)
+    engine = SimulationEngine(
+        AgentState.from_agents(agents, predict_dynamic_g(features, gpr), pay_per_hour=pay_per_hour, features=features),
+        OrderColumns.from_frame(orders_df),
+        gpr=gpr,
+        **engine_kwargs,
+    )
+    engine.source = {
+        'csv': [workers_csv, sessions_csv, orders_csv], 'cache_entry': loader.cache_entry,
+        'num_agents': num_agents, 'sample_size': sample_size, 'hours': hours, 'seed': seed,
+        'pay_per_hour': pay_per_hour,
+    }
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the WORK4FOOD GPR/EMA simulation")
+    parser.add_argument('--workers', default='workers.csv')
+    parser.add_argument('--sessions', default='sessions.csv')
+    parser.add_argument('--orders', default='orders.csv')
+    parser.add_argument('--agents', type=int, default=NUM_AGENTS)
+    parser.add_argument('--sample', type=int, default=ORDER_SAMPLE_SIZE)
+    parser.add_argument('--hours', type=float, default=SIMULATION_HOURS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--window-sec', type=int, default=WINDOW_SEC)
+    parser.add_argument('--speed-kmph', type=float, default=SPEED_KMPH)
+    parser.add_argument('--pay-per-hour', type=float, default=PAY_PER_HOUR)
+    parser.add_argument('--ema-alpha', type=float, default=EMA_ALPHA)
+    parser.add_argument('--k-per-agent', type=int, default=K_PER_AGENT, help="nearest restaurants per agent in the candidate set")
+    parser.add_argument('--cap-factor', type=int, default=CAP_FACTOR)
+    parser.add_argument('--hard-cap', type=int, default=HARD_CAP)
+    parser.add_argument('--event-driven', action='store_true', help="agents stay busy until delivery completes; idle windows are skipped")
+    parser.add_argument('--cache-dir', default='./processed_data/cache')
+    parser.add_argument('--no-cache', action='store_true', help="rebuild from the CSVs without reading or writing the cache")
+    parser.add_argument('--chunksize', type=int, default=None, help="stream orders.csv in chunks of this many rows")
+    parser.add_argument('--metrics-dir', default=None, help="stream per-window metrics to .npz chunks in this directory")
+    parser.add_argument('--metrics-chunk', type=int, default=500, help="windows per metrics chunk")
+    parser.add_argument('--checkpoint-dir', default=None, help="save resumable checkpoints in this directory")
+    parser.add_argument('--checkpoint-every', type=int, default=100, help="windows between checkpoints")
+    parser.add_argument('--resume', action='store_true', help="continue from the newest checkpoint in --checkpoint-dir")
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume requires --checkpoint-dir")
+
+    load_start = time.perf_counter()
+    engine = build_engine(
+        args.workers, args.sessions, args.orders,
+        num_agents=args.agents, sample_size=args.sample, hours=args.hours,
+        seed=args.seed, pay_per_hour=args.pay_per_hour,
+        cache_dir=None if args.no_cache else args.cache_dir, chunksize=args.chunksize,
+        window_sec=args.window_sec, speed_kmph=args.speed_kmph, ema_alpha=args.ema_alpha,
+        k_per_agent=args.k_per_agent, cap_factor=args.cap_factor, hard_cap=args.hard_cap,
+        event_driven=args.event_driven,
+    )
+    load_sec = time.perf_counter() - load_start
+
+    checkpointer, resumed = None, None
+    if args.checkpoint_dir:
+        from checkpoint import Checkpointer
+
+        checkpointer = Checkpointer(args.checkpoint_dir, every=args.checkpoint_every, reference=engine.source)
+        if args.resume:
+            resumed = checkpointer.restore_latest(engine)
+            if resumed:
+                print(f"✓ Resumed from {resumed} at window {engine.window_id}")
+    metrics = None
+    if args.metrics_dir:
+        from window_metrics import WindowMetricsWriter
+
+        metrics = WindowMetricsWriter(args.metrics_dir, chunk_windows=args.metrics_chunk, append=resumed is not None)
+    try:
+        summary = engine.run(metrics=metrics, checkpointer=checkpointer)
+    finally:
+        if metrics is not None:
+            metrics.close()
+    summary['load_sec'] = load_sec
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
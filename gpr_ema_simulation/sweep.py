@@ -0,0 +1,172 @@
+"""
+Parameter sweep for the WORK4FOOD simulation engine.
+
+The dataset is loaded once through the loader's columnar cache, then one
+SimulationEngine runs per grid point across a process pool. Workers open
+the same cache entry with np.load(mmap_mode='r'), so orders are shared
+through the page cache instead of being re-parsed or pickled per worker.
+Each finished run appends one row (parameters + metrics) to a tidy CSV.
+
+Usage:
+    python sweep.py --grid window_sec=120,180,300 --grid ema_alpha=0.1,0.2 --out sweep_results.csv
+"""
+import argparse
+import copy
+import csv
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from columnar_cache import read_entry
+from gpr_omega import train_gpr_for_omega, build_agent_feature_matrix, predict_dynamic_g
+from simulation_engine import (
+    AgentState, OrderColumns, SimulationEngine,
+    CAP_FACTOR, CENTER_LOCATION, EMA_ALPHA, HARD_CAP, K_PER_AGENT, NUM_AGENTS,
+    ORDER_SAMPLE_SIZE, PAY_PER_HOUR, SEED, SIMULATION_HOURS, SPEED_KMPH, WINDOW_SEC,
+)
+
+# Sweepable parameters with their types and defaults
+SWEEP_PARAMS = {
+    'window_sec': (int, WINDOW_SEC),
+    'speed_kmph': (float, SPEED_KMPH),
+    'pay_per_hour': (float, PAY_PER_HOUR),
+    'ema_alpha': (float, EMA_ALPHA),
+    'k_per_agent': (int, K_PER_AGENT),
+    'cap_factor': (int, CAP_FACTOR),
+    'hard_cap': (int, HARD_CAP),
+}
+RESULT_METRICS = [
+    'orders', 'fulfilled', 'fulfillment_rate', 'handout_ratio', 'omega', 'platform_cost',
+    'total_handouts', 'total_work_hours', 'agents_with_handouts', 'windows', 'runtime_sec',
+]
+
+_worker_frames = None
+
+
+def parse_grid(specs):
+    """['window_sec=120,180', ...] -> {'window_sec': [120, 180], ...}"""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if name not in SWEEP_PARAMS or not values:
+            raise ValueError(f"bad grid spec {spec!r}; expected one of {sorted(SWEEP_PARAMS)} as name=v1,v2")
+        cast = SWEEP_PARAMS[name][0]
+        grid[name] = [cast(v) for v in values.split(',')]
+    return grid
+
+
+def expand_grid(grid):
+    """Every combination of the grid values, with unswept parameters at their defaults."""
+    names = list(grid)
+    points = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        point = {name: default for name, (_, default) in SWEEP_PARAMS.items()}
+        point.update(zip(names, values))
+        points.append(point)
+    return points
+
+
+def _init_worker(entry_dir):
+    global _worker_frames
+    _worker_frames = read_entry(entry_dir)[0]
+
+
+def run_point(run_id, params, gpr, features):
+    """One simulation on the worker's shared frames; returns a result row."""
+    agents = _worker_frames['agents'].to_dict('records')
+    engine = SimulationEngine(
+        AgentState.from_agents(agents, predict_dynamic_g(features, gpr), pay_per_hour=params['pay_per_hour'], features=features),
+        OrderColumns.from_frame(_worker_frames['orders']),
+        gpr=gpr,
+        **{k: v for k, v in params.items() if k != 'pay_per_hour'},
+    )
+    summary = engine.run()
+    return {'run_id': run_id, **params, **{m: summary[m] for m in RESULT_METRICS}, 'pid': os.getpid()}
+
+
+def omega_models(agents, orders_df, sessions_df, pay_rates):
+    """
+    (fitted GPR, agent feature matrix) per pay rate; workers re-predict the
+    omega targets from them every window. Each is trained from the same
+    global RNG state, the one build_engine would train from, so a sweep
+    point matches a standalone simulation_engine run with the same parameters.
+    """
+    state = np.random.get_state()
+    models = {}
+    for pay in pay_rates:
+        np.random.set_state(state)
+        run_agents = copy.deepcopy(agents)
+        gpr = train_gpr_for_omega(run_agents, orders_df, sessions_df, pay_per_hour=pay)
+        models[pay] = (gpr, build_agent_feature_matrix(run_agents, pay_per_hour=pay))
+    return models
+
+
+def sweep(grid, out_csv, processes=None, workers_csv='workers.csv', sessions_csv='sessions.csv',
+          orders_csv='orders.csv', num_agents=NUM_AGENTS, sample_size=ORDER_SAMPLE_SIZE,
+          hours=SIMULATION_HOURS, seed=SEED, cache_dir='./processed_data/cache', chunksize=None):
+    """Run every grid point and write one row per run to out_csv; returns the rows by run_id."""
+    from work4food_csv_loader import Work4FoodDataLoader
+
+    if not cache_dir:
+        raise ValueError("sweep shares the dataset through the columnar cache; cache_dir is required")
+    random.seed(seed)
+    np.random.seed(seed)
+    loader = Work4FoodDataLoader(workers_csv, sessions_csv, orders_csv)
+    agents, orders_df, sessions_df = loader.load_processed(
+        cache_dir=cache_dir, center_location=CENTER_LOCATION, radius_km=12, limit=num_agents,
+        sample_size=sample_size, start_date=None, duration_hours=hours, chunksize=chunksize,
+    )
+    points = expand_grid(grid)
+    models = omega_models(agents, orders_df, sessions_df, sorted({p['pay_per_hour'] for p in points}))
+
+    fields = ['run_id', *SWEEP_PARAMS, *RESULT_METRICS, 'pid']
+    rows = []
+    start = time.perf_counter()
+    with open(out_csv, 'w', newline='') as f, \
+            ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(loader.cache_entry,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        futures = [pool.submit(run_point, i, p, *models[p['pay_per_hour']]) for i, p in enumerate(points)]
+        for future in as_completed(futures):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            print(f"   [{len(rows)}/{len(points)}] run {row['run_id']}: "
+                  f"fulfillment {row['fulfillment_rate']:.1f}%, handouts {row['handout_ratio']:.1f}%, "
+                  f"omega {row['omega']:.3f} ({row['runtime_sec']:.2f}s)")
+    print(f"✓ {len(rows)} runs in {time.perf_counter() - start:.1f}s -> {out_csv}")
+    return sorted(rows, key=lambda r: r['run_id'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep WORK4FOOD simulation parameters over a process pool")
+    parser.add_argument('--grid', action='append', default=[],
+                        help=f"name=v1,v2,... for one of {', '.join(SWEEP_PARAMS)}; repeat per parameter")
+    parser.add_argument('--out', default='sweep_results.csv')
+    parser.add_argument('--processes', type=int, default=None, help="pool size (default: CPU count)")
+    parser.add_argument('--workers', default='workers.csv')
+    parser.add_argument('--sessions', default='sessions.csv')
+    parser.add_argument('--orders', default='orders.csv')
+    parser.add_argument('--agents', type=int, default=NUM_AGENTS)
+    parser.add_argument('--sample', type=int, default=ORDER_SAMPLE_SIZE)
+    parser.add_argument('--hours', type=float, default=SIMULATION_HOURS)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--cache-dir', default='./processed_data/cache')
+    parser.add_argument('--chunksize', type=int, default=None, help="stream orders.csv in chunks of this many rows")
+    args = parser.parse_args(argv)
+
+    return sweep(
+        parse_grid(args.grid), args.out, processes=args.processes,
+        workers_csv=args.workers, sessions_csv=args.sessions, orders_csv=args.orders,
+        num_agents=args.agents, sample_size=args.sample, hours=args.hours, seed=args.seed,
+        cache_dir=args.cache_dir, chunksize=args.chunksize,
+    )
+
+
+if __name__ == "__main__":
+    main()
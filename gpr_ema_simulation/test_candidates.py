@@ -0,0 +1,82 @@
+"""
+Regression test for the simulation's candidate-order selection: the batched
+BallTree query must pick the same orders as the old per-agent loop that
+sorted every restaurant by distance. Run directly for a timing comparison.
+"""
+import sys
+import os
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from geo_utils import haversine_km
+from simulation_engine import select_candidates
+
+
+def _legacy_candidates(agent_lat, agent_lon, rest_lat, rest_lon, k_per_agent=6, cap_factor=4, hard_cap=600):
+    """The old _select_candidate_orders loop, on position arrays."""
+    n_orders, n_agents = len(rest_lat), len(agent_lat)
+    if n_orders == 0 or n_agents == 0:
+        return list(range(n_orders))
+    cap = min(hard_cap, cap_factor * max(1, n_agents))
+    if n_orders <= cap:
+        return list(range(n_orders))
+    candidate_indices = set()
+    for i in range(n_agents):
+        dists = [(float(haversine_km(agent_lat[i], agent_lon[i], rest_lat[j], rest_lon[j])), j) for j in range(n_orders)]
+        dists.sort(key=lambda x: x[0])
+        for _, idx in dists[:k_per_agent]:
+            candidate_indices.add(idx)
+        if len(candidate_indices) >= cap:
+            break
+    # The loop truncated in set iteration order; the engine keeps the lowest positions
+    return sorted(candidate_indices)[:cap]
+
+
+def _make_window(n_agents, n_orders, seed, duplicates=0):
+    rng = np.random.RandomState(seed)
+    agent_lat = 19.07 + rng.uniform(-0.1, 0.1, n_agents)
+    agent_lon = 72.87 + rng.uniform(-0.1, 0.1, n_agents)
+    rest_lat = 19.07 + rng.uniform(-0.1, 0.1, n_orders)
+    rest_lon = 72.87 + rng.uniform(-0.1, 0.1, n_orders)
+    if duplicates:
+        # Several orders from the same restaurant tie on distance
+        src = rng.randint(0, n_orders, duplicates)
+        dst = rng.randint(0, n_orders, duplicates)
+        rest_lat[dst], rest_lon[dst] = rest_lat[src], rest_lon[src]
+    return agent_lat, agent_lon, rest_lat, rest_lon
+
+
+def test_balltree_selection_matches_legacy():
+    cases = [
+        dict(n_agents=10, n_orders=30, k_per_agent=6),    # under the cap: every order
+        dict(n_agents=20, n_orders=300, k_per_agent=6),   # union of nearest sets
+        dict(n_agents=5, n_orders=200, k_per_agent=6),    # cap reached part-way through the agents
+        dict(n_agents=30, n_orders=400, k_per_agent=3, duplicates=150),
+        dict(n_agents=1, n_orders=50, k_per_agent=1),
+    ]
+    for seed, case in enumerate(cases):
+        n_agents, n_orders, k = case['n_agents'], case['n_orders'], case['k_per_agent']
+        window = _make_window(n_agents, n_orders, seed, case.get('duplicates', 0))
+        expected = _legacy_candidates(*window, k_per_agent=k)
+        got = select_candidates(*window, k_per_agent=k)
+        assert got.tolist() == expected, f"case {case}"
+
+
+def benchmark(n_agents=80, n_orders=2000, seed=0):
+    window = _make_window(n_agents, n_orders, seed)
+    start = time.perf_counter()
+    _legacy_candidates(*window)
+    legacy_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    select_candidates(*window)
+    balltree_sec = time.perf_counter() - start
+    print(f"{n_agents} agents x {n_orders} orders: legacy {legacy_sec*1000:.1f} ms, BallTree {balltree_sec*1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    test_balltree_selection_matches_legacy()
+    print("✓ BallTree candidate selection matches the legacy loop")
+    benchmark()
@@ -0,0 +1,52 @@
+"""
+Tests for the processed-data cache: entries round-trip through
+write_entry/read_entry, and prune_entries keeps the cache directory bounded
+to the most recently used entries.
+"""
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from columnar_cache import prune_entries, read_entry, touch_entry, write_entry
+
+
+def _frame(seed):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'x': rng.rand(5), 'zone': pd.Categorical(rng.randint(0, 3, 5))})
+
+
+def test_entry_round_trip():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        entry = os.path.join(cache_dir, 'key')
+        write_entry(entry, {'orders': _frame(0)}, extra={'n': 1})
+        frames, extra = read_entry(entry)
+        pd.testing.assert_frame_equal(frames['orders'], _frame(0), check_categorical=False)
+        assert extra == {'n': 1}
+
+
+def test_prune_keeps_most_recently_used():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        entries = []
+        for i in range(5):
+            entry = os.path.join(cache_dir, f'key{i}')
+            write_entry(entry, {'orders': _frame(i)})
+            os.utime(os.path.join(entry, 'meta.json'), ns=(i * 10**9, i * 10**9))
+            entries.append(entry)
+        os.makedirs(os.path.join(cache_dir, '.tmp-build'))  # a build in progress
+        touch_entry(entries[0])  # key0 was just read again
+
+        removed = prune_entries(cache_dir, keep=entries[1], max_entries=3)
+        assert sorted(removed) == ['key2', 'key3']
+        assert sorted(os.listdir(cache_dir)) == ['.tmp-build', 'key0', 'key1', 'key4']
+        assert read_entry(entries[1]) is not None
+
+
+if __name__ == "__main__":
+    test_entry_round_trip()
+    test_prune_keeps_most_recently_used()
+    print("✓ Columnar cache tests passed")
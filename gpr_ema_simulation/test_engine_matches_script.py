@@ -0,0 +1,42 @@
+"""
+Equivalence test: simulation_engine.build_engine + run must reproduce the
+reference script foodly_integrated4.py on the same data, including the
+per-window GPR re-prediction of each agent's omega target.
+"""
+import sys
+import os
+import re
+import subprocess
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_work4food_data import generate
+from simulation_engine import build_engine
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'foodly_integrated4.py')
+
+
+def _script_metric(output, label):
+    return float(re.search(re.escape(label) + r": \$?([\d,.]+)", output).group(1).replace(',', ''))
+
+
+def test_engine_matches_script():
+    with tempfile.TemporaryDirectory() as out_dir:
+        generate(out_dir, num_workers=150, num_orders=4000, num_days=1, chunk_size=1000)
+        # The script reads workers/sessions/orders.csv from its working directory
+        output = subprocess.run([sys.executable, SCRIPT], cwd=out_dir, capture_output=True, encoding='utf-8', check=True).stdout
+        engine = build_engine(*(os.path.join(out_dir, f) for f in ('workers.csv', 'sessions.csv', 'orders.csv')), cache_dir=None)
+        summary = engine.run()
+
+    assert summary['fulfilled'] == _script_metric(output, 'Orders fulfilled')
+    assert summary['total_work_hours'] == pytest.approx(_script_metric(output, 'Total work hours'), abs=0.005)
+    assert summary['total_handouts'] == pytest.approx(_script_metric(output, 'Total handouts (guarantees)'), abs=0.005)
+    assert summary['omega'] == pytest.approx(_script_metric(output, 'Final omega (ω)'), abs=5e-5)
+
+
+if __name__ == "__main__":
+    test_engine_matches_script()
+    print("✓ Engine matches foodly_integrated4.py")
@@ -0,0 +1,76 @@
+"""
+Regression test for hourly_demand_supply: the vectorized histograms must
+equal the dictionaries built by the old iterrows loop that stepped through
+each session one hour at a time.
+"""
+import sys
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gpr_omega import hourly_demand_supply
+
+
+def _legacy_demand_supply(orders_df, sessions_df):
+    """The old _build_hourly_demand_supply."""
+    orders_by_hour = orders_df['time'].dt.hour.value_counts().sort_index()
+    demand_by_hour = {int(h): int(orders_by_hour.get(h, 0)) for h in range(24)}
+    supply_by_hour = {h: 0 for h in range(24)}
+    if 'login_time' in sessions_df.columns and 'logout_time' in sessions_df.columns:
+        for _, s in sessions_df.iterrows():
+            if pd.isna(s['login_time']) or pd.isna(s['logout_time']):
+                continue
+            start = s['login_time']
+            end = s['logout_time']
+            if end < start:
+                start, end = end, start
+            t = start
+            while t <= end:
+                supply_by_hour[int(t.hour)] += 1
+                t += timedelta(hours=1)
+    else:
+        avg_supply = max(1, len(sessions_df) // 8)
+        supply_by_hour = {h: avg_supply for h in range(24)}
+    return demand_by_hour, supply_by_hour
+
+
+def _random_frames(seed, n_orders=500, n_sessions=200):
+    rng = np.random.RandomState(seed)
+    base = pd.Timestamp('2024-01-01')
+    orders_df = pd.DataFrame({'time': base + pd.to_timedelta(rng.randint(0, 3 * 86400, n_orders), unit='s')})
+    login = base + pd.to_timedelta(rng.randint(0, 3 * 86400, n_sessions), unit='s')
+    # Mostly shifts of a few hours, some longer than a day, some reversed (logout before login)
+    span = np.where(rng.rand(n_sessions) < 0.9, rng.uniform(0, 12 * 3600, n_sessions), rng.uniform(24 * 3600, 60 * 3600, n_sessions))
+    span = np.where(rng.rand(n_sessions) < 0.1, -span, span)
+    logout = login + pd.to_timedelta(np.round(span), unit='s')
+    sessions_df = pd.DataFrame({'login_time': login, 'logout_time': logout})
+    missing = rng.rand(n_sessions) < 0.05
+    sessions_df.loc[missing, 'logout_time'] = pd.NaT
+    return orders_df, sessions_df
+
+
+def _assert_matches_legacy(orders_df, sessions_df):
+    demand, supply = hourly_demand_supply(orders_df, sessions_df)
+    legacy_demand, legacy_supply = _legacy_demand_supply(orders_df, sessions_df)
+    assert {h: int(demand[h]) for h in range(24)} == legacy_demand
+    assert {h: int(supply[h]) for h in range(24)} == legacy_supply
+
+
+def test_matches_legacy_on_random_sessions():
+    for seed in range(30):
+        _assert_matches_legacy(*_random_frames(seed))
+
+
+def test_matches_legacy_without_session_times():
+    orders_df, sessions_df = _random_frames(0)
+    _assert_matches_legacy(orders_df, sessions_df.drop(columns=['logout_time']))
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_random_sessions()
+    test_matches_legacy_without_session_times()
+    print("✓ hourly_demand_supply matches the legacy loop")
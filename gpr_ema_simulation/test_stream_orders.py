@@ -0,0 +1,64 @@
+"""
+Tests for streaming orders.csv in chunks: sampled streams keep the zone
+columns categorical across chunks with different zones, and a chunked load
+without a cache_dir cleans up its temporary entry directory.
+"""
+import sys
+import os
+import gc
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_work4food_data import generate
+from work4food_csv_loader import Work4FoodDataLoader
+
+
+def _loader(out_dir):
+    generate(out_dir, num_workers=30, num_orders=3000, num_days=1, chunk_size=1000)
+    return Work4FoodDataLoader(*(os.path.join(out_dir, f) for f in ('workers.csv', 'sessions.csv', 'orders.csv')))
+
+
+def test_sampled_stream_keeps_zone_categoricals():
+    with tempfile.TemporaryDirectory() as out_dir:
+        loader = _loader(out_dir)
+        chunks = list(loader.stream_orders(chunksize=200, sample_size=500))
+        assert len(chunks) == 1
+        sample = chunks[0]
+        assert len(sample) == 500
+        for col in ('restaurant_zone', 'customer_zone'):
+            assert isinstance(sample[col].dtype, pd.CategoricalDtype)
+            assert sample[col].notna().all()
+        full = pd.read_csv(os.path.join(out_dir, 'orders.csv'), usecols=['order_id', 'restaurant_zone'])
+        zones = full.set_index('order_id').loc[sample['order_id'], 'restaurant_zone'].to_numpy()
+        assert np.array_equal(sample['restaurant_zone'].astype(int).to_numpy(), zones)
+
+
+def test_chunked_load_without_cache_removes_temp_dir():
+    with tempfile.TemporaryDirectory() as out_dir:
+        loader = _loader(out_dir)
+        _, orders, _ = loader.load_processed(cache_dir=None, chunksize=500)
+        entry_dir = loader.cache_entry
+        assert os.path.isdir(entry_dir)
+        assert len(orders) == 3000
+        del loader, orders
+        gc.collect()
+        assert not os.path.exists(os.path.dirname(entry_dir))
+
+
+def test_empty_orders_file_still_streams():
+    with tempfile.TemporaryDirectory() as out_dir:
+        generate(out_dir, num_workers=5, num_orders=0, num_days=1)
+        loader = Work4FoodDataLoader(*(os.path.join(out_dir, f) for f in ('workers.csv', 'sessions.csv', 'orders.csv')))
+        chunks = list(loader.stream_orders(chunksize=100))
+        assert sum(len(c) for c in chunks) == 0
+
+
+if __name__ == "__main__":
+    test_sampled_stream_keeps_zone_categoricals()
+    test_chunked_load_without_cache_removes_temp_dir()
+    test_empty_orders_file_still_streams()
+    print("✓ Streaming order tests passed")
@@ -0,0 +1,87 @@
+"""
+Regression test for the simulation's assignment writeback: the per-window
+positional update must leave `picked`/`assigned_agent` identical to the old
+per-assignment `.loc` scans. Run directly for a timing comparison.
+"""
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from simulation_engine import write_back_assignments
+
+
+def _make_orders(n_orders, seed=0):
+    rng = np.random.RandomState(seed)
+    orders_df = pd.DataFrame({
+        'order_id': np.arange(n_orders) + 100000,
+        'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.randint(0, 86400, n_orders)), unit='s'),
+    })
+    orders_df['picked'] = False
+    orders_df['assigned_agent'] = None
+    return orders_df
+
+
+def _make_windows(n_orders, n_windows, per_window, seed=1):
+    """Disjoint random row positions per window, each paired with an agent id."""
+    rng = np.random.RandomState(seed)
+    positions = rng.choice(n_orders, size=n_windows * per_window, replace=False)
+    agents = np.array([f"W{i:04d}" for i in rng.randint(0, 80, size=positions.size)], dtype=object)
+    return [
+        (positions[k * per_window:(k + 1) * per_window], agents[k * per_window:(k + 1) * per_window])
+        for k in range(n_windows)
+    ]
+
+
+def _legacy_writeback(orders_df, windows):
+    for positions, agent_ids in windows:
+        for pos, agent_id in zip(positions, agent_ids):
+            order_id = orders_df['order_id'].iat[pos]
+            orders_df.loc[orders_df['order_id'] == order_id, 'picked'] = True
+            orders_df.loc[orders_df['order_id'] == order_id, 'assigned_agent'] = agent_id
+
+
+def _bulk_writeback(orders_df, windows):
+    for positions, agent_ids in windows:
+        write_back_assignments(orders_df, list(positions), list(agent_ids))
+
+
+def test_writeback_matches_legacy():
+    """Bulk writeback leaves the same picked/assigned_agent columns as the .loc loop"""
+    windows = _make_windows(20000, n_windows=50, per_window=80)
+    windows.append((np.array([], dtype=np.int64), np.array([], dtype=object)))
+
+    legacy = _make_orders(20000)
+    bulk = _make_orders(20000)
+    _legacy_writeback(legacy, windows)
+    _bulk_writeback(bulk, windows)
+
+    assert bulk['picked'].dtype == legacy['picked'].dtype
+    assert bulk['picked'].tolist() == legacy['picked'].tolist()
+    assert bulk['assigned_agent'].tolist() == legacy['assigned_agent'].tolist()
+    assert int(bulk['picked'].sum()) == 50 * 80
+
+
+def benchmark(n_orders, n_windows=25, per_window=80):
+    windows = _make_windows(n_orders, n_windows, per_window)
+    timings = {}
+    for name, fn in (("legacy .loc", _legacy_writeback), ("positional", _bulk_writeback)):
+        orders_df = _make_orders(n_orders)
+        start = time.perf_counter()
+        fn(orders_df, windows)
+        timings[name] = (time.perf_counter() - start) / n_windows * 1000.0
+    print(f"{n_orders:>9,} orders, {per_window} assignments/window: "
+          f"legacy {timings['legacy .loc']:.2f} ms/window, "
+          f"positional {timings['positional']:.3f} ms/window "
+          f"({timings['legacy .loc'] / timings['positional']:.0f}x)")
+
+
+if __name__ == "__main__":
+    test_writeback_matches_legacy()
+    print("✓ Writeback matches legacy .loc updates")
+    for n in (50_000, 1_000_000):
+        benchmark(n)
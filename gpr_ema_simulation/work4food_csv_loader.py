@@ -3,11 +3,53 @@ Data Loader for WORK4FOOD Simulation
 Integrates workers.csv, sessions.csv, and orders.csv with work4food.py
 """
 
+import hashlib
+import os
+import tempfile
+import time
+import weakref
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 from datetime import datetime, timedelta
 import json
 
+from columnar_cache import MAX_ENTRIES, cache_key, prune_entries, read_entry, touch_entry, write_entry, write_frame
+
+# Explicit compact dtypes for streamed orders.csv chunks; timestamps are
+# parsed per chunk and zones become categoricals in the output.
+ORDER_CSV_DTYPES = {
+    'order_id': 'int64',
+    'restaurant_zone': 'int32',
+    'customer_zone': 'int32',
+    'distance_km': 'float32',
+    'distance_miles': 'float32',
+    'trip_time_mins': 'float32',
+    'trip_time_seconds': 'float32',
+    'base_fare': 'float32',
+    'customer_prep_time': 'float32',
+    'prep_time_mins': 'float32',
+    'expected_delivery_mins': 'float32',
+}
+ZONE_COLUMNS = ('restaurant_zone', 'customer_zone')
+
+
+def zone_location_table(zone_ids, center=(19.07, 72.87), radius=15):
+    """
+    Approximate lat/lon for each zone ID, placed around the city center.
+    Each zone keeps its own RandomState(zone_id) stream, so locations are
+    stable per zone and the global NumPy RNG is left untouched.
+    """
+    zone_ids = np.asarray(zone_ids)
+    bearing = np.array([np.random.RandomState(int(z)).random_sample() for z in zone_ids]) * 2 * np.pi
+    r = (zone_ids % 100) / 100.0 * radius  # Map zone to radius
+    dx = r * np.cos(bearing)
+    dy = r * np.sin(bearing)
+    lat = center[0] + dy / 111.0
+    lon = center[1] + dx / (111.0 * np.cos(np.radians(center[0])))
+    return lat, lon
+
+
 class Work4FoodDataLoader:
     def __init__(self, workers_path='workers.csv', 
                  sessions_path='sessions.csv', 
@@ -32,9 +74,11 @@ class Work4FoodDataLoader:
         # Processed data
         self.agents = None
         self.orders = None
+        self.cache_entry = None  # set by load_processed when the data lives in a cache entry
+        self._stream_tmp = None  # temporary entry directory for chunked loads without a cache_dir
     
-    def load_all_data(self):
-        """Load all CSV files"""
+    def load_all_data(self, include_orders=True):
+        """Load all CSV files (include_orders=False leaves orders.csv to stream_orders)"""
         print("=" * 60)
         print("LOADING WORK4FOOD DATASET")
         print("=" * 60)
@@ -52,10 +96,11 @@ class Work4FoodDataLoader:
         print(f"   Columns: {list(self.sessions_df.columns)}")
         
         # Load orders
-        print(f"\n3. Loading orders from {self.orders_path}...")
-        self.orders_df = pd.read_csv(self.orders_path)
-        print(f"   ✓ Loaded {len(self.orders_df):,} orders")
-        print(f"   Columns: {list(self.orders_df.columns)}")
+        if include_orders:
+            print(f"\n3. Loading orders from {self.orders_path}...")
+            self.orders_df = pd.read_csv(self.orders_path)
+            print(f"   ✓ Loaded {len(self.orders_df):,} orders")
+            print(f"   Columns: {list(self.orders_df.columns)}")
         
         return self.workers_df, self.sessions_df, self.orders_df
     
@@ -184,48 +229,39 @@ class Work4FoodDataLoader:
         # Convert to simulation format
         print("\n4. Converting to simulation format...")
         
-        # Generate coordinates from zones
-        # For now, use zone IDs to create locations around city center
-        def zone_to_location(zone_id, center=(19.07, 72.87), radius=15):
-            """Convert zone ID to approximate lat/lon"""
-            # Use zone ID as seed for consistent locations
-            np.random.seed(int(zone_id))
-            bearing = np.random.random() * 2 * np.pi
-            r = (zone_id % 100) / 100.0 * radius  # Map zone to radius
-            dx = r * np.cos(bearing)
-            dy = r * np.sin(bearing)
-            lat = center[0] + dy / 111.0
-            lon = center[1] + dx / (111.0 * np.cos(np.radians(center[0])))
-            return (lat, lon)
-        
-        processed_orders = []
-        for idx, row in orders.iterrows():
-            # Restaurant location (from restaurant zone)
-            rest_loc = zone_to_location(row['restaurant_zone'])
-            
-            # Customer location (from customer zone)  
-            cust_loc = zone_to_location(row['customer_zone'])
-            
-            processed_orders.append({
-                'order_id': row['order_id'],
-                'time': row['timestamp'],
-                'rest_loc': rest_loc,
-                'cust_loc': cust_loc,
-                'picked': False,
-                'assigned_agent': None,
-                
-                # Additional order info
-                'distance_km': row.get('distance_km', row.get('distance_miles', 0) * 1.60934),
-                'trip_time_mins': row.get('trip_time_mins', row.get('trip_time_seconds', 0) / 60),
-                'base_fare': row['base_fare'],
-                'customer_prep_time': row.get('customer_prep_time', row.get('prep_time_mins', 0)),
-                'expected_delivery_mins': row['expected_delivery_mins']
-            })
+        # Generate coordinates from zones: one lookup row per unique zone,
+        # then a single gather for restaurant and customer columns
+        zone_ids, zone_pos = np.unique(
+            np.concatenate([orders['restaurant_zone'].to_numpy(), orders['customer_zone'].to_numpy()]),
+            return_inverse=True,
+        )
+        zone_lat, zone_lon = zone_location_table(zone_ids)
+        rest_pos, cust_pos = zone_pos[:len(orders)], zone_pos[len(orders):]
+        
+        def column_or(name, fallback, scale=1.0):
+            if name in orders:
+                return orders[name].to_numpy()
+            if fallback in orders:
+                return orders[fallback].to_numpy() * scale
+            return np.zeros(len(orders))
+        
+        orders_df = pd.DataFrame({
+            'order_id': orders['order_id'].to_numpy(),
+            'time': orders['timestamp'].to_numpy(),
+            'rest_lat': zone_lat[rest_pos],
+            'rest_lon': zone_lon[rest_pos],
+            'cust_lat': zone_lat[cust_pos],
+            'cust_lon': zone_lon[cust_pos],
+            'picked': False,
+            'assigned_agent': None,
             
-            if len(processed_orders) % 10000 == 0:
-                print(f"   Processed {len(processed_orders):,} orders...")
-        
-        orders_df = pd.DataFrame(processed_orders)
+            # Additional order info
+            'distance_km': column_or('distance_km', 'distance_miles', 1.60934),
+            'trip_time_mins': column_or('trip_time_mins', 'trip_time_seconds', 1 / 60),
+            'base_fare': orders['base_fare'].to_numpy(),
+            'customer_prep_time': column_or('customer_prep_time', 'prep_time_mins'),
+            'expected_delivery_mins': orders['expected_delivery_mins'].to_numpy(),
+        })
         self.orders = orders_df
         
         print(f"   ✓ Processed {len(orders_df):,} orders")
@@ -237,6 +273,98 @@ class Work4FoodDataLoader:
         
         return orders_df
     
+    def stream_orders(self, chunksize=250_000, sample_size=None, start_date=None,
+                      duration_hours=None, seed=42):
+        """
+        Streaming alternative to create_orders_from_csv for order files that
+        do not fit in memory. Reads orders.csv in chunks with ORDER_CSV_DTYPES
+        and applies the date filter per chunk. Sampling keeps the sample_size
+        rows with the smallest random keys from np.random.default_rng(seed), a
+        uniform sample that needs only sample_size rows in memory, but not the
+        same rows as create_orders_from_csv's DataFrame.sample.
+        
+        Yields:
+            Processed order chunks (zones as categoricals, float32 coordinates
+            and measures), in file order unless sampled.
+        """
+        header = pd.read_csv(self.orders_path, nrows=0).columns
+        usecols = ['timestamp'] + [c for c in ORDER_CSV_DTYPES if c in header]
+        dtypes = {c: ORDER_CSV_DTYPES[c] for c in usecols if c in ORDER_CSV_DTYPES}
+        end_date = start_date + timedelta(hours=duration_hours) if start_date and duration_hours else None
+        rng = np.random.default_rng(seed)
+        kept, kept_keys = None, None
+        rows_read = 0
+        
+        for chunk in pd.read_csv(self.orders_path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+            rows_read += len(chunk)
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], errors='coerce')
+            mask = chunk['timestamp'].notna().to_numpy()
+            if start_date:
+                mask &= (chunk['timestamp'] >= start_date).to_numpy()
+                if end_date is not None:
+                    mask &= (chunk['timestamp'] < end_date).to_numpy()
+            chunk = self._process_order_chunk(chunk[mask])
+            
+            if not sample_size:
+                yield chunk
+                continue
+            keys = rng.random(len(chunk))
+            if kept is not None:
+                chunk = self._concat_order_chunks(kept, chunk)
+                keys = np.concatenate([kept_keys, keys])
+            if len(chunk) > sample_size:
+                keep = np.argpartition(keys, sample_size)[:sample_size]
+                chunk, keys = chunk.iloc[keep].reset_index(drop=True), keys[keep]
+            kept, kept_keys = chunk, keys
+        
+        print(f"   ✓ Streamed {rows_read:,} orders from {self.orders_path}")
+        if sample_size and kept is not None:
+            yield kept.sort_values('time', kind='stable').reset_index(drop=True)
+    
+    @staticmethod
+    def _concat_order_chunks(first, second):
+        """pd.concat of two processed chunks; zone columns stay categorical over the union of both chunks' zones."""
+        first, second = first.copy(deep=False), second.copy(deep=False)
+        for col in ZONE_COLUMNS:
+            categories = union_categoricals([first[col], second[col]], sort_categories=True).categories
+            first[col] = first[col].cat.set_categories(categories)
+            second[col] = second[col].cat.set_categories(categories)
+        return pd.concat([first, second], ignore_index=True)
+    
+    @staticmethod
+    def _process_order_chunk(chunk):
+        """Simulation columns for one filtered orders.csv chunk."""
+        zone_ids, zone_pos = np.unique(
+            np.concatenate([chunk['restaurant_zone'].to_numpy(), chunk['customer_zone'].to_numpy()]),
+            return_inverse=True,
+        )
+        zone_lat, zone_lon = zone_location_table(zone_ids)
+        zone_lat, zone_lon = zone_lat.astype(np.float32), zone_lon.astype(np.float32)
+        rest_pos, cust_pos = zone_pos[:len(chunk)], zone_pos[len(chunk):]
+        
+        def column_or(name, fallback, scale=1.0):
+            if name in chunk:
+                return chunk[name].to_numpy(np.float32)
+            if fallback in chunk:
+                return (chunk[fallback].to_numpy(np.float32) * scale).astype(np.float32)
+            return np.zeros(len(chunk), dtype=np.float32)
+        
+        return pd.DataFrame({
+            'order_id': chunk['order_id'].to_numpy(np.int64),
+            'time': chunk['timestamp'].to_numpy(dtype='datetime64[ns]'),
+            'restaurant_zone': pd.Categorical(chunk['restaurant_zone'].to_numpy()),
+            'customer_zone': pd.Categorical(chunk['customer_zone'].to_numpy()),
+            'rest_lat': zone_lat[rest_pos],
+            'rest_lon': zone_lon[rest_pos],
+            'cust_lat': zone_lat[cust_pos],
+            'cust_lon': zone_lon[cust_pos],
+            'distance_km': column_or('distance_km', 'distance_miles', 1.60934),
+            'trip_time_mins': column_or('trip_time_mins', 'trip_time_seconds', 1 / 60),
+            'base_fare': chunk['base_fare'].to_numpy(np.float32),
+            'customer_prep_time': column_or('customer_prep_time', 'prep_time_mins'),
+            'expected_delivery_mins': chunk['expected_delivery_mins'].to_numpy(np.float32),
+        })
+    
     def get_sessions_for_workers(self, worker_ids=None):
         """
         Get session data for specified workers
@@ -269,19 +397,108 @@ class Work4FoodDataLoader:
         
         return sessions
     
+    def load_processed(self, cache_dir='./processed_data/cache', center_location=(19.07, 72.87),
+                       radius_km=12, limit=None, sample_size=None, start_date=None,
+                       duration_hours=None, chunksize=None, max_cache_entries=MAX_ENTRIES):
+        """
+        Agents, orders and sessions for a simulation run, read from the
+        columnar cache when the source files and parameters match an
+        earlier run, otherwise built from the CSVs and written to it.
+        cache_dir=None skips the cache. With chunksize, orders are ingested
+        with stream_orders into the entry and come back memory-mapped; without
+        a cache_dir they go to a temporary directory that is removed once
+        both the loader and the returned orders frame are gone. After writing a new
+        entry, only the max_cache_entries most recently used entries are kept.
+        
+        Agent placement draws from the global NumPy RNG, so the RNG state
+        is part of the key and a cache hit restores the state a cold load
+        would have left behind.
+        
+        Returns:
+            (agents, orders_df, sessions_df)
+        """
+        start = time.perf_counter()
+        rng_state = np.random.get_state()
+        params = {
+            'center_location': list(center_location), 'radius_km': radius_km, 'limit': limit,
+            'sample_size': sample_size, 'start_date': start_date, 'duration_hours': duration_hours,
+            'chunksize': chunksize,
+            'rng_state': hashlib.sha256(rng_state[1].tobytes()).hexdigest()[:16] + f':{rng_state[2]}',
+        }
+        key = cache_key([self.workers_path, self.sessions_path, self.orders_path], params)
+        entry_dir = os.path.join(cache_dir, key) if cache_dir else None
+        self.cache_entry = entry_dir
+        
+        cached = read_entry(entry_dir) if entry_dir else None
+        if cached is not None:
+            touch_entry(entry_dir)
+            frames, extra = cached
+            state = extra['rng_state_after']
+            np.random.set_state((state[0], np.array(state[1], dtype=np.uint32), *state[2:]))
+            self.agents = frames['agents'].to_dict('records')
+            self.orders = frames['orders']
+            sessions = frames['sessions']
+            print(f"✓ Loaded {len(self.agents)} agents, {len(self.orders):,} orders and "
+                  f"{len(sessions)} sessions from cache {key} "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+            return self.agents, self.orders, sessions
+        
+        self.load_all_data(include_orders=not chunksize)
+        agents = self.create_agents_from_workers(center_location=center_location, radius_km=radius_km, limit=limit)
+        sessions = self.get_sessions_for_workers([a['agent_id'] for a in agents])
+        if chunksize:
+            tmp = None
+            if entry_dir is None:
+                tmp = tempfile.TemporaryDirectory(prefix='work4food-', ignore_cleanup_errors=True)
+                self._stream_tmp = tmp
+                entry_dir = os.path.join(tmp.name, key)
+                self.cache_entry = entry_dir
+            state = np.random.get_state()
+            write_entry(
+                entry_dir,
+                {'agents': pd.DataFrame(agents), 'sessions': sessions},
+                extra={'rng_state_after': [state[0], state[1].tolist(), int(state[2]), int(state[3]), float(state[4])]},
+                chunked={'orders': self.stream_orders(chunksize=chunksize, sample_size=sample_size,
+                                                      start_date=start_date, duration_hours=duration_hours)},
+            )
+            self.orders = read_entry(entry_dir)[0]['orders']
+            if tmp is not None:
+                weakref.finalize(self.orders, tmp.cleanup)
+            if cache_dir:
+                prune_entries(cache_dir, entry_dir, max_cache_entries)
+            print(f"✓ Streamed {len(self.orders):,} orders into {entry_dir}")
+            return agents, self.orders, sessions
+        
+        orders_df = self.create_orders_from_csv(sample_size=sample_size, start_date=start_date,
+                                                duration_hours=duration_hours)
+        if entry_dir is None:
+            return agents, orders_df, sessions
+        
+        state = np.random.get_state()
+        write_entry(
+            entry_dir,
+            {'agents': pd.DataFrame(agents), 'orders': orders_df, 'sessions': sessions},
+            extra={'rng_state_after': [state[0], state[1].tolist(), int(state[2]), int(state[3]), float(state[4])]},
+        )
+        prune_entries(cache_dir, entry_dir, max_cache_entries)
+        print(f"✓ Cached processed data as {key}")
+        return agents, orders_df, sessions
+    
     def save_processed_data(self, output_dir='./processed_data'):
-        """Save processed agents and orders"""
-        import os
+        """Save processed agents and orders as .npy columns (see columnar_cache)"""
         os.makedirs(output_dir, exist_ok=True)
         
         if self.agents:
-            agents_df = pd.DataFrame(self.agents)
-            agents_df.to_csv(f'{output_dir}/agents.csv', index=False)
-            print(f"✓ Saved agents to {output_dir}/agents.csv")
+            meta = write_frame(output_dir, 'agents', pd.DataFrame(self.agents))
+            with open(f'{output_dir}/agents.json', 'w') as f:
+                json.dump(meta, f, default=str)
+            print(f"✓ Saved agents to {output_dir}/agents.*.npy")
         
         if self.orders is not None:
-            self.orders.to_csv(f'{output_dir}/orders.csv', index=False)
-            print(f"✓ Saved orders to {output_dir}/orders.csv")
+            meta = write_frame(output_dir, 'orders', self.orders)
+            with open(f'{output_dir}/orders.json', 'w') as f:
+                json.dump(meta, f, default=str)
+            print(f"✓ Saved orders to {output_dir}/orders.*.npy")
         
         # Save summary
         summary = {
@@ -296,7 +513,6 @@ class Work4FoodDataLoader:
         
         print(f"✓ Saved summary to {output_dir}/summary.json")
 
-
 # Example usage
 if __name__ == "__main__":
     # Initialize loader
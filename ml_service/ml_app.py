@@ -1,8 +1,16 @@
 # Simple FastAPI microservice that returns predicted Wv
-from fastapi import FastAPI
+import os
+from fastapi import FastAPI, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 
+from model_registry import FEATURE_ORDER, ModelRegistry
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_registry")
+)
+
 app = FastAPI()
+registry = ModelRegistry(MODEL_REGISTRY_DIR)
 
 class Features(BaseModel):
     lat: float
@@ -12,14 +20,48 @@ class Features(BaseModel):
     active_seconds: float
 
 @app.post("/predict_w")
-async def predict_w(f: Features):
-    # This is a placeholder. Replace with GPR model loaded from disk.
-    # A heuristic: predicted_w = orders_per_window / max(1, num_agents) * active_seconds * 0.5
-    ratio = f.orders_per_window / max(1, f.num_agents)
-    predicted_w = ratio * f.active_seconds * 0.5
-    return {"predicted_w": predicted_w}
+def predict_w(f: Features):
+    # Plain def: FastAPI runs it in the threadpool, so model inference never blocks the event loop
+    # Served by the active registry model; the built-in heuristic until a version is loaded
+    row = [getattr(f, name) for name in FEATURE_ORDER]
+    version, preds = registry.predict([row])
+    return {"predicted_w": preds[0], "model_version": version}
+
+@app.get("/admin/models")
+async def list_models():
+    return registry.status()
+
+@app.post("/admin/models/{version}/load", status_code=202)
+async def load_model(version: str, background_tasks: BackgroundTasks):
+    """Load, warm up and swap in a registry version without blocking predictions"""
+    if version not in registry.status()["available"]:
+        raise HTTPException(status_code=404, detail=f"Unknown model version {version}")
+    # Reserved under the swap lock before the task is scheduled, so concurrent requests cannot both pass
+    if not registry.reserve_load(version):
+        raise HTTPException(status_code=409, detail=f"Already loading {registry.loading}")
+    # Sync task -> runs in the threadpool, so the event loop keeps serving /predict_w
+    background_tasks.add_task(_load_in_background, version)
+    return {"loading": version, "active": registry.active.version}
+
+def _load_in_background(version: str):
+    try:
+        registry.load(version)
+    except Exception:
+        # Already logged and exposed via /admin/models last_error; active model is unchanged
+        pass
+
+@app.post("/admin/models/rollback")
+async def rollback_model():
+    try:
+        current = registry.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"active": current.version, "previous": registry.previous.version}
 
 @app.get("/")
 async def root():
-    return {"service": "ml_service", "status": "running"}
+    return {"service": "ml_service", "status": "running", "model_version": registry.active.version}
 
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,163 @@
+# Versioned model registry with background loading and atomic hot-swap
+#
+# Layout on disk:
+#   <MODEL_REGISTRY_DIR>/<version>/model.pkl   pickled object exposing predict(rows)
+#   <MODEL_REGISTRY_DIR>/<version>/meta.json   optional free-form metadata
+#
+# Rows passed to predict() follow FEATURE_ORDER. A new version only becomes
+# active after it answered a probe batch; the previously active version is kept
+# in memory so a rollback is a pointer swap, not a reload.
+import json
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FEATURE_ORDER = ("lat", "lng", "num_agents", "orders_per_window", "active_seconds")
+ARTIFACT_NAME = "model.pkl"
+META_NAME = "meta.json"
+BASELINE_VERSION = "heuristic-v0"
+
+# Small but representative batch used to warm a model up before it serves traffic
+PROBE_BATCH: List[List[float]] = [
+    [19.0760, 72.8777, 1, 0, 0.0],
+    [19.0760, 72.8777, 80, 50, 3600.0],
+    [19.1200, 72.9100, 200, 400, 14400.0],
+    [18.9900, 72.8300, 5, 120, 900.0],
+]
+
+
+class HeuristicWModel:
+    """Placeholder model: predicted_w = orders_per_window / max(1, num_agents) * active_seconds * 0.5"""
+
+    def predict(self, rows: Sequence[Sequence[float]]) -> List[float]:
+        out = []
+        for _, _, num_agents, orders_per_window, active_seconds in rows:
+            ratio = orders_per_window / max(1, num_agents)
+            out.append(ratio * active_seconds * 0.5)
+        return out
+
+
+class LoadedModel:
+    def __init__(self, version: str, model, warmup_ms: float = 0.0):
+        self.version = version
+        self.model = model
+        self.warmup_ms = warmup_ms
+        self.loaded_at = time.time()
+
+    def describe(self) -> dict:
+        return {"version": self.version, "loaded_at": self.loaded_at, "warmup_ms": round(self.warmup_ms, 3)}
+
+
+class ModelRegistry:
+    """
+    Holds the active and previous model. Readers take a single reference to
+    `self.active`, so a swap never exposes a half-loaded model.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.active: LoadedModel = LoadedModel(BASELINE_VERSION, HeuristicWModel())
+        self.previous: Optional[LoadedModel] = None
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._swap_lock = threading.Lock()
+
+    def list_versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, ARTIFACT_NAME))
+        )
+
+    def publish(self, version: str, model, meta: Optional[dict] = None) -> str:
+        """Write a model artifact into the registry (tmp file + rename, so loaders never see partial files)."""
+        version_dir = os.path.join(self.root, version)
+        os.makedirs(version_dir, exist_ok=True)
+        path = os.path.join(version_dir, ARTIFACT_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f)
+        os.replace(tmp_path, path)
+        if meta is not None:
+            with open(os.path.join(version_dir, META_NAME), "w") as f:
+                json.dump(meta, f, indent=2)
+        return path
+
+    def reserve_load(self, version: str) -> bool:
+        """Mark `version` as loading unless another load is in progress; False if one is."""
+        with self._swap_lock:
+            if self.loading is not None:
+                return False
+            self.loading = version
+            return True
+
+    def load(self, version: str) -> LoadedModel:
+        """
+        Load, warm up and activate `version`. Meant to run off the request path
+        (FastAPI background task); on failure the active model is left untouched.
+        Callers may reserve_load(version) first; otherwise load reserves it and
+        raises RuntimeError when another load is in progress.
+        """
+        if self.loading != version and not self.reserve_load(version):
+            raise RuntimeError(f"Already loading {self.loading}")
+        try:
+            if version == BASELINE_VERSION:
+                model = HeuristicWModel()
+            else:
+                path = os.path.join(self.root, version, ARTIFACT_NAME)
+                with open(path, "rb") as f:
+                    model = pickle.load(f)
+            warmup_ms = self._warm_up(model)
+            candidate = LoadedModel(version, model, warmup_ms)
+            with self._swap_lock:
+                self.previous, self.active = self.active, candidate
+            self.last_error = None
+            logger.info(f"Activated model {version} (warm-up {warmup_ms:.1f} ms)")
+            return candidate
+        except Exception as e:
+            self.last_error = f"{version}: {e}"
+            logger.exception(f"Failed to load model {version}: {e}")
+            raise
+        finally:
+            with self._swap_lock:
+                self.loading = None
+
+    def rollback(self) -> LoadedModel:
+        with self._swap_lock:
+            if self.previous is None:
+                raise LookupError("No previous model version to roll back to")
+            self.active, self.previous = self.previous, self.active
+        logger.info(f"Rolled back to model {self.active.version}")
+        return self.active
+
+    def predict(self, rows: Sequence[Sequence[float]]) -> Tuple[str, List[float]]:
+        current = self.active
+        preds = [float(p) for p in current.model.predict(rows)]
+        return current.version, preds
+
+    def status(self) -> dict:
+        return {
+            "active": self.active.describe(),
+            "previous": self.previous.describe() if self.previous else None,
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "available": [BASELINE_VERSION] + self.list_versions(),
+        }
+
+    @staticmethod
+    def _warm_up(model) -> float:
+        start = time.perf_counter()
+        preds = list(model.predict(PROBE_BATCH))
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        if len(preds) != len(PROBE_BATCH):
+            raise ValueError(f"probe batch returned {len(preds)} predictions for {len(PROBE_BATCH)} rows")
+        if not all(math.isfinite(float(p)) for p in preds):
+            raise ValueError("probe batch returned non-finite predictions")
+        return elapsed_ms
@@ -0,0 +1,119 @@
+"""
+Tests for the model registry and its admin endpoints: background load with
+warm-up, atomic swap, failed loads leaving the active model alone, rollback,
+and the 409 guard against concurrent loads.
+"""
+import importlib
+import os
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_registry import BASELINE_VERSION, PROBE_BATCH, ModelRegistry
+
+
+class ConstantModel:
+    def __init__(self, value):
+        self.value = value
+
+    def predict(self, rows):
+        return [self.value] * len(rows)
+
+
+class NaNModel:
+    def predict(self, rows):
+        return [float("nan")] * len(rows)
+
+
+@pytest.fixture
+def registry_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield tmp
+
+
+def test_load_warms_up_and_swaps(registry_dir):
+    registry = ModelRegistry(registry_dir)
+    registry.publish("v1", ConstantModel(3.0))
+    loaded = registry.load("v1")
+    assert registry.active is loaded
+    assert registry.previous.version == BASELINE_VERSION
+    assert registry.loading is None
+    assert registry.predict(PROBE_BATCH[:2]) == ("v1", [3.0, 3.0])
+
+
+def test_failed_warm_up_keeps_active_model(registry_dir):
+    registry = ModelRegistry(registry_dir)
+    registry.publish("bad", NaNModel())
+    with pytest.raises(ValueError):
+        registry.load("bad")
+    assert registry.active.version == BASELINE_VERSION
+    assert registry.previous is None
+    assert registry.loading is None
+    assert registry.last_error.startswith("bad:")
+
+
+def test_rollback_swaps_back(registry_dir):
+    registry = ModelRegistry(registry_dir)
+    with pytest.raises(LookupError):
+        registry.rollback()
+    registry.publish("v1", ConstantModel(1.0))
+    registry.publish("v2", ConstantModel(2.0))
+    registry.load("v1")
+    registry.load("v2")
+    assert registry.rollback().version == "v1"
+    assert registry.previous.version == "v2"
+    assert registry.predict(PROBE_BATCH[:1]) == ("v1", [1.0])
+
+
+def test_reserve_load_blocks_a_second_load(registry_dir):
+    registry = ModelRegistry(registry_dir)
+    registry.publish("v1", ConstantModel(1.0))
+    assert registry.reserve_load("v1")
+    assert not registry.reserve_load(BASELINE_VERSION)
+    with pytest.raises(RuntimeError):
+        registry.load(BASELINE_VERSION)
+    registry.load("v1")  # the reserved version goes ahead
+    assert registry.active.version == "v1"
+    assert registry.reserve_load(BASELINE_VERSION)
+
+
+@pytest.fixture
+def client(registry_dir, monkeypatch):
+    monkeypatch.setenv("MODEL_REGISTRY_DIR", registry_dir)
+    import ml_app
+    ml_app = importlib.reload(ml_app)
+    ml_app.registry.publish("v1", ConstantModel(7.0))
+    with TestClient(ml_app.app) as test_client:
+        yield test_client, ml_app.registry
+
+
+def test_admin_load_predict_and_rollback(client):
+    test_client, registry = client
+    assert test_client.post("/predict_w", json={
+        "lat": 19.0, "lng": 72.8, "num_agents": 2, "orders_per_window": 4, "active_seconds": 100.0,
+    }).json() == {"predicted_w": 100.0, "model_version": BASELINE_VERSION}
+
+    assert test_client.post("/admin/models/missing/load").status_code == 404
+    response = test_client.post("/admin/models/v1/load")
+    assert response.status_code == 202
+    # TestClient runs the background task before returning
+    status = test_client.get("/admin/models").json()
+    assert status["active"]["version"] == "v1"
+    assert status["loading"] is None
+    assert test_client.post("/predict_w", json={
+        "lat": 19.0, "lng": 72.8, "num_agents": 2, "orders_per_window": 4, "active_seconds": 100.0,
+    }).json() == {"predicted_w": 7.0, "model_version": "v1"}
+
+    assert test_client.post("/admin/models/rollback").json() == {"active": BASELINE_VERSION, "previous": "v1"}
+
+
+def test_admin_load_conflict(client):
+    test_client, registry = client
+    assert registry.reserve_load("v1")
+    response = test_client.post(f"/admin/models/{BASELINE_VERSION}/load")
+    assert response.status_code == 409
+    assert registry.loading == "v1"